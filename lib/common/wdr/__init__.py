@@ -1,4 +1,5 @@
 import logging
+import os
 import sys
 
 __all__ = ['config', 'control', 'task', 'manifest', 'util']
@@ -9,6 +10,11 @@ MAJOR_VERSION = 0
 MINOR_VERSION = 6
 PATCH_VERSION = 0
 
+_wsadminObjectNames = (
+    'AdminApp', 'AdminConfig', 'AdminControl', 'AdminTask', 'Help'
+)
+_wsadminObjectOverrides = {}
+
 
 class WsadminObjects:
     __wsadminObjects = None
@@ -19,9 +25,10 @@ class WsadminObjects:
             while rootFrame.f_back:
                 rootFrame = rootFrame.f_back
             values = []
-            for v in (
-                'AdminApp', 'AdminConfig', 'AdminControl', 'AdminTask', 'Help'
-            ):
+            for v in _wsadminObjectNames:
+                if _wsadminObjectOverrides.has_key(v):
+                    values.append(_wsadminObjectOverrides[v])
+                    continue
                 try:
                     values.append(rootFrame.f_globals[v])
                 except:
@@ -38,6 +45,32 @@ class WsadminObjects:
 ) = WsadminObjects().getObjects()
 
 
+def replaceWsadminObject(name, value):
+    # modules loaded later receive the replacement from WsadminObjects
+    if name not in _wsadminObjectNames:
+        raise Exception('unknown wsadmin object: %s' % name)
+    _wsadminObjectOverrides[name] = value
+    _rebindWsadminObject(name, value)
+
+
+def restoreWsadminObject(name):
+    if _wsadminObjectOverrides.has_key(name):
+        del _wsadminObjectOverrides[name]
+    objects = WsadminObjects().getObjects()
+    _rebindWsadminObject(
+        name, objects[list(_wsadminObjectNames).index(name)]
+    )
+
+
+def _rebindWsadminObject(name, value):
+    for (moduleName, module) in sys.modules.items():
+        if module is None:
+            continue
+        if moduleName == 'wdr' or moduleName[:4] == 'wdr.':
+            if hasattr(module, name):
+                setattr(module, name, value)
+
+
 def versionInfo():
     logger.info(
         'using WDR (http://wdr.github.io/WDR/) version %d.%d.%d',
@@ -54,3 +87,32 @@ def versionInfo():
         )
     else:
         logger.warning('the client is not connected to live server instance')
+
+
+def _environmentValue(propertyName, variableName):
+    value = None
+    try:
+        import java.lang
+        value = java.lang.System.getProperty(propertyName)
+    except ImportError:
+        pass
+    if not value:
+        value = os.environ.get(variableName)
+    return value
+
+
+def _applyEnvironment():
+    # replay and instrumentation modules are loaded only when requested
+    if (
+        _environmentValue('wdr.replay', 'WDR_REPLAY')
+        or
+        _environmentValue('wdr.record', 'WDR_RECORD')
+    ):
+        import wdr.replay
+        wdr.replay._applyEnvironment()
+    if _environmentValue('wdr.instrumentation', 'WDR_INSTRUMENTATION'):
+        import wdr.instrumentation
+        wdr.instrumentation._enableFromEnvironment()
+
+
+_applyEnvironment()
@@ -1,5 +1,6 @@
 import logging
 import wdr
+import wdr.config
 
 (
     AdminApp, AdminConfig, AdminControl, AdminTask, Help
@@ -72,6 +73,7 @@ class Install(AppAction):
             'installing application %s with options %s', earFile, options
         )
         AdminApp.install(earFile, options)
+        wdr.config.invalidateCaches()
 
 
 class Uninstall(AppAction):
@@ -81,6 +83,7 @@ class Uninstall(AppAction):
     def __call__(self, name):
         logger.debug('uninstalling application %s', name)
         AdminApp.uninstall(name)
+        wdr.config.invalidateCaches()
 
 
 class UpdateApp(AppAction):
@@ -91,6 +94,7 @@ class UpdateApp(AppAction):
         options = self.getOptions()
         logger.debug('updating application %s with options %s', name, options)
         AdminApp.update(name, 'app', ['-operation', 'update'] + options)
+        wdr.config.invalidateCaches()
 
 
 class UpdateFile(AppAction):
@@ -103,6 +107,7 @@ class UpdateFile(AppAction):
             'file updating application %s with options %s', name, options
         )
         AdminApp.update(name, 'file', options)
+        wdr.config.invalidateCaches()
 
 
 class UpdateModulefile(AppAction):
@@ -115,6 +120,7 @@ class UpdateModulefile(AppAction):
             'file updating application %s with options %s', name, options
         )
         AdminApp.update(name, 'file', options)
+        wdr.config.invalidateCaches()
 
 
 class UpdatePartialapp(AppAction):
@@ -127,6 +133,7 @@ class UpdatePartialapp(AppAction):
             'partial updating application %s with options %s', name, options
         )
         AdminApp.update(name, 'partial', options)
+        wdr.config.invalidateCaches()
 
 
 class Edit(AppAction):
@@ -137,6 +144,7 @@ class Edit(AppAction):
         options = self.getOptions()
         logger.debug('editing application %s with options %s', name, options)
         AdminApp.update(name, options)
+        wdr.config.invalidateCaches()
 
 
 class View(AppAction):
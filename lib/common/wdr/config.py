@@ -1,9 +1,11 @@
 from string import split, join, upper
-from types import StringType
+from types import ListType, StringType
 import logging
+import os
 import re
 import time
 import wdr
+import wdr.util
 
 (
     AdminApp, AdminConfig, AdminControl, AdminTask, Help
@@ -12,6 +14,26 @@ import wdr
 logger = logging.getLogger('wdr.config')
 
 _typeRegistryInitialized = 0
+_typeRegistryCacheVersion = 1
+_typeRegistryCacheFile = None
+_typeRegistryCacheDirty = 0
+_typeRegistryCacheExitHook = 0
+_attributePrefetch = 0
+_attributeSnapshotGeneration = 0
+_xmlIdTypeDerivation = 0
+_polymorphicTypes = (-1, {})
+_configIds = {}
+_configIdLimit = 10000
+_configIdParts = {}
+_attributeCache = None
+_containmentIndex = None
+_queryCache = None
+_activeBatch = None
+_attributeIndexes = {}
+_modifyStatistics = {'changed': 0, 'skipped': 0}
+_workspaceListeners = []
+_snapshotHeader = 'WDR-SNAPSHOT'
+_snapshotFormatVersion = 2
 
 
 def _compileRegularExpressions():
@@ -47,10 +69,15 @@ def _compileRegularExpressions():
     configNameListPattern = re.compile(
         r'^(?:"?\[(?:(%s) *)*\]"?)|(?:\*+)$' % configNamePattern.pattern)
     attributeTypePattern = re.compile('[, \(\)]+')
-    return (configNamePattern, configNameListPattern, attributeTypePattern)
+    xmlIdPattern = re.compile(r'[a-zA-Z_0-9]+\Z')
+    return (
+        configNamePattern, configNameListPattern, attributeTypePattern,
+        xmlIdPattern
+    )
 
 (
-    _configNamePattern, _configNameListPattern, _attributeTypePattern
+    _configNamePattern, _configNameListPattern, _attributeTypePattern,
+    _xmlIdPattern
 ) = _compileRegularExpressions()
 
 
@@ -213,8 +240,65 @@ def getObjectType(
     return typeName
 
 
+def enableXmlIdTypeDerivation():
+    wdr.config._xmlIdTypeDerivation = 1
+
+
+def disableXmlIdTypeDerivation():
+    wdr.config._xmlIdTypeDerivation = 0
+
+
+def _xmlIdObjectType(configId):
+    # xmlIds generated by WebSphere are built as <type>_<number>
+    xmlId = configId.xmlId
+    if xmlId:
+        pos = xmlId.rfind('_')
+        if pos > 0:
+            return xmlId[:pos]
+    return None
+
+
+def _isConcreteType(typeName):
+    # without complete type registry any type may have subtypes
+    if not _typeRegistryInitialized:
+        return 0
+    (registrySize, polymorphicTypes) = wdr.config._polymorphicTypes
+    if registrySize != len(_typeRegistry):
+        polymorphicTypes = {}
+        for typeInfo in _typeRegistry.values():
+            for ai in typeInfo.attributes.values():
+                if ai.subTypes:
+                    polymorphicTypes[ai.type] = 1
+        wdr.config._polymorphicTypes = (len(_typeRegistry), polymorphicTypes)
+    return not polymorphicTypes.has_key(typeName)
+
+
+def _contextObjectType(configId, typeName, subTypes=None):
+    # AdminConfig.list and attributes of polymorphic types may return objects
+    # of any subtype, their type is known only if it can be confirmed
+    xmlIdType = _xmlIdObjectType(configId)
+    if xmlIdType == typeName:
+        return typeName
+    if subTypes:
+        if xmlIdType in subTypes:
+            return xmlIdType
+    elif _isConcreteType(typeName):
+        return typeName
+    return None
+
+
+def _resolveObjectType(configId):
+    if _xmlIdTypeDerivation:
+        typeName = _xmlIdObjectType(configId)
+        if typeName and _typeRegistry.has_key(typeName):
+            return typeName
+    return getObjectType(configId)
+
+
 def _isConfigId(cfgid):
     if cfgid:
+        if _scanConfigId(cfgid, 0, len(cfgid), 0) is not None:
+            return 1
         return _configNamePattern.match(cfgid) is not None
     else:
         return 0
@@ -222,6 +306,8 @@ def _isConfigId(cfgid):
 
 def _isConfigIdList(cfgids):
     if cfgids:
+        if _scanConfigIdList(cfgids, 0) is not None:
+            return 1
         return _configNameListPattern.match(cfgids) is not None
     else:
         return 0
@@ -235,20 +321,22 @@ def _firstNonNone(*args):
 
 
 def getTypeInfo(typeName):
-    if not _typeRegistry.has_key(typeName):
+    typeInfo = _typeRegistry.get(typeName)
+    if typeInfo is None:
         logger.debug('introspecting type %s', typeName)
         attributes = {}
         for att in AdminConfig.attributes(typeName).splitlines():
             (attName, attType) = att.split(' ', 1)
             attributes[attName] = parseAttributeType(attName, attType)
-        _typeRegistry[typeName] = TypeInfo(
-            typeName, attributes, parents(typeName), []
+        typeInfo = _typeRegistry[typeName] = TypeInfo(
+            typeName, attributes, _introspectParents(typeName), []
         )
-        for parent in parents(typeName):
+        for parent in typeInfo.parents:
             parentTypeInfo = getTypeInfo(parent)
             if typeName not in parentTypeInfo.children:
                 parentTypeInfo.children.append(typeName)
-    return _typeRegistry[typeName]
+        wdr.config._typeRegistryCacheDirty = 1
+    return typeInfo
 
 
 def configObject(configId):
@@ -259,40 +347,174 @@ def configObjects(configIds):
     return map(lambda e: configObject(e), _parseConfigIdList(configIds))
 
 
+def iterConfigObjectList(configIds):
+    return ConfigIdListIterator(configIds)
+
+
 def _parseConfigId(configId):
+    result = _scanConfigId(configId, 0, len(configId))
+    if result is None:
+        result = _matchConfigId(configId)
+    return result
+
+
+def _parseConfigIdList(configIdList):
+    result = _scanConfigIdList(configIdList)
+    if result is None:
+        result = _matchConfigIdList(configIdList)
+    return result
+
+
+def _scanConfigId(configId, start, end, intern=1):
+    # Single-pass scanner for well-formed ids in the form of
+    # name(xmlPath|xmlDoc#xmlId), optionally surrounded with double-quotes.
+    # Returns None whenever the id is not trivially unambiguous. Such ids
+    # are left to regular expressions, which keeps both paths consistent.
+    # With intern disabled the id is only validated and 1 is returned.
+    if end - start < 2:
+        return None
+    if configId[start] == '"':
+        if configId[end - 1] != '"':
+            return None
+        start = start + 1
+        end = end - 1
+        forbiddenNameChars = '"^[]'
+    else:
+        forbiddenNameChars = ' "^[]'
+    if configId[end - 1] != ')':
+        return None
+    barPos = configId.find('|', start, end)
+    if barPos < 0 or configId.find('|', barPos + 1, end) >= 0:
+        return None
+    parenPos = configId.rfind('(', start, barPos)
+    if parenPos < 0 or parenPos + 1 == barPos:
+        return None
+    hashPos = configId.find('#', barPos + 1, end)
+    if hashPos < 0 or configId.find('#', hashPos + 1, end) >= 0:
+        return None
+    if (
+        hashPos - barPos < 6
+        or
+        configId[hashPos - 4:hashPos] != '.xml'
+        or
+        configId.find('\n', parenPos, hashPos) >= 0
+        or
+        configId.find('(', barPos, hashPos) >= 0
+    ):
+        return None
+    xmlId = configId[hashPos + 1:end - 1]
+    if not _xmlIdPattern.match(xmlId):
+        return None
+    name = configId[start:parenPos]
+    for c in forbiddenNameChars:
+        if name.find(c) >= 0:
+            return None
+    if not intern:
+        return 1
+    result = _configIds.get(configId[start:end])
+    if result is None:
+        result = _internConfigId(
+            name, configId[parenPos + 1:barPos],
+            configId[barPos + 1:hashPos], xmlId
+        )
+    return result
+
+
+def _scanConfigIdList(configIdList, intern=1):
+    # Single-pass scanner for lists of ids in the form of [id id ...],
+    # optionally surrounded with double-quotes. Returns None for anything
+    # not trivially unambiguous, see _scanConfigId.
+    length = len(configIdList)
+    pos = 0
+    if length and configIdList[0] == '"':
+        pos = 1
+    if pos >= length or configIdList[pos] != '[':
+        return None
+    pos = pos + 1
+    result = []
+    while 1:
+        if pos >= length:
+            return None
+        c = configIdList[pos]
+        if c == ']':
+            break
+        elif c == '"':
+            end = configIdList.find('"', pos + 1)
+            if end < 0:
+                return None
+            end = end + 1
+        else:
+            end = configIdList.find(' ', pos)
+            if end < 0:
+                end = configIdList.find(']', pos)
+                if end < 0:
+                    return None
+            else:
+                bracketPos = configIdList.find(']', pos, end)
+                if bracketPos >= 0:
+                    end = bracketPos
+        configId = _scanConfigId(configIdList, pos, end, intern)
+        if configId is None:
+            return None
+        result.append(configId)
+        pos = end
+        while pos < length and configIdList[pos] == ' ':
+            pos = pos + 1
+    pos = pos + 1
+    if pos == length or (pos + 1 == length and configIdList[pos] == '"'):
+        return result
+    return None
+
+
+def _matchConfigId(configId):
     mat = _configNamePattern.match(configId)
     if mat:
         name = _firstNonNone(mat.group('qname'), mat.group('name'))
         xmlPath = _firstNonNone(mat.group('qxmlPath'), mat.group('xmlPath'))
         xmlDoc = _firstNonNone(mat.group('qxmlDoc'), mat.group('xmlDoc'))
         xmlId = _firstNonNone(mat.group('qxmlId'), mat.group('xmlId'))
-        return ConfigId(name, xmlPath, xmlDoc, xmlId)
+        return _internConfigId(name, xmlPath, xmlDoc, xmlId)
     else:
         raise Exception('Invalid configuration id: %s' % configId)
 
 
-def _parseConfigIdList(configIdList):
+def _internConfigId(name, xmlPath, xmlDoc, xmlId):
+    # equal ids share one instance, paths & documents are shared among ids
+    if len(_configIds) >= _configIdLimit:
+        _clearInternedConfigIds()
+    parts = _configIdParts
+    xmlPath = parts.setdefault(xmlPath, xmlPath)
+    xmlDoc = parts.setdefault(xmlDoc, xmlDoc)
+    configId = ConfigId(name, xmlPath, xmlDoc, xmlId)
+    return _configIds.setdefault(configId._str, configId)
+
+
+def _clearInternedConfigIds():
+    _configIds.clear()
+    _configIdParts.clear()
+
+
+def _matchConfigIdList(configIdList):
     listMatcher = _configNameListPattern.match(configIdList)
     if listMatcher:
         result = []
         if listMatcher.group(1):
             for el in _configNamePattern.findall(listMatcher.group(0)):
-                result.append(_parseConfigId(el[0]))
+                result.append(_matchConfigId(el[0]))
         return result
     else:
         raise Exception('Invalid configuration id list: %s' % configIdList)
 
 
 def getid(criteriaString):
-    objectList = AdminConfig.getid(criteriaString)
     result = []
-    for l in objectList.splitlines():
-        result.append(ConfigObject(_parseConfigId(l)))
+    for configId in _queryConfigIds(criteriaString):
+        result.append(ConfigObject(configId))
     return result
 
 
 def getid1(criteriaString):
-    objectList = AdminConfig.getid(criteriaString).splitlines()
+    objectList = _queryConfigIds(criteriaString)
     if len(objectList) == 0:
         raise Exception(
             'No configuration object matched criteria %s' % criteriaString
@@ -303,7 +525,17 @@ def getid1(criteriaString):
             % criteriaString
         )
     else:
-        return ConfigObject(_parseConfigId(objectList[0]))
+        return ConfigObject(objectList[0])
+
+
+def _queryConfigIds(criteriaString):
+    if _queryCache is not None:
+        return _queryCache.getid(criteriaString)
+    return _getidConfigIds(criteriaString)
+
+
+def _getidConfigIds(criteriaString):
+    return map(_parseConfigId, AdminConfig.getid(criteriaString).splitlines())
 
 
 def listConfigObjects(type, scopeOrPattern=None):
@@ -313,10 +545,30 @@ def listConfigObjects(type, scopeOrPattern=None):
         v = AdminConfig.list(type)
     result = []
     for l in v.splitlines():
-        result.append(ConfigObject(_parseConfigId(l)))
+        configId = _parseConfigId(l)
+        result.append(
+            ConfigObject(configId, _contextObjectType(configId, type))
+        )
     return result
 
 
+def iterConfigObjects(type, scopeOrPattern=None):
+    if scopeOrPattern:
+        v = AdminConfig.list(type, str(scopeOrPattern))
+    else:
+        v = AdminConfig.list(type)
+    return ConfigIdLinesIterator(v, type)
+
+
+def iterGetid(criteriaString):
+    # query cache is bypassed, iteration is meant for large results
+    return ConfigIdLinesIterator(AdminConfig.getid(criteriaString))
+
+
+def chunks(sequence, size):
+    return ChunkIterator(sequence, size)
+
+
 def attributes(obj):
     if isinstance(obj, ConfigObject):
         typeName = obj._type
@@ -335,6 +587,10 @@ def hasChanges():
 
 
 def parents(type):
+    return getTypeInfo(type).parents[:]
+
+
+def _introspectParents(type):
     parentsString = AdminConfig.parents(type)
     if not parentsString.startswith('WASX7351I'):
         return parentsString.splitlines()
@@ -344,6 +600,10 @@ def parents(type):
 
 def reset():
     AdminConfig.reset()
+    invalidateCaches()
+    _clearInternedConfigIds()
+    for listener in _workspaceListeners[:]:
+        listener.workspaceReset()
 
 
 def discard():
@@ -352,36 +612,341 @@ def discard():
 
 def save():
     AdminConfig.save()
+    invalidateCaches()
+    _clearInternedConfigIds()
+    for listener in _workspaceListeners[:]:
+        listener.workspaceSaved()
+
+
+def addWorkspaceListener(listener):
+    # listeners get notified by save and reset/discard via workspaceSaved and
+    # workspaceReset methods
+    if listener not in _workspaceListeners:
+        _workspaceListeners.append(listener)
+
+
+def removeWorkspaceListener(listener):
+    if listener in _workspaceListeners:
+        _workspaceListeners.remove(listener)
+
+
+def enableAttributePrefetch():
+    wdr.config._attributePrefetch = 1
+
+
+def disableAttributePrefetch():
+    wdr.config._attributePrefetch = 0
+
+
+def enableAttributeCache(maxSize=10000):
+    wdr.config._attributeCache = SessionAttributeCache(maxSize)
+
+
+def disableAttributeCache():
+    wdr.config._attributeCache = None
+
+
+def invalidateAttributeCache(configObject=None):
+    _invalidateCachedAttributes(configObject)
+
+
+def getAttributeCacheStatistics():
+    if _attributeCache is not None:
+        return _attributeCache.statistics()
+    return None
+
+
+def getModifyStatistics():
+    return _modifyStatistics.copy()
+
+
+def resetModifyStatistics():
+    _modifyStatistics['changed'] = 0
+    _modifyStatistics['skipped'] = 0
+
+
+def _countModifications(changed, skipped):
+    _modifyStatistics['changed'] += changed
+    _modifyStatistics['skipped'] += skipped
+
+
+def batch(readBack=0):
+    if _activeBatch is not None:
+        raise Exception('Another configuration batch is already active')
+    wdr.config._activeBatch = ConfigBatch(readBack)
+    return _activeBatch
+
+
+def enableContainmentIndex():
+    wdr.config._containmentIndex = ContainmentIndex()
+
+
+def disableContainmentIndex():
+    wdr.config._containmentIndex = None
+
+
+def enableQueryCache():
+    wdr.config._queryCache = QueryCache()
+
+
+def disableQueryCache():
+    wdr.config._queryCache = None
+
+
+def getQueryCacheStatistics():
+    if _queryCache is not None:
+        return _queryCache.statistics()
+    return None
+
+
+def defineAttributeIndex(type, attributeName):
+    typeInfo = getTypeInfo(type)
+    if not typeInfo.attributes.has_key(attributeName):
+        raise Exception(
+            'Type %s has no attribute %s' % (type, attributeName)
+        )
+    (cnv, isList, isReference, ai) = typeInfo.attributeDescriptor(
+        attributeName
+    )
+    if cnv is None or isList:
+        raise Exception(
+            'Only simple attributes can be indexed, %s.%s is %s'
+            % (type, attributeName, ai.type)
+        )
+    indexes = _attributeIndexes.setdefault(type, {})
+    if not indexes.has_key(attributeName):
+        indexes[attributeName] = AttributeIndex(type, attributeName)
+    return indexes[attributeName]
+
+
+def dropAttributeIndex(type, attributeName=None):
+    if attributeName is None:
+        if _attributeIndexes.has_key(type):
+            del _attributeIndexes[type]
+    elif _attributeIndexes.get(type, {}).has_key(attributeName):
+        del _attributeIndexes[type][attributeName]
+        if not _attributeIndexes[type]:
+            del _attributeIndexes[type]
+
+
+def getAttributeIndexStatistics():
+    result = {}
+    for indexes in _attributeIndexes.values():
+        for index in indexes.values():
+            result[(index.type, index.attributeName)] = index.statistics()
+    return result
+
+
+def invalidateCaches():
+    _invalidateCachedAttributes()
+    if _containmentIndex is not None:
+        _containmentIndex.clear()
+    if _queryCache is not None:
+        _queryCache.clear()
+    for indexes in _attributeIndexes.values():
+        for index in indexes.values():
+            index.clear()
+
+
+def _configObjectModified(configObject, attributeNames=None):
+    _invalidateCachedAttributes(configObject)
+    if _containmentIndex is not None:
+        _containmentIndex.objectModified(configObject, attributeNames)
+    _forgetIndexedObject(configObject)
+    if _queryCache is not None and (
+        _affectsQueries(configObject, attributeNames)
+    ):
+        _queryCache.clear()
+
+
+def _affectsQueries(configObject, attributeNames):
+    # containment paths match objects by their names and nested objects
+    if attributeNames is None:
+        return 1
+    typeInfo = getTypeInfo(configObject._type)
+    for name in attributeNames:
+        if name == 'name' or name[-4:] == 'Name':
+            return 1
+        if not typeInfo.attributes.has_key(name):
+            return 1
+        if typeInfo.attributeDescriptor(name)[0] is None:
+            return 1
+    return 0
+
+
+def _forgetIndexedObject(configObject):
+    for indexes in _attributeIndexes.values():
+        for index in indexes.values():
+            index.forget(configObject)
+
+
+def _indexedCriteria(type, criteria):
+    # criteria checked against attribute indexes come first, they don't
+    # need any AdminConfig calls once the index is built
+    indexes = _attributeIndexes.get(type)
+    result = []
+    for (k, v) in criteria.items():
+        if indexes and indexes.has_key(k):
+            result.insert(0, (k, v, indexes[k]))
+        else:
+            result.append((k, v, None))
+    return result
+
+
+def _matchesCriteria(configObject, indexedCriteria, attributeCache):
+    for (k, v, index) in indexedCriteria:
+        if index is not None:
+            if not index.matches(configObject, v, attributeCache):
+                return 0
+        elif attributeCache.getAttribute(configObject, k) != v:
+            return 0
+    return 1
+
+
+def _invalidateCachedAttributes(configObject=None):
+    # snapshots taken before any change made via WDR are considered stale
+    wdr.config._attributeSnapshotGeneration += 1
+    if _attributeCache is not None:
+        _attributeCache.invalidate(configObject)
+
+
+class ConfigIdLinesIterator:
+    # ConfigObjects are created one at a time from AdminConfig output, with
+    # one id per line, as the iteration proceeds
+    def __init__(self, output, typeName=None):
+        self.output = output
+        self.typeName = typeName
+        self.position = 0
+        self.index = 0
+        self.current = None
+
+    def __getitem__(self, index):
+        if index == self.index - 1:
+            return self.current
+        if index != self.index:
+            raise Exception('Only sequential iteration is supported')
+        output = self.output
+        line = ''
+        while not line:
+            if self.position >= len(output):
+                raise IndexError(index)
+            end = output.find('\n', self.position)
+            if end < 0:
+                end = len(output)
+            line = output[self.position:end].strip()
+            self.position = end + 1
+        configId = _parseConfigId(line)
+        self.current = ConfigObject(
+            configId, _contextObjectType(configId, self.typeName)
+        )
+        self.index = index + 1
+        return self.current
+
+
+class ConfigIdListIterator:
+    # ConfigObjects are created one at a time from AdminConfig list of ids,
+    # [id1 "id 2" id3], as the iteration proceeds
+    def __init__(self, configIds, typeName=None):
+        configIds = configIds.strip()
+        if configIds[:1] == '"' and configIds[-1:] == '"':
+            configIds = configIds[1:-1]
+        if configIds[:1] != '[' or configIds[-1:] != ']':
+            raise Exception('Invalid configuration id list: %s' % configIds)
+        self.configIds = configIds
+        self.typeName = typeName
+        self.position = 1
+        self.index = 0
+        self.current = None
+
+    def __getitem__(self, index):
+        if index == self.index - 1:
+            return self.current
+        if index != self.index:
+            raise Exception('Only sequential iteration is supported')
+        configIds = self.configIds
+        last = len(configIds) - 1
+        while self.position < last and configIds[self.position] == ' ':
+            self.position = self.position + 1
+        if self.position >= last:
+            raise IndexError(index)
+        if configIds[self.position] == '"':
+            end = configIds.find('"', self.position + 1) + 1
+            if end == 0:
+                raise Exception(
+                    'Invalid configuration id list: %s' % configIds
+                )
+        else:
+            end = configIds.find(' ', self.position)
+            if end < 0 or end > last:
+                end = last
+        configId = _parseConfigId(configIds[self.position:end])
+        self.position = end
+        self.current = ConfigObject(
+            configId, _contextObjectType(configId, self.typeName)
+        )
+        self.index = index + 1
+        return self.current
+
+
+class ChunkIterator:
+    # groups elements of any sequence or iterator into lists of given size
+    def __init__(self, sequence, size):
+        if size < 1:
+            raise Exception('Chunk size must be positive')
+        self.sequence = sequence
+        self.size = size
+        self.sourceIndex = 0
+        self.exhausted = 0
+
+    def __getitem__(self, index):
+        chunk = []
+        while not self.exhausted and len(chunk) < self.size:
+            try:
+                chunk.append(self.sequence[self.sourceIndex])
+                self.sourceIndex = self.sourceIndex + 1
+            except IndexError:
+                self.exhausted = 1
+        if not chunk:
+            raise IndexError(index)
+        return chunk
 
 
 class ConfigId:
     def __init__(self, name, xmlPath, xmlDoc, xmlId):
-        self.name = name
-        self.xmlPath = xmlPath
-        self.xmlDoc = xmlDoc
-        self.xmlId = xmlId
+        # ids are immutable, their string form and hash are computed once
+        d = self.__dict__
+        d['name'] = name
+        d['xmlPath'] = xmlPath
+        d['xmlDoc'] = xmlDoc
+        d['xmlId'] = xmlId
+        d['_str'] = "%s(%s|%s#%s)" % (name, xmlPath, xmlDoc, xmlId)
+        d['_hash'] = hash(d['_str'])
+
+    def __setattr__(self, name, value):
+        raise Exception('Configuration id %s is immutable' % self._str)
+
+    def __delattr__(self, name):
+        raise Exception('Configuration id %s is immutable' % self._str)
 
     def __eq__(self, other):
+        if self is other:
+            return 1
         if type(other) == type(self):
-            if str(self) == str(other):
+            if self._str == str(other):
                 return 1
         return 0
 
     def __hash__(self):
-        return hash(str(self))
+        return self._hash
 
     def __str__(self):
-        return "%s(%s|%s#%s)" % (
-            self.name, self.xmlPath, self.xmlDoc, self.xmlId
-        )
+        return self._str
 
     def __unicode__(self):
-        return unicode(self.__str__())
+        return unicode(self._str)
 
     def __repr__(self):
-        return "%s(%s|%s#%s)" % (
-            self.name, self.xmlPath, self.xmlDoc, self.xmlId
-        )
+        return self._str
 
 
 class TypeInfo:
@@ -391,6 +956,22 @@ class TypeInfo:
         self.parents = parents
         self.children = children
         self.converter = converter
+        self.descriptors = {}
+
+    def attributeDescriptor(self, name):
+        # (converter, list, reference, attributeInfo) resolved once
+        descriptor = self.descriptors.get(name)
+        if descriptor is None:
+            ai = self.attributes[name]
+            descriptor = self.descriptors[name] = (
+                getTypeInfo(ai.type).converter, ai.list, ai.reference, ai
+            )
+        return descriptor
+
+    def attributeTable(self):
+        for name in self.attributes.keys():
+            self.attributeDescriptor(name)
+        return self.descriptors.copy()
 
 
 class AttributeInfo:
@@ -412,9 +993,521 @@ class AttributeInfo:
         return '%s %s' % (self.name, self.type)
 
 
+class SessionAttributeCache:
+    # LRU cache of attribute values keyed by configuration id, changes made
+    # via WDR invalidate all objects stored in the modified document, direct
+    # AdminConfig calls and AdminTask commands not run via
+    # wdr.task.invokeTask require wdr.config.invalidateCaches
+    def __init__(self, maxSize=10000):
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.entries = {}
+        self.documents = {}
+        # entries form a circular list of [previous, next, id, attributes]
+        self.head = []
+        self.head[:] = [self.head, self.head, None, None]
+
+    def getAttribute(self, configObject, attributeName):
+        configId = configObject._id
+        entry = self.entries.get(configId)
+        if entry is None:
+            entry = self._add(configId)
+        else:
+            self._unlink(entry)
+            self._link(entry)
+        attributes = entry[3]
+        if attributes.has_key(attributeName):
+            self.hits = self.hits + 1
+            result = attributes[attributeName]
+        else:
+            self.misses = self.misses + 1
+            result = configObject._readConfigAttribute(attributeName)
+            attributes[attributeName] = result
+        if isinstance(result, ListType):
+            return result[:]
+        return result
+
+    def invalidate(self, configObject=None):
+        if configObject is None:
+            self.entries.clear()
+            self.documents.clear()
+            self.head[:] = [self.head, self.head, None, None]
+            return
+        configId = configObject._id
+        document = self.documents.get((configId.xmlPath, configId.xmlDoc))
+        if document:
+            for entry in document.values():
+                self._remove(entry)
+
+    def statistics(self):
+        return {
+            'hits': self.hits, 'misses': self.misses,
+            'evictions': self.evictions, 'size': len(self.entries),
+            'maxSize': self.maxSize,
+        }
+
+    def _add(self, configId):
+        entry = [None, None, configId, {}]
+        self._link(entry)
+        self.entries[configId] = entry
+        documentKey = (configId.xmlPath, configId.xmlDoc)
+        document = self.documents.get(documentKey)
+        if document is None:
+            document = self.documents[documentKey] = {}
+        document[configId] = entry
+        while len(self.entries) > self.maxSize:
+            self._remove(self.head[1])
+            self.evictions = self.evictions + 1
+        return entry
+
+    def _remove(self, entry):
+        configId = entry[2]
+        self._unlink(entry)
+        del self.entries[configId]
+        documentKey = (configId.xmlPath, configId.xmlDoc)
+        document = self.documents[documentKey]
+        del document[configId]
+        if not document:
+            del self.documents[documentKey]
+
+    def _link(self, entry):
+        head = self.head
+        last = head[0]
+        entry[0] = last
+        entry[1] = head
+        last[1] = entry
+        head[0] = entry
+
+    def _unlink(self, entry):
+        entry[0][1] = entry[1]
+        entry[1][0] = entry[0]
+
+
+class ContainmentIndex:
+    # direct children of configuration objects by type; every type is listed
+    # once and grouped by document, children are assigned to parents sharing
+    # their document using the child attributes of those parents
+    def __init__(self):
+        self.objects = {}
+        self.documentTypes = {}
+        self.containers = {}
+        self.readParents = {}
+        self.entries = {}
+        self.dependents = {}
+
+    def children(self, scope, _type):
+        key = (scope._id, _type)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = self._build(scope, _type)
+            self.dependents.setdefault(scope._id.xmlPath, {})[key] = 1
+        return entry[:]
+
+    def objectCreated(self, parent, configObject):
+        configId = configObject._id
+        document = (configId.xmlPath, configId.xmlDoc)
+        objects = self.objects.get(configObject._type)
+        if objects is not None:
+            objects.setdefault(document, []).append(configObject)
+            self.documentTypes.setdefault(document, {})[
+                configObject._type
+            ] = 1
+        containers = self.containers.get(document)
+        if containers is not None:
+            containers[configId] = parent._id
+        entry = self.entries.get((parent._id, configObject._type))
+        if entry is not None:
+            entry.append(configObject)
+
+    def objectModified(self, configObject, attributeNames=None):
+        # nested attribute values may create or remove children
+        typeInfo = getTypeInfo(configObject._type)
+        types = {}
+        for name in attributeNames or typeInfo.attributes.keys():
+            if not typeInfo.attributes.has_key(name):
+                continue
+            (converter, _, reference, ai) = typeInfo.attributeDescriptor(name)
+            if converter is None and not reference:
+                types[ai.type] = 1
+        if types:
+            self._invalidate(configObject._id, types)
+
+    def objectRemoved(self, configObject):
+        self._invalidate(configObject._id, {})
+
+    def clear(self):
+        self.objects.clear()
+        self.documentTypes.clear()
+        self.containers.clear()
+        self.readParents.clear()
+        self.entries.clear()
+        self.dependents.clear()
+
+    def _invalidate(self, configId, types):
+        document = (configId.xmlPath, configId.xmlDoc)
+        types.update(self.documentTypes.get(document, {}))
+        for _type in types.keys():
+            if self.objects.has_key(_type):
+                del self.objects[_type]
+        for d in (self.documentTypes, self.containers, self.readParents):
+            if d.has_key(document):
+                del d[document]
+        # lookups within any directory enclosing the document
+        path = configId.xmlPath
+        while path:
+            for key in self.dependents.get(path, {}).keys():
+                if self.entries.has_key(key):
+                    del self.entries[key]
+            if self.dependents.has_key(path):
+                del self.dependents[path]
+            path = path[:max(path.rfind('/'), 0)]
+
+    def _build(self, scope, _type):
+        logger.debug('indexing %s objects within %s', _type, scope)
+        scopeId = scope._id
+        prefix = scopeId.xmlPath + '/'
+        result = []
+        unresolved = []
+        documents = self._objectsByDocument(_type).items()
+        documents.sort()
+        for (document, candidates) in documents:
+            if document[0] != scopeId.xmlPath and (
+                not document[0].startswith(prefix)
+            ):
+                continue
+            containers = self._containers(document, scope, _type)
+            for c in candidates:
+                parentId = containers.get(c._id)
+                if parentId is None:
+                    unresolved.append(c)
+                elif parentId == scopeId:
+                    result.append(c)
+        if unresolved:
+            result.extend(self._resolveByDirectory(scope, _type, unresolved))
+        return result
+
+    def _resolveByDirectory(self, scope, _type, candidates):
+        # document roots belong to the nearest object owning the directory
+        # of their document, e.g. a Server owns servers/<name>
+        owners = {}
+        for parentType in getTypeInfo(_type).parents + [scope._type]:
+            for (document, objects) in self._objectsByDocument(
+                parentType
+            ).items():
+                for o in objects:
+                    if document[0].split('/')[-1] == o._id.name:
+                        owners[document[0]] = o._id
+        result = []
+        remaining = []
+        for c in candidates:
+            path = c._id.xmlPath
+            while path and owners.get(path, c._id) == c._id:
+                path = path[:max(path.rfind('/'), 0)]
+            if not path:
+                remaining.append(c)
+            elif owners[path] == scope._id:
+                result.append(c)
+        if remaining:
+            # contained in objects of types not declared as parents
+            scoped = {}
+            for c in scope.listConfigObjects(_type):
+                scoped[c._id] = 1
+            for c in remaining:
+                if scoped.has_key(c._id):
+                    result.append(c)
+        return result
+
+    def _objectsByDocument(self, _type):
+        objects = self.objects.get(_type)
+        if objects is None:
+            objects = self.objects[_type] = {}
+            for o in listConfigObjects(_type):
+                document = (o._id.xmlPath, o._id.xmlDoc)
+                objects.setdefault(document, []).append(o)
+                self.documentTypes.setdefault(document, {})[_type] = 1
+        return objects
+
+    def _containers(self, document, scope, _type):
+        containers = self.containers.setdefault(document, {})
+        readParents = self.readParents.setdefault(document, {})
+        parentObjects = []
+        if (scope._id.xmlPath, scope._id.xmlDoc) == document:
+            parentObjects.append(scope)
+        for parentType in getTypeInfo(_type).parents:
+            parentObjects.extend(
+                self._objectsByDocument(parentType).get(document, [])
+            )
+        for parent in parentObjects:
+            if not readParents.has_key(parent._id):
+                readParents[parent._id] = 1
+                self._readChildren(parent, containers)
+        return containers
+
+    def _readChildren(self, parent, containers):
+        typeInfo = getTypeInfo(parent._type)
+        for (name, value) in parent.getAllAttributes().items():
+            if not typeInfo.attributes.has_key(name):
+                continue
+            if typeInfo.attributes[name].reference:
+                continue
+            if type(value) != ListType:
+                value = [value]
+            for v in value:
+                if isinstance(v, ConfigObject):
+                    containers[v._id] = parent._id
+
+
+class QueryCache:
+    # results of AdminConfig.getid keyed by normalized containment path,
+    # AdminTask commands not run via wdr.task.invokeTask leave it stale
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def getid(self, criteriaString):
+        key = self._normalize(criteriaString)
+        result = self.entries.get(key)
+        if result is None:
+            self.misses = self.misses + 1
+            result = self.entries[key] = _getidConfigIds(criteriaString)
+        else:
+            self.hits = self.hits + 1
+        return result[:]
+
+    def clear(self):
+        if self.entries:
+            self.invalidations = self.invalidations + 1
+            self.entries.clear()
+
+    def statistics(self):
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+        }
+
+    def _normalize(self, criteriaString):
+        segments = [
+            s.strip() for s in split(criteriaString, '/') if s.strip()
+        ]
+        return '/' + join(segments, '/') + '/'
+
+
+class AttributeIndex:
+    # values of a simple attribute for all objects of a type, built with
+    # a single pass over AdminConfig.list and kept current by WDR writes
+    def __init__(self, type, attributeName):
+        self.type = type
+        self.attributeName = attributeName
+        self.values = None
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+
+    def matches(self, configObject, value, attributeCache):
+        if self.values is None:
+            _buildAttributeIndexes(self.type)
+        configId = configObject._id
+        if self.values.has_key(configId):
+            self.hits = self.hits + 1
+            return self.values[configId] == value
+        # objects created or modified since the index was built
+        self.misses = self.misses + 1
+        current = attributeCache.getAttribute(configObject, self.attributeName)
+        self.values[configId] = current
+        return current == value
+
+    def forget(self, configObject):
+        if self.values is not None and self.values.has_key(configObject._id):
+            del self.values[configObject._id]
+
+    def clear(self):
+        self.values = None
+
+    def statistics(self):
+        if self.values is None:
+            size = 0
+        else:
+            size = len(self.values)
+        return {
+            'size': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'builds': self.builds,
+        }
+
+
+def _buildAttributeIndexes(type):
+    startTime = time.time()
+    indexes = [i for i in _attributeIndexes[type].values() if i.values is None]
+    for index in indexes:
+        index.values = {}
+        index.builds = index.builds + 1
+    objects = listConfigObjects(type)
+    for obj in objects:
+        if len(indexes) == 1:
+            indexes[0].values[obj._id] = obj._getConfigAttribute(
+                indexes[0].attributeName
+            )
+        else:
+            attributes = obj.getAllAttributes()
+            for index in indexes:
+                index.values[obj._id] = attributes.get(index.attributeName)
+    logger.debug(
+        'built %d attribute indexes for %d objects of type %s'
+        ' in %.2f seconds',
+        len(indexes), len(objects), type, (time.time() - startTime)
+    )
+
+
+class ConfigBatch:
+    # Journal of modifications & unsets, merged into at most three
+    # AdminConfig calls per object on commit. Creates are not deferred,
+    # callers need ids of new objects, pending changes of the parent get
+    # applied before the create though. Same happens to pending changes of
+    # an object being read via ConfigObject.
+    def __init__(self, readBack=0):
+        self.readBack = readBack
+        self.entries = {}
+        self.order = []
+
+    def record(self, configObject, unsetNames, atomicAttributes, lists):
+        configId = configObject._id
+        entry = self.entries.get(configId)
+        if entry is None:
+            entry = self.entries[configId] = _PendingChanges(configObject)
+            self.order.append(configId)
+        for name in unsetNames:
+            entry.record(name, 'unset', None)
+        for (name, value) in atomicAttributes:
+            entry.record(name, 'atomic', value)
+        for (name, value) in lists:
+            entry.record(name, 'list', value)
+
+    def flush(self, configObject):
+        entry = self.entries.get(configObject._id)
+        if entry is not None:
+            del self.entries[configObject._id]
+            self._apply(entry)
+
+    def forget(self, configObject):
+        if self.entries.has_key(configObject._id):
+            del self.entries[configObject._id]
+
+    def commit(self):
+        self._finish()
+        for configId in self.order:
+            entry = self.entries.get(configId)
+            if entry is not None:
+                del self.entries[configId]
+                self._apply(entry)
+        self.order = []
+
+    def discard(self):
+        self._finish()
+        self.entries.clear()
+        self.order = []
+
+    def _finish(self):
+        if _activeBatch is not self:
+            raise Exception('Configuration batch is not active')
+        wdr.config._activeBatch = None
+
+    def _apply(self, entry):
+        configObject = entry.configObject
+        unsetNames = []
+        atomicAttributes = []
+        lists = []
+        for name in entry.names:
+            (kind, value) = entry.changes[name]
+            if kind == 'unset':
+                unsetNames.append(name)
+            elif kind == 'atomic':
+                atomicAttributes.append([name, value])
+            elif configObject._currentListValue(name) != value:
+                lists.append([name, value])
+                _countModifications(1, 0)
+            else:
+                _countModifications(0, 1)
+        logger.debug(
+            'applying batched changes to ConfigObject %s: unset %s,'
+            ' modify %s, modify lists %s',
+            configObject, unsetNames, atomicAttributes, lists
+        )
+        if unsetNames:
+            AdminConfig.unsetAttributes(str(configObject), unsetNames)
+        # lists are being cleared before assigning new values
+        modifyAttributes = atomicAttributes + [[n, []] for (n, v) in lists]
+        if modifyAttributes:
+            AdminConfig.modify(str(configObject), modifyAttributes)
+        if lists:
+            AdminConfig.modify(str(configObject), lists)
+        if unsetNames or modifyAttributes:
+            _configObjectModified(
+                configObject,
+                unsetNames + [n for (n, v) in modifyAttributes]
+            )
+        if self.readBack:
+            for name in entry.names:
+                logger.debug(
+                    'value of %s has been written to attribute %s'
+                    ' of ConfigObject %s',
+                    configObject._getConfigAttribute(name), name,
+                    configObject
+                )
+
+
+class _PendingChanges:
+    def __init__(self, configObject):
+        self.configObject = configObject
+        self.names = []
+        self.changes = {}
+
+    def record(self, name, kind, value):
+        if not self.changes.has_key(name):
+            self.names.append(name)
+        self.changes[name] = (kind, value)
+
+
 class AttributeValueCache:
     def __init__(self):
         self.cache = {}
+        self.types = {}
+        self.lookups = {}
+
+    def prefetch(self, configObjects):
+        # one AdminConfig.show per object, attributes not being shown are
+        # still read one by one on first use; shown attributes are returned
+        # by configuration id
+        result = {}
+        for configObject in configObjects:
+            try:
+                attributes = configObject.getAllAttributes()
+            except ValueError:
+                logger.debug(
+                    'unable to prefetch attributes of ConfigObject %s',
+                    configObject
+                )
+                continue
+            oid = str(configObject)
+            objectCache = self.cache[oid] = self.cache.get(oid, {})
+            objectCache.update(attributes)
+            self.types[oid] = configObject._type
+            result[oid] = attributes
+        return result
+
+    def objectType(self, configObject):
+        # types of prefetched objects are known without asking AdminConfig
+        if not configObject.__dict__.has_key('_type'):
+            typeName = self.types.get(str(configObject))
+            if typeName is not None:
+                configObject._type = typeName
+        return configObject._type
 
     def getAttribute(self, configObject, attributeName):
         oid = str(configObject)
@@ -425,9 +1518,26 @@ class AttributeValueCache:
         objectCache[attributeName] = result
         return result
 
+    def children(self, configObject, typeName):
+        # objects of given type found by ConfigObject.lookup
+        key = (str(configObject), typeName)
+        result = self.lookups.get(key)
+        if result is None:
+            result = self.lookups[key] = configObject.lookup(
+                typeName, {}, None, self
+            )
+        return result[:]
+
+    def invalidateChildren(self, configObject=None, typeName=None):
+        if configObject is None:
+            self.lookups.clear()
+        elif self.lookups.has_key((str(configObject), typeName)):
+            del self.lookups[(str(configObject), typeName)]
+
     def invalidate(self, configObject=None, attributeName=None):
         if configObject is None:
             self.cache.clear()
+            self.lookups.clear()
             return
         oid = str(configObject)
         if self.cache.has_key(oid):
@@ -439,9 +1549,15 @@ class AttributeValueCache:
 
 
 class ConfigObject:
-    def __init__(self, _id):
+    # class-level defaults keep instances small until prefetch is used
+    _snapshot = None
+    _snapshotGeneration = 0
+
+    def __init__(self, _id, _type=None):
         self._id = _id
-        self._type = getObjectType(_id)
+        # object type gets resolved on first use unless known from context
+        if _type:
+            self._type = _type
 
     def __str__(self):
         return str(self._id)
@@ -459,8 +1575,12 @@ class ConfigObject:
         return 1
 
     def __eq__(self, other):
+        if self is other:
+            return 1
         if type(other) == type(self):
-            if str(self) == str(other):
+            if self._id is other.__dict__.get('_id'):
+                return 1
+            if str(self._id) == str(other):
                 return 1
         return 0
 
@@ -468,7 +1588,10 @@ class ConfigObject:
         return hash(self._id)
 
     def __getattr__(self, name):
-        if name == '__methods__':
+        if name == '_type':
+            self._type = _resolveObjectType(self._id)
+            return self._type
+        elif name == '__methods__':
             return {
                 'listConfigObjects': self.listConfigObjects,
                 'create': self.create,
@@ -481,6 +1604,24 @@ class ConfigObject:
             return self._getConfigAttribute(name)
 
     def _getConfigAttribute(self, name):
+        if _activeBatch is not None:
+            _activeBatch.flush(self)
+        if _attributeCache is not None:
+            return _attributeCache.getAttribute(self, name)
+        return self._readConfigAttribute(name)
+
+    def _readConfigAttribute(self, name):
+        if _attributePrefetch:
+            snapshot = self._getAttributeSnapshot()
+            if not snapshot.has_key(name):
+                snapshot[name] = self._showConfigAttribute(name)
+            v = snapshot[name]
+            if isinstance(v, ListType):
+                return v[:]
+            return v
+        return self._showConfigAttribute(name)
+
+    def _showConfigAttribute(self, name):
         logger.debug('retrieving attribute %s from ConfigObject %s', name, self)
         v = AdminConfig.showAttribute(str(self), name)
         logger.debug(
@@ -489,14 +1630,32 @@ class ConfigObject:
         )
         return self._processAttributeValue(name, v)
 
+    def _getAttributeSnapshot(self):
+        if (
+            self._snapshot is None
+            or
+            self._snapshotGeneration != _attributeSnapshotGeneration
+        ):
+            self._snapshotGeneration = _attributeSnapshotGeneration
+            try:
+                self._snapshot = self.getAllAttributes()
+            except ValueError:
+                # AdminConfig.show output can't be parsed when values span
+                # multiple lines, such objects are read attribute by attribute
+                logger.debug(
+                    'unable to prefetch attributes of ConfigObject %s', self
+                )
+                self._snapshot = {}
+        return self._snapshot
+
     def _processAttributeValue(self, name, v):
-        ai = getTypeInfo(self._type).attributes[name]
-        ti = getTypeInfo(ai.type)
-        cnv = ti.converter
+        (cnv, isList, isReference, ai) = (
+            getTypeInfo(self._type).attributeDescriptor(name)
+        )
         if v is None:
             return None
         if cnv:
-            if ai.list:
+            if isList:
                 if v == '[]':
                     return []
                 else:
@@ -504,19 +1663,28 @@ class ConfigObject:
             else:
                 return cnv.fromAdminConfig(v)
         else:
-            if ai.list:
-                return map(lambda e: ConfigObject(e), _parseConfigIdList(v))
+            if isList:
+                return map(
+                    lambda e, ai=ai: ConfigObject(
+                        e, _contextObjectType(e, ai.type, ai.subTypes)
+                    ),
+                    _parseConfigIdList(v)
+                )
             else:
-                return ConfigObject(_parseConfigId(v))
+                configId = _parseConfigId(v)
+                return ConfigObject(
+                    configId,
+                    _contextObjectType(configId, ai.type, ai.subTypes)
+                )
 
     def _processAttributeValueFromList(self, name, v):
-        ai = getTypeInfo(self._type).attributes[name]
-        ti = getTypeInfo(ai.type)
-        cnv = ti.converter
+        (cnv, isList, isReference, ai) = (
+            getTypeInfo(self._type).attributeDescriptor(name)
+        )
         if v is None:
             return None
         if cnv:
-            if ai.list:
+            if isList:
                 if v == '[]':
                     return []
                 else:
@@ -531,12 +1699,23 @@ class ConfigObject:
                     v = v[1:-1]
                 return cnv.fromAdminConfig(v)
         else:
-            if ai.list:
-                return map(lambda e: ConfigObject(e), _parseConfigIdList(v))
+            if isList:
+                return map(
+                    lambda e, ai=ai: ConfigObject(
+                        e, _contextObjectType(e, ai.type, ai.subTypes)
+                    ),
+                    _parseConfigIdList(v)
+                )
             else:
-                return ConfigObject(_parseConfigId(v))
+                configId = _parseConfigId(v)
+                return ConfigObject(
+                    configId,
+                    _contextObjectType(configId, ai.type, ai.subTypes)
+                )
 
     def getAllAttributes(self):
+        if _activeBatch is not None:
+            _activeBatch.flush(self)
         logger.debug('retrieving all attributes ConfigObject %s', self)
         showResult = AdminConfig.show(str(self))
         attributes = {}
@@ -549,7 +1728,7 @@ class ConfigObject:
         return attributes
 
     def __setattr__(self, name, value):
-        if name in ['_id', '_type']:
+        if name in ['_id', '_type', '_snapshot', '_snapshotGeneration']:
             self.__dict__[name] = value
             return value
         else:
@@ -564,6 +1743,9 @@ class ConfigObject:
             value, name, self
         )
         self._modify([(name, value)])
+        if _activeBatch is not None:
+            # the value is not written until the batch gets committed
+            return value
         v = self._getConfigAttribute(name)
         logger.debug(
             'value of %s has been written to attribute %s of ConfigObject %s',
@@ -572,19 +1754,31 @@ class ConfigObject:
         return v
 
     def __delitem__(self, name):
-        AdminConfig.unsetAttributes(str(self), [name])
+        self.unset([name])
         return None
 
     def __delattr__(self, name):
-        AdminConfig.unsetAttributes(str(self), [name])
+        self.unset([name])
         return None
 
     def listConfigObjects(self, _type):
+        if _activeBatch is not None:
+            _activeBatch.flush(self)
         result = []
         for l in AdminConfig.list(_type, str(self)).splitlines():
-            result.append(ConfigObject(_parseConfigId(l)))
+            configId = _parseConfigId(l)
+            result.append(
+                ConfigObject(configId, _contextObjectType(configId, _type))
+            )
         return result
 
+    def iterConfigObjects(self, _type):
+        if _activeBatch is not None:
+            _activeBatch.flush(self)
+        return ConfigIdLinesIterator(
+            AdminConfig.list(_type, str(self)), _type
+        )
+
     def create(self, _type, _propertyName=None, **_attributes):
         createAttributes = []
         for (k, v) in _attributes.items():
@@ -592,6 +1786,8 @@ class ConfigObject:
         return self._create(_type, _propertyName, createAttributes)
 
     def _create(self, type, propertyName, attributes):
+        if _activeBatch is not None:
+            _activeBatch.flush(self)
         logger.debug(
             'creating object %s with attributes %s for property %s.%s',
             type, attributes, str(self), propertyName
@@ -602,16 +1798,25 @@ class ConfigObject:
             )
         else:
             newConfigId = AdminConfig.create(type, str(self), attributes)
+        _invalidateCachedAttributes(self)
+        if _queryCache is not None:
+            _queryCache.clear()
         logger.debug('created %s', newConfigId)
-        return ConfigObject(_parseConfigId(newConfigId))
+        result = ConfigObject(_parseConfigId(newConfigId), type)
+        if _containmentIndex is not None:
+            _containmentIndex.objectCreated(self, result)
+        return result
 
     def modify(self, **_attributes):
         modifyAttributes = []
         for (k, v) in _attributes.items():
             modifyAttributes.append([k, v])
-        return self._modify(modifyAttributes)
+        self._modify(modifyAttributes)
+        return self
 
-    def _modify(self, attributes):
+    def _modify(self, attributes, attributeCache=None):
+        # names of the attributes actually changed are returned
+        changed = []
         if len(attributes) > 0:
             logger.debug(
                 'modifying object %s with attributes %s', self, attributes
@@ -619,14 +1824,23 @@ class ConfigObject:
             emptyAttributes = []
             atomicAttributes = []
             listAttributes = []
+            typeInfo = getTypeInfo(self._type)
+            # current values are compared only if they are likely cached,
+            # batches compare list values on commit
+            checkCurrent = (
+                _activeBatch is None
+                and
+                (attributeCache is not None or _attributeCache is not None)
+            )
+            skipped = 0
             for (name, value) in attributes:
                 if value is None:
                     emptyAttributes.append(name)
                 else:
-                    ai = getTypeInfo(self._type).attributes[name]
-                    ti = getTypeInfo(ai.type)
-                    cnv = ti.converter
-                    if ai.list:
+                    (cnv, isList, isReference, ai) = (
+                        typeInfo.attributeDescriptor(name)
+                    )
+                    if isList:
                         if cnv:
                             v = join(map(cnv.toAdminConfig, value), ';')
                         else:
@@ -637,35 +1851,87 @@ class ConfigObject:
                             v = cnv.toAdminConfig(value)
                         else:
                             v = str(value)
-                        atomicAttributes.append([name, v])
-            self.unset(emptyAttributes)
-            self._modifyAtomic(atomicAttributes)
-            self._modifyList(listAttributes)
-        return self
+                        if (
+                            checkCurrent
+                            and
+                            self._currentAtomicValue(name, attributeCache) == v
+                        ):
+                            skipped = skipped + 1
+                        else:
+                            atomicAttributes.append([name, v])
+            _countModifications(
+                len(emptyAttributes) + len(atomicAttributes), skipped
+            )
+            changed.extend(emptyAttributes)
+            changed.extend([n for (n, v) in atomicAttributes])
+            if _activeBatch is not None:
+                _activeBatch.record(
+                    self, emptyAttributes, atomicAttributes, listAttributes
+                )
+                changed.extend([n for (n, v) in listAttributes])
+            else:
+                self.unset(emptyAttributes)
+                self._modifyAtomic(atomicAttributes)
+                changed.extend(
+                    self._modifyList(listAttributes, attributeCache)
+                )
+        return changed
 
     def _modifyAtomic(self, atomicAttributes):
         if len(atomicAttributes) > 0:
             AdminConfig.modify(str(self), atomicAttributes)
+            _configObjectModified(self, [n for (n, v) in atomicAttributes])
 
-    def _modifyList(self, listAttributes):
+    def _modifyList(self, listAttributes, attributeCache=None):
+        changed = []
         for (n, v) in listAttributes:
-            currentValue = self._getConfigAttribute(n)
-            ai = getTypeInfo(self._type).attributes[n]
-            ti = getTypeInfo(ai.type)
-            cnv = ti.converter
-            if cnv:
-                currentValue = join(
-                    map(cnv.toAdminConfig, currentValue), ';'
-                )
-            else:
-                currentValue = map(lambda e: str(e), currentValue)
-            if currentValue != v:
+            if self._currentListValue(n, attributeCache) != v:
                 AdminConfig.modify(str(self), [[n, []]])
                 AdminConfig.modify(str(self), [[n, v]])
+                _configObjectModified(self, [n])
+                _countModifications(1, 0)
+                changed.append(n)
+            else:
+                _countModifications(0, 1)
+        return changed
+
+    def _currentListValue(self, n, attributeCache=None):
+        if attributeCache is not None:
+            currentValue = attributeCache.getAttribute(self, n)
+        else:
+            currentValue = self._getConfigAttribute(n)
+        cnv = getTypeInfo(self._type).attributeDescriptor(n)[0]
+        if cnv:
+            return join(map(cnv.toAdminConfig, currentValue), ';')
+        else:
+            return map(lambda e: str(e), currentValue)
+
+    def _currentAtomicValue(self, n, attributeCache=None):
+        if attributeCache is not None:
+            currentValue = attributeCache.getAttribute(self, n)
+        else:
+            currentValue = self._getConfigAttribute(n)
+        # unset attributes are never considered being up to date
+        if currentValue is None:
+            return None
+        cnv = getTypeInfo(self._type).attributeDescriptor(n)[0]
+        if cnv:
+            return cnv.toAdminConfig(currentValue)
+        else:
+            return str(currentValue)
 
     def remove(self):
         logger.debug('removing object %s', self)
+        if _activeBatch is not None:
+            _activeBatch.forget(self)
         AdminConfig.remove(str(self))
+        # removal affects parents and referrers, possibly in other documents
+        _invalidateCachedAttributes()
+        if _containmentIndex is not None:
+            _containmentIndex.objectRemoved(self)
+        _forgetIndexedObject(self)
+        if _queryCache is not None:
+            _queryCache.clear()
         return self
 
     def unset(self, _attributes):
@@ -673,7 +1939,11 @@ class ConfigObject:
             logger.debug(
                 'unsetting attributes %s of ConfigObject %s', _attributes, self
             )
-            AdminConfig.unsetAttributes(str(self), _attributes)
+            if _activeBatch is not None:
+                _activeBatch.record(self, _attributes, [], [])
+            else:
+                AdminConfig.unsetAttributes(str(self), _attributes)
+                _configObjectModified(self, _attributes)
         return self
 
     def lookup1(self, _type, _criteria, _propertyName=None):
@@ -707,7 +1977,9 @@ class ConfigObject:
                 _type, _criteria, _propertyName, attributeCache
             )
         )
-        return self._filterCandidates(candidates, _criteria, attributeCache)
+        return self._filterCandidates(
+            candidates, _criteria, attributeCache, _type
+        )
 
     def _lookupCandidatesInProperty(
         self, _type, _criteria, _propertyName=None, attributeCache=None
@@ -735,7 +2007,7 @@ class ConfigObject:
             myName = ''
             if getTypeInfo(self._type).attributes.has_key('name'):
                 myName = attributeCache.getAttribute(self, 'name')
-            if self._type in parents(_type):
+            if self._type in getTypeInfo(_type).parents:
                 indexedParents = getid('/%s:%s/' % (self._type, myName))
                 indexedCandidates = getid(
                     '/%s:%s/%s:%s/'
@@ -744,9 +2016,12 @@ class ConfigObject:
                 if len(indexedParents) == 1:
                     return indexedCandidates
                 else:
+                    indexed = {}
+                    for c in indexedCandidates:
+                        indexed[c] = 1
                     return [
                         c for c in self.listConfigObjects(_type)
-                        if c in indexedCandidates
+                        if indexed.has_key(c)
                     ]
         return []
 
@@ -754,14 +2029,16 @@ class ConfigObject:
         self, _type, _criteria, _propertyName, attributeCache
     ):
         if _propertyName is None:
-            if self._type not in parents(_type):
+            if self._type not in getTypeInfo(_type).parents:
+                if _containmentIndex is not None:
+                    return _containmentIndex.children(self, _type)
                 logger.warning(
                     'using suboptimal lookup of %s objects within %s',
                     _type, self._type
                 )
                 candidates = self.listConfigObjects(_type)
                 # exclude grandchildren
-                for parentType in parents(_type):
+                for parentType in getTypeInfo(_type).parents:
                     if parentType != self._type:
                         for child in self.listConfigObjects(parentType):
                             for grandchild in child.listConfigObjects(_type):
@@ -770,13 +2047,13 @@ class ConfigObject:
                 return candidates
         return []
 
-    def _filterCandidates(self, candidates, criteria, attributeCache):
+    def _filterCandidates(
+        self, candidates, criteria, attributeCache, _type=None
+    ):
+        indexedCriteria = _indexedCriteria(_type, criteria)
         result = []
         for obj in candidates:
-            for (k, v) in criteria.items():
-                if attributeCache.getAttribute(obj, k) != v:
-                    break
-            else:
+            if _matchesCriteria(obj, indexedCriteria, attributeCache):
                 result.append(obj)
         return result
 
@@ -796,7 +2073,8 @@ class ConfigObject:
                 % _criteria
             )
         else:
-            return result[0]._modify([[x, y] for (x, y) in _attributes.items()])
+            result[0]._modify([[x, y] for (x, y) in _attributes.items()])
+            return result[0]
 
 
 def initializeTypeRegistry():
@@ -810,6 +2088,460 @@ def initializeTypeRegistry():
             'full initialization of type registry completed in %.2f seconds',
             (time.time() - startTime)
         )
+        saveTypeRegistryCache()
+
+
+def _defaultCacheDirectory():
+    # wdr.sh/wdr.bat point python.cachedir to ~/.wdr/cache/<runtime>, the
+    # directory is reused when wsadmin has been launched that way
+    try:
+        import java.lang
+        homeDir = java.lang.System.getProperty('user.home')
+        cacheDir = java.lang.System.getProperty('python.cachedir')
+    except ImportError:
+        homeDir = os.path.expanduser('~')
+        cacheDir = None
+    wdrCacheDir = os.path.join(homeDir, '.wdr', 'cache')
+    if cacheDir:
+        cacheDir = os.path.normpath(os.path.abspath(cacheDir))
+        if os.path.dirname(cacheDir) == os.path.normpath(wdrCacheDir):
+            return cacheDir
+    return os.path.join(wdrCacheDir, 'default')
+
+
+def _wasVersion():
+    # None when the version cannot be determined
+    try:
+        if AdminControl and AdminControl.adminClient:
+            serverName = AdminControl.completeObjectName(
+                'type=Server,node=%s,process=%s,*'
+                % (AdminControl.node, AdminControl.processName)
+            )
+            return AdminControl.getAttribute(serverName, 'platformVersion')
+        if AdminTask:
+            for node in AdminConfig.list('Node').splitlines():
+                return AdminTask.getNodeBaseProductVersion(
+                    ['-nodeName', _parseConfigId(node).name]
+                )
+    except wdr.util.SCRIPTING_EXCEPTIONS + (AttributeError, TypeError):
+        # wsadmin objects may be missing or replaced by offline repositories
+        logger.warning('unable to determine WebSphere version', exc_info=1)
+    return None
+
+
+def _cellName():
+    for cell in AdminConfig.list('Cell').splitlines():
+        return _parseConfigId(cell).name
+    return None
+
+
+def _typeRegistryCacheFilename(cacheDir=None):
+    # caches are kept per version and cell, None when either is not known
+    version = _wasVersion()
+    cellName = _cellName()
+    if not version or not cellName:
+        return None
+    cacheDir = cacheDir or _defaultCacheDirectory()
+    return os.path.join(
+        cacheDir,
+        re.sub(
+            r'[^a-zA-Z0-9_\.\-]', '_',
+            'typeRegistry-%s-%s.cache' % (version, cellName)
+        )
+    )
+
+
+def enableTypeRegistryCache(cacheDir=None, rebuild=0):
+    filename = _typeRegistryCacheFilename(cacheDir)
+    if filename is None:
+        logger.warning(
+            'WebSphere version or cell name is not known,'
+            ' type registry cache is not used'
+        )
+        wdr.config._typeRegistryCacheFile = None
+        return
+    logger.debug('using type registry cache file %s', filename)
+    wdr.config._typeRegistryCacheFile = filename
+    if not wdr.config._typeRegistryCacheExitHook:
+        try:
+            import atexit
+            atexit.register(saveTypeRegistryCache)
+        except ImportError:
+            pass
+        wdr.config._typeRegistryCacheExitHook = 1
+    if rebuild:
+        rebuildTypeRegistryCache()
+    elif os.path.isfile(filename):
+        _loadTypeRegistryCache(filename)
+
+
+def disableTypeRegistryCache():
+    saveTypeRegistryCache()
+    wdr.config._typeRegistryCacheFile = None
+
+
+def rebuildTypeRegistryCache():
+    if not wdr.config._typeRegistryCacheFile:
+        raise Exception('Type registry cache is not enabled')
+    for typeInfo in _typeRegistry.values():
+        if typeInfo.converter is None:
+            del _typeRegistry[typeInfo.name]
+    wdr.config._typeRegistryInitialized = 0
+    wdr.config._typeRegistryCacheDirty = 1
+    initializeTypeRegistry()
+
+
+def saveTypeRegistryCache():
+    filename = wdr.config._typeRegistryCacheFile
+    if filename and wdr.config._typeRegistryCacheDirty:
+        _saveTypeRegistryCache(filename)
+        wdr.config._typeRegistryCacheDirty = 0
+
+
+def _joinNames(names):
+    if names is None:
+        return '-'
+    return ','.join(names)
+
+
+def _splitNames(value):
+    if value == '-':
+        return None
+    elif value:
+        return value.split(',')
+    else:
+        return []
+
+
+def _saveTypeRegistryCache(filename):
+    startTime = time.time()
+    dirname = os.path.dirname(filename)
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    tmpFilename = filename + '.tmp'
+    fo = open(tmpFilename, 'w')
+    try:
+        fo.write(
+            'WDR-TYPE-REGISTRY\t%d\t%d\n'
+            % (_typeRegistryCacheVersion, wdr.config._typeRegistryInitialized)
+        )
+        typeCount = 0
+        for typeInfo in _typeRegistry.values():
+            # built-in types come with converters and are never cached
+            if typeInfo.converter is not None:
+                continue
+            typeCount += 1
+            fo.write(
+                'T\t%s\t%s\t%s\n'
+                % (
+                    typeInfo.name, _joinNames(typeInfo.parents),
+                    _joinNames(typeInfo.children)
+                )
+            )
+            for ai in typeInfo.attributes.values():
+                fo.write(
+                    'A\t%s\t%s\t%d\t%d\t%s\t%s\n'
+                    % (
+                        ai.name, ai.type, ai.list, ai.reference,
+                        _joinNames(ai.enumValues), _joinNames(ai.subTypes)
+                    )
+                )
+    finally:
+        fo.close()
+    if os.path.exists(filename):
+        os.remove(filename)
+    os.rename(tmpFilename, filename)
+    logger.info(
+        'saved %d types to type registry cache %s in %.2f seconds',
+        typeCount, filename, (time.time() - startTime)
+    )
+
+
+def _loadTypeRegistryCache(filename):
+    startTime = time.time()
+    fi = open(filename, 'r')
+    try:
+        lines = fi.read().splitlines()
+    finally:
+        fi.close()
+    if not lines:
+        logger.warning('type registry cache %s is empty', filename)
+        return 0
+    header = lines[0].split('\t')
+    if header[0] != 'WDR-TYPE-REGISTRY' or (
+        int(header[1]) != _typeRegistryCacheVersion
+    ):
+        logger.warning(
+            'type registry cache %s has unsupported format, ignoring it',
+            filename
+        )
+        return 0
+    loadedTypes = {}
+    typeInfo = None
+    for l in lines[1:]:
+        fields = l.split('\t')
+        if fields[0] == 'T':
+            typeInfo = TypeInfo(
+                fields[1], {}, _splitNames(fields[2]), _splitNames(fields[3])
+            )
+            loadedTypes[typeInfo.name] = typeInfo
+        elif fields[0] == 'A':
+            typeInfo.attributes[fields[1]] = AttributeInfo(
+                fields[1], fields[2], int(fields[3]), int(fields[4]),
+                _splitNames(fields[5]), _splitNames(fields[6])
+            )
+    # types introspected during this session take precedence over the cache
+    for (typeName, typeInfo) in loadedTypes.items():
+        if not _typeRegistry.has_key(typeName):
+            _typeRegistry[typeName] = typeInfo
+    if int(header[2]):
+        wdr.config._typeRegistryInitialized = 1
+    logger.info(
+        'loaded %d types from type registry cache %s in %.2f seconds',
+        len(loadedTypes), filename, (time.time() - startTime)
+    )
+    return 1
+
+
+def snapshot(scope, filename):
+    # writes all objects within the scope to a snapshot file which can be
+    # opened with wdr.offline.openRepository
+    startTime = time.time()
+    initializeTypeRegistry()
+    fo = open(filename, 'w')
+    try:
+        writer = _SnapshotWriter(fo, scope)
+        writer.writeHeader()
+        count = writer.writeObjects()
+        writer.writeParents()
+    finally:
+        fo.close()
+    logger.info(
+        'snapshot of %s with %d objects written to %s in %.2f seconds',
+        scope, count, filename, (time.time() - startTime)
+    )
+    return count
+
+
+class _SnapshotWriter:
+    # Records are written one per line, fields are separated with tabs.
+    # Each string is written once as "=value", subsequent occurrences refer
+    # to it as "@index".
+    def __init__(self, fo, scope):
+        self.fo = fo
+        self.scope = scope
+        self.strings = {}
+        self.types = {}
+        self.expandedTypes = {}
+        self.listedTypes = {}
+        self.objects = [scope]
+        self.seen = {scope._id: 1}
+        self.containers = {}
+
+    def writeHeader(self):
+        self._writeRecord(
+            [
+                _snapshotHeader, str(_snapshotFormatVersion),
+                self._token(str(self.scope))
+            ]
+        )
+
+    def writeObjects(self):
+        # objects nested in attributes are found in the values of their
+        # parents, objects stored in other documents are listed once per
+        # type within the scope
+        position = 0
+        while position < len(self.objects):
+            obj = self.objects[position]
+            position += 1
+            for child in self.writeObject(obj):
+                self._add(child)
+            self._listDocumentChildren(obj._type)
+        return len(self.objects)
+
+    def writeObject(self, obj):
+        # returns objects contained in obj
+        typeInfo = getTypeInfo(obj._type)
+        self._writeType(typeInfo)
+        fields = ['O', self._token(str(obj)), self._token(obj._type)]
+        attributes = obj.getAllAttributes()
+        names = attributes.keys()
+        names.sort()
+        children = []
+        count = 0
+        for name in names:
+            value = attributes[name]
+            (cnv, isList, isReference, ai) = typeInfo.attributeDescriptor(name)
+            if value is None:
+                continue
+            if not isList:
+                value = [value]
+            if cnv:
+                kind = 'v'
+                items = map(cnv.toAdminConfig, value)
+            else:
+                if isReference:
+                    kind = 'r'
+                else:
+                    kind = 'c'
+                    for child in value:
+                        self.containers[child._id] = obj._id
+                    children.extend(value)
+                items = map(str, value)
+            fields.extend([self._token(name), kind, str(len(items))])
+            fields.extend(map(self._token, items))
+            count += 1
+        fields.insert(3, str(count))
+        self._writeRecord(fields)
+        return children
+
+    def writeParents(self):
+        # parents of objects not held in attributes of other objects, such
+        # as document roots, are written as separate records
+        roots = {}
+        for obj in self.objects:
+            if not self.containers.has_key(obj._id):
+                roots.setdefault(obj._id.xmlPath, []).append(obj)
+        for obj in self.objects:
+            if obj is self.scope or self.containers.has_key(obj._id):
+                continue
+            parent = self._documentParent(obj, roots)
+            if parent is not None:
+                self._writeRecord(
+                    ['P', self._token(str(obj)), self._token(str(parent))]
+                )
+
+    def _documentParent(self, obj, roots):
+        # the nearest document root enclosing the object's document whose
+        # type may contain it
+        parentTypes = getTypeInfo(obj._type).parents
+        path = obj._id.xmlPath
+        while path:
+            for candidate in roots.get(path, []):
+                if candidate is not obj and candidate._type in parentTypes:
+                    return candidate
+            path = path[:max(path.rfind('/'), 0)]
+        return None
+
+    def _add(self, obj):
+        if not self.seen.has_key(obj._id):
+            self.seen[obj._id] = 1
+            self.objects.append(obj)
+
+    def _listDocumentChildren(self, _type):
+        if self.expandedTypes.has_key(_type):
+            return
+        self.expandedTypes[_type] = 1
+        typeInfo = getTypeInfo(_type)
+        attributeTypes = {}
+        for ai in typeInfo.attributes.values():
+            attributeTypes[ai.type] = 1
+            for subType in ai.subTypes or []:
+                attributeTypes[subType] = 1
+        for childType in typeInfo.children:
+            if not attributeTypes.has_key(childType) and (
+                not self.listedTypes.has_key(childType)
+            ):
+                self.listedTypes[childType] = 1
+                for child in self.scope.listConfigObjects(childType):
+                    self._add(child)
+
+    def _writeType(self, typeInfo):
+        if self.types.has_key(typeInfo.name):
+            return
+        self.types[typeInfo.name] = 1
+        fields = [
+            'T', self._token(typeInfo.name),
+            self._token(_joinNames(typeInfo.parents)),
+            self._token(_joinNames(typeInfo.children)),
+            str(len(typeInfo.attributes))
+        ]
+        names = typeInfo.attributes.keys()
+        names.sort()
+        for name in names:
+            ai = typeInfo.attributes[name]
+            fields.extend(
+                [
+                    self._token(name), self._token(ai.type),
+                    '%d%d' % (ai.list, ai.reference),
+                    self._token(_joinNames(ai.enumValues)),
+                    self._token(_joinNames(ai.subTypes)),
+                ]
+            )
+        self._writeRecord(fields)
+
+    def _token(self, value):
+        index = self.strings.get(value)
+        if index is None:
+            self.strings[value] = len(self.strings)
+            return '=' + wdr.util.escapeField(value)
+        return '@%d' % index
+
+    def _writeRecord(self, fields):
+        self.fo.write(join(fields, '\t') + '\n')
+
+
+class _SnapshotReader:
+    def __init__(self, fi):
+        self.fi = fi
+        self.strings = []
+
+    def readHeader(self):
+        header = self.readRecord()
+        if not header or header[0] != _snapshotHeader or (
+            int(header[1]) != _snapshotFormatVersion
+        ):
+            raise Exception('unsupported snapshot format')
+        return header[2]
+
+    def readRecord(self):
+        line = self.fi.readline()
+        if not line:
+            return None
+        if line[-1:] == '\n':
+            line = line[:-1]
+        result = []
+        for field in line.split('\t'):
+            if field[:1] == '=':
+                value = wdr.util.unescapeField(field[1:])
+                self.strings.append(value)
+                result.append(value)
+            elif field[:1] == '@':
+                result.append(self.strings[int(field[1:])])
+            else:
+                result.append(field)
+        return result
+
+    def readType(self, record):
+        # converts T record into TypeInfo
+        attributes = {}
+        position = 5
+        for i in range(int(record[4])):
+            (name, typeName, flags, enumValues, subTypes) = (
+                record[position:position + 5]
+            )
+            attributes[name] = AttributeInfo(
+                name, typeName, int(flags[0]), int(flags[1]),
+                _splitNames(enumValues), _splitNames(subTypes)
+            )
+            position += 5
+        return TypeInfo(
+            record[1], attributes,
+            _splitNames(record[2]) or [], _splitNames(record[3]) or []
+        )
+
+    def readObject(self, record):
+        # converts O record into (id, type, [(name, kind, values)])
+        attributes = []
+        position = 4
+        for i in range(int(record[3])):
+            (name, kind, count) = record[position:position + 3]
+            position += 3
+            attributes.append(
+                (name, kind, record[position:position + int(count)])
+            )
+            position += int(count)
+        return (record[1], record[2], attributes)
 
 
 _typeRegistry = {
@@ -0,0 +1,251 @@
+from string import join
+import logging
+import random
+import time
+
+import wdr
+
+logger = logging.getLogger('wdr.instrumentation')
+
+_instrumentedObjectNames = (
+    'AdminApp', 'AdminConfig', 'AdminControl', 'AdminTask'
+)
+_instrumentedObjects = {}
+_statistics = None
+_reportFile = None
+_exitHook = 0
+
+_reportColumns = (
+    'object', 'method', 'count', 'errors', 'total', 'mean', 'p50', 'p90',
+    'p99', 'max', 'requestBytes', 'responseBytes'
+)
+
+
+def enableInstrumentation(reportFile=None):
+    # wraps wsadmin objects, each call gets timed and measured
+    if wdr.instrumentation._statistics is None:
+        wdr.instrumentation._statistics = CallStatistics()
+    wdr.instrumentation._reportFile = reportFile
+    for name in _instrumentedObjectNames:
+        if _instrumentedObjects.has_key(name):
+            continue
+        target = getattr(wdr, name)
+        if target is None:
+            continue
+        _instrumentedObjects[name] = (
+            target, wdr._wsadminObjectOverrides.has_key(name)
+        )
+        wdr.replaceWsadminObject(
+            name, InstrumentedObject(name, target, _statistics)
+        )
+    if not wdr.instrumentation._exitHook:
+        try:
+            import atexit
+            atexit.register(_reportAtExit)
+        except ImportError:
+            pass
+        wdr.instrumentation._exitHook = 1
+
+
+def disableInstrumentation():
+    for (name, (target, overridden)) in _instrumentedObjects.items():
+        if overridden:
+            wdr.replaceWsadminObject(name, target)
+        else:
+            wdr.restoreWsadminObject(name)
+        del _instrumentedObjects[name]
+
+
+def resetInstrumentation():
+    if _statistics is not None:
+        _statistics.clear()
+
+
+def getInstrumentationStatistics():
+    if _statistics is None:
+        return {}
+    return _statistics.summary()
+
+
+def instrumentationReport():
+    summary = getInstrumentationStatistics()
+    keys = summary.keys()
+    # most expensive methods first
+    keys.sort(lambda x, y: cmp(summary[y]['total'], summary[x]['total']))
+    lines = [
+        '%-32s %8s %6s %10s %9s %9s %9s %9s %9s %12s %12s' % (
+            'method', 'count', 'errors', 'total[s]', 'mean[ms]', 'p50[ms]',
+            'p90[ms]', 'p99[ms]', 'max[ms]', 'request[B]', 'response[B]'
+        )
+    ]
+    lineFormat = '%-32s %8d %6d %10.3f %9.2f %9.2f %9.2f %9.2f %9.2f %12d %12d'
+    for key in keys:
+        s = summary[key]
+        lines.append(
+            lineFormat % (
+                '%s.%s' % key, s['count'], s['errors'], s['total'],
+                s['mean'] * 1000, s['p50'] * 1000, s['p90'] * 1000,
+                s['p99'] * 1000, s['max'] * 1000, s['requestBytes'],
+                s['responseBytes']
+            )
+        )
+    return join(lines, '\n')
+
+
+def writeInstrumentationReport(filename):
+    # tab-separated values, one line per method, times in seconds
+    summary = getInstrumentationStatistics()
+    keys = summary.keys()
+    keys.sort()
+    fo = open(filename, 'w')
+    try:
+        fo.write(join(_reportColumns, '\t') + '\n')
+        for key in keys:
+            s = summary[key]
+            fields = [key[0], key[1]]
+            for column in _reportColumns[2:]:
+                fields.append(str(s[column]))
+            fo.write(join(fields, '\t') + '\n')
+    finally:
+        fo.close()
+
+
+def _reportAtExit():
+    if _statistics is None or not _statistics.calls:
+        return
+    for line in instrumentationReport().splitlines():
+        logger.info(line)
+    if _reportFile:
+        writeInstrumentationReport(_reportFile)
+        logger.info('instrumentation report written to %s', _reportFile)
+
+
+def _enableFromEnvironment():
+    # -Dwdr.instrumentation=<true|report file> or WDR_INSTRUMENTATION
+    value = wdr._environmentValue('wdr.instrumentation', 'WDR_INSTRUMENTATION')
+    if value:
+        if value.lower() in ('true', 'yes', '1'):
+            enableInstrumentation()
+        else:
+            enableInstrumentation(value)
+
+
+class CallStatistics:
+    # durations are kept as a fixed-size reservoir sample, percentiles are
+    # exact until the number of calls exceeds its size
+    def __init__(self, sampleSize=1024):
+        self.sampleSize = sampleSize
+        self.calls = {}
+        self.random = random.Random()
+
+    def record(self, key, duration, requestBytes, responseBytes, failed):
+        entry = self.calls.get(key)
+        if entry is None:
+            # [count, errors, total, max, request bytes, response bytes,
+            #  sampled durations]
+            entry = self.calls[key] = [0, 0, 0.0, 0.0, 0, 0, []]
+        entry[0] = entry[0] + 1
+        entry[1] = entry[1] + failed
+        entry[2] = entry[2] + duration
+        if duration > entry[3]:
+            entry[3] = duration
+        entry[4] = entry[4] + requestBytes
+        entry[5] = entry[5] + responseBytes
+        samples = entry[6]
+        if len(samples) < self.sampleSize:
+            samples.append(duration)
+        else:
+            i = self.random.randint(0, entry[0] - 1)
+            if i < self.sampleSize:
+                samples[i] = duration
+
+    def clear(self):
+        self.calls.clear()
+
+    def summary(self):
+        result = {}
+        for (key, entry) in self.calls.items():
+            (
+                count, errors, total, maximum, requestBytes, responseBytes,
+                samples
+            ) = entry
+            durations = samples[:]
+            durations.sort()
+            result[key] = {
+                'count': count,
+                'errors': errors,
+                'total': total,
+                'mean': total / count,
+                'p50': _percentile(durations, 50),
+                'p90': _percentile(durations, 90),
+                'p99': _percentile(durations, 99),
+                'max': maximum,
+                'requestBytes': requestBytes,
+                'responseBytes': responseBytes,
+            }
+        return result
+
+
+class InstrumentedObject:
+    def __init__(self, name, target, statistics):
+        self.__dict__['_name'] = name
+        self.__dict__['_target'] = target
+        self.__dict__['_statistics'] = statistics
+        self.__dict__['_methods'] = {}
+
+    def __getattr__(self, name):
+        method = self._methods.get(name)
+        if method is not None:
+            return method
+        value = getattr(self._target, name)
+        if callable(value):
+            method = self._methods[name] = InstrumentedMethod(
+                (self._name, name), value, self._statistics
+            )
+            return method
+        return value
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def __repr__(self):
+        return repr(self._target)
+
+
+class InstrumentedMethod:
+    def __init__(self, key, method, statistics):
+        self.key = key
+        self.method = method
+        self.statistics = statistics
+
+    def __call__(self, *args):
+        failed = 1
+        result = None
+        startTime = time.time()
+        try:
+            result = apply(self.method, args)
+            failed = 0
+        finally:
+            duration = time.time() - startTime
+            self.statistics.record(
+                self.key, duration, _payloadSize(args), _payloadSize(result),
+                failed
+            )
+        return result
+
+
+def _payloadSize(value):
+    if value is None:
+        return 0
+    if type(value) in (type(()), type([])):
+        size = 0
+        for v in value:
+            size = size + _payloadSize(v)
+        return size
+    return len(str(value))
+
+
+def _percentile(sortedValues, percent):
+    # nearest-rank method
+    rank = (len(sortedValues) * percent + 99) / 100
+    return sortedValues[max(rank, 1) - 1]
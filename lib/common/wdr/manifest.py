@@ -1,13 +1,13 @@
-from types import DictType
 from types import ListType
-import com.ibm.ws.scripting
 import logging
 import os
 import re
 import sys
+import time
 import wdr.app
 import wdr.config
 import wdr.task
+import wdr.util
 
 (
     AdminApp, AdminConfig, AdminControl, AdminTask, Help
@@ -15,37 +15,28 @@ import wdr.task
 
 logger = logging.getLogger('wdr.manifest')
 
-_genericPattern = re.compile(r'^(?P<tabs>\t*).*$')
-_commentPattern = re.compile(r'^(?:\s*#\.*)|(?:\s*)$')
-_directivePattern = re.compile(
-    r'^(?P<tabs>\t*)'
-    r'@'
-    r'\s*'
-    r'(?P<name>[A-Za-z][a-zA-Z0-9_]*)'
-    r'(?P<values>(?:\s*(?P<value>.+?))*)?'
-    r'\s*$')
-_typePattern = re.compile(
-    r'^(?P<tabs>\t*)'
-    r'(?:(?P<operation>[!?+])\s*)?'
+try:
+    from hashlib import md5 as _md5
+except ImportError:
+    from md5 import new as _md5
+
+_tabsPattern = re.compile(r'\t*')
+_blankPattern = re.compile(r'\s*(?:#|$)')
+_typeTokenPattern = re.compile(
     r'\s*'
-    r'(?P<type>[A-Za-z][a-zA-Z0-9_]*)'
+    r'([A-Za-z][a-zA-Z0-9_]*)'
     r'\s*'
-    r'(?P<linkage>[&#][a-zA-Z0-9_]+)?'
+    r'([&#][a-zA-Z0-9_]+)?'
     r'\s*$')
-_keyPattern = re.compile(
-    r'^(?P<tabs>\t*)'
-    r'\*'
-    r'(?P<name>[A-Za-z][a-zA-Z0-9_]*)'
+_nameValueTokenPattern = re.compile(
+    r'([A-Za-z][a-zA-Z0-9_]*)'
     r'\s*'
-    r'(?P<value>.+?)?'
+    r'(.*?)'
     r'\s*$')
-_attPattern = re.compile(
-    r'^(?P<tabs>\t*)'
-    r'-'
-    r'(?P<name>[A-Za-z][a-zA-Z0-9_]*)'
+_directiveTokenPattern = re.compile(
     r'\s*'
-    r'(?P<value>.+?)?'
-    r'\s*$')
+    r'([A-Za-z][a-zA-Z0-9_]*)'
+    r'(.*)$')
 _variablePattern = re.compile(
     r'\$\['
     r'\s*'
@@ -60,19 +51,29 @@ _variablePattern = re.compile(
     r')?'
     r'\s*'
     r'\]')
-_appNamePattern = re.compile(
+_appNameTokenPattern = re.compile(
     r'^'
     r'(?:(?:"(?P<qname>[^"]+)")|(?P<name>\S+))'
     r'\s+'
     r'(?:(?:"(?P<qpath>[^"]+)")|(?P<path>.+?))'
     r'\s*$')
-_appOptionPattern = re.compile(
-    r'^(?P<tabs>\t)'
-    r'(?P<name>\*?[a-zA-Z0-9_\.]+)'
+_appOptionTokenPattern = re.compile(
+    r'(\*?[a-zA-Z0-9_\.]+)'
     r'\s*'
-    r'(?P<value>.+?)?'
+    r'(.*?)'
     r'\s*$')
-_appOptionValuePattern = re.compile(r'^(?P<tabs>\t\t)(?P<value>.+?)\s*$')
+_appOptionValueTokenPattern = re.compile(r'(.+?)\s*$')
+_compiledTemplates = {}
+_compiledTemplateLimit = 10000
+_manifestCacheHeader = 'WDR-MANIFEST-CACHE'
+_manifestCacheVersion = 1
+_manifestCache = None
+_manifestPrefetch = 0
+_manifestStateHeader = 'WDR-MANIFEST-STATE'
+_manifestStateVersion = 1
+_manifestState = None
+_planHeader = 'WDR-PLAN'
+_planFormatVersion = 1
 WDR_CHECKSUM_DESCRIPTION = (
     'Checksum of deployed EAR file and application manifest'
 )
@@ -85,17 +86,30 @@ def _defaultFilter(value):
         return str(value)
 
 
-def _lookupVariable(expression, filterExpression, variables):
+class MemoizedVariable:
+    # callable variables are called for each occurrence of an expression,
+    # wrapped ones only once per manifest
+    def __init__(self, function):
+        self.function = function
+
+    def __call__(self, expression, variables):
+        return self.function(expression, variables)
+
+
+def _lookupVariable(expression, filterExpression, variables, resolved=None):
+    # filters are expected to return the same result for the same value
     value = None
+    memoize = 1
     context = variables
     try:
         for seg in expression.split('.'):
             value = context[seg]
-            if isinstance(value, DictType):
+            if wdr.util._isVariableMapping(value):
                 context = value
     except KeyError:
         raise KeyError(expression)
     if callable(value):
+        memoize = isinstance(value, MemoizedVariable)
         value = value(expression, variables)
     filter = _defaultFilter
     if filterExpression is not None:
@@ -103,22 +117,56 @@ def _lookupVariable(expression, filterExpression, variables):
         try:
             for seg in filterExpression.split('.'):
                 filter = context[seg]
-                if isinstance(filter, DictType):
+                if wdr.util._isVariableMapping(filter):
                     context = filter
         except KeyError:
             raise KeyError(filterExpression)
-    return filter(value)
+    result = filter(value)
+    if memoize and resolved is not None:
+        resolved[(expression, filterExpression)] = result
+    return result
+
+
+def substituteVariables(value, variables, resolved=None):
+    # resolved memoizes values of expressions for one set of variables
+    if value.find('$[') == -1:
+        return value
+    segments = _compiledTemplates.get(value)
+    if segments is None:
+        if len(_compiledTemplates) >= _compiledTemplateLimit:
+            _compiledTemplates.clear()
+        segments = _compiledTemplates[value] = _compileTemplate(value)
+    result = []
+    for (text, expression, filterExpression) in segments:
+        if expression is None:
+            result.append(text)
+        elif resolved is not None and resolved.has_key(
+            (expression, filterExpression)
+        ):
+            result.append(resolved[(expression, filterExpression)])
+        else:
+            result.append(
+                _lookupVariable(
+                    expression, filterExpression, variables, resolved
+                )
+            )
+    return ''.join(result)
 
 
-def substituteVariables(value, variables):
-    return re.sub(
-        _variablePattern,
-        (
-            lambda k, v=variables:
-            _lookupVariable(k.group('var'), k.group('filter'), v)
-        ),
-        value
-    )
+def _compileTemplate(value):
+    # literal text and variable expressions as (text, expression, filter)
+    segments = []
+    position = 0
+    mat = _variablePattern.search(value)
+    while mat:
+        if mat.start() > position:
+            segments.append((value[position:mat.start()], None, None))
+        segments.append((None, mat.group('var'), mat.group('filter')))
+        position = mat.end()
+        mat = _variablePattern.search(value, position)
+    if position < len(value):
+        segments.append((value[position:], None, None))
+    return segments
 
 
 class Operations:
@@ -127,7 +175,8 @@ class Operations:
         '?': 'customize',
         '!': 'remove',
     }
-    assure, customize, remove = names.keys()
+    # dictionary order is not defined, codes are listed explicitly
+    assure, customize, remove = '+', '?', '!'
 
 
 class ManifestConfigObject:
@@ -187,8 +236,10 @@ class ManifestConfigObject:
                 %
                 ("\t" * indent, opcode, self.type)
             )
-        for (k, v) in self.keys.items():
-            result += "%s*%s %s\n" % ("\t" * (indent + 1), k, v)
+        keyNames = self.keys.keys()
+        keyNames.sort()
+        for k in keyNames:
+            result += "%s*%s %s\n" % ("\t" * (indent + 1), k, self.keys[k])
         for k in self._orderedAttributeNames:
             v = self.attributes[k]
             if isinstance(v, ListType):
@@ -203,6 +254,41 @@ class ManifestConfigObject:
             result += c._toString(indent + 1)
         return result
 
+    def checksum(self):
+        # source locations are not part of the checksum
+        return _contentDigest(self._toString(0))
+
+    def _substitute(self, variables, resolved=None):
+        # parsed objects may be cached, substitution works on a copy
+        result = ManifestConfigObject(self.type, self.filename, self.linenumber)
+        result.operation = self.operation
+        result.anchor = self.anchor
+        result.reference = self.reference
+        try:
+            for (k, v) in self.keys.items():
+                result.keys[k] = substituteVariables(v, variables, resolved)
+            for k in self._orderedAttributeNames:
+                v = self.attributes[k]
+                if isinstance(v, ListType):
+                    result.attributes[k] = [
+                        c._substitute(variables, resolved) for c in v
+                    ]
+                else:
+                    result.attributes[k] = substituteVariables(
+                        v, variables, resolved
+                    )
+        except:
+            logger.error(
+                '[%s] error while substituting variables',
+                self.getSourceLocation()
+            )
+            raise
+        result._orderedAttributeNames = self._orderedAttributeNames[:]
+        result.children = [
+            c._substitute(variables, resolved) for c in self.children
+        ]
+        return result
+
     def mapOperation(self, opcode):
         if opcode is None:
             return Operations.assure
@@ -213,7 +299,11 @@ class ManifestConfigObject:
             )
         return opcode
 
-    def apply(self, anchors, parentObject, parentAttribute, attributeCache):
+    def apply(
+        self, anchors, parentObject, parentAttribute, attributeCache,
+        plan=None
+    ):
+        # with a plan, changes are recorded in the plan instead of being made
         typeName = self.type
         logger.debug(
             'importing object type %s as child of object %s and property %s',
@@ -221,42 +311,52 @@ class ManifestConfigObject:
         )
         if parentObject:
             self._applyWithParentContext(
-                anchors, parentObject, parentAttribute, attributeCache
+                anchors, parentObject, parentAttribute, attributeCache, plan
             )
         else:
             self._applyWithoutParentContext(
-                anchors, parentObject, parentAttribute, attributeCache
+                anchors, parentObject, parentAttribute, attributeCache, plan
             )
 
-    def _filterMatching(self, candidateList, attributeCache):
+    def _filterMatching(self, candidateList, attributeCache, plan=None):
         matchingList = []
+        indexedCriteria = wdr.config._indexedCriteria(self.type, self.keys)
         for o in candidateList:
             if o is None:
                 continue
-            if o._type == self.type:
-                for (k, v) in self.keys.items():
-                    if attributeCache.getAttribute(o, k) != v:
-                        break
-                else:
-                    matchingList.append(o)
+            if attributeCache.objectType(o) != self.type:
+                continue
+            if plan is not None:
+                if plan.isRemoved(o):
+                    continue
+                if isinstance(o, _PlannedObject):
+                    # planned objects are not known to attribute indexes
+                    if wdr.config._matchesCriteria(
+                        o, [(k, v, None) for (k, v) in self.keys.items()],
+                        attributeCache
+                    ):
+                        matchingList.append(o)
+                    continue
+            if wdr.config._matchesCriteria(
+                o, indexedCriteria, attributeCache
+            ):
+                matchingList.append(o)
         return matchingList
 
-    def _create(self, parentObject, parentAttribute, attributeCache):
+    def _create(
+        self, parentObject, parentAttribute, attributeCache, plan=None
+    ):
         typeName = self.type
         typeInfo = wdr.config.getTypeInfo(typeName)
         simpleAttributes = []
         for (propName, propValue) in self.keys.items():
             if typeInfo.attributes.has_key(propName):
-                if wdr.config.getTypeInfo(
-                    typeInfo.attributes[propName].type
-                ).converter:
+                if typeInfo.attributeDescriptor(propName)[0]:
                     simpleAttributes.append([propName, propValue])
         for propName in self._orderedAttributeNames:
             propValue = self.attributes[propName]
             if typeInfo.attributes.has_key(propName):
-                if wdr.config.getTypeInfo(
-                    typeInfo.attributes[propName].type
-                ).converter:
+                if typeInfo.attributeDescriptor(propName)[0]:
                     simpleAttributes.append([propName, propValue])
             else:
                 raise Exception(
@@ -265,14 +365,20 @@ class ManifestConfigObject:
                         self.getSourceLocation(), propName, typeName, self.keys
                     )
                 )
+        if plan is not None:
+            return plan.create(
+                self, parentObject, parentAttribute, simpleAttributes,
+                attributeCache
+            )
         result = parentObject._create(
             typeName, parentAttribute, simpleAttributes
         )
         if parentAttribute is not None:
             attributeCache.invalidate(parentObject, parentAttribute)
+        attributeCache.invalidateChildren(parentObject, typeName)
         return result
 
-    def _remove(self, configObject, anchors, attributeCache):
+    def _remove(self, configObject, anchors, attributeCache, plan=None):
         if self.children or self.attributes:
             raise Exception(
                 '[%s] Objects being removed '
@@ -283,8 +389,12 @@ class ManifestConfigObject:
             raise Exception(
                 '[%s] Remove not implemented yet' % self.getSourceLocation()
             )
+        elif plan is not None:
+            plan.remove(self, configObject)
         else:
             configObject.remove()
+            attributeCache.invalidate(configObject)
+            attributeCache.invalidateChildren()
 
     def _setAnchor(self, anchors, configObject):
         if self.anchor:
@@ -299,26 +409,37 @@ class ManifestConfigObject:
                 )
                 anchors[self.anchor] = configObject
 
-    def _updateSimpleAttributes(self, configObject, attributeCache):
+    def _updateSimpleAttributes(
+        self, configObject, attributeCache, plan=None
+    ):
         typeName = self.type
         typeInfo = wdr.config.getTypeInfo(typeName)
         for propName in self._orderedAttributeNames:
             propValue = self.attributes[propName]
             if typeInfo.attributes.has_key(propName):
-                attributeInfo = typeInfo.attributes[propName]
-                attributeTypeInfo = wdr.config.getTypeInfo(attributeInfo.type)
-                if attributeTypeInfo.converter:
-                    if attributeInfo.list:
+                (converter, isList) = (
+                    typeInfo.attributeDescriptor(propName)[0:2]
+                )
+                if converter:
+                    if isList:
                         if propValue:
                             newPropValue = propValue.split(';')
                         else:
                             newPropValue = propValue
                     else:
                         newPropValue = propValue
+                    if plan is not None:
+                        plan.modify(
+                            self, configObject, propName, newPropValue,
+                            attributeCache
+                        )
+                        continue
                     try:
-                        configObject._modify([[propName, newPropValue]])
-                        attributeCache.invalidate(configObject, propName)
-                    except com.ibm.ws.scripting.ScriptingException, ex:
+                        _modifyCached(
+                            configObject, propName, newPropValue,
+                            attributeCache
+                        )
+                    except wdr.util.SCRIPTING_EXCEPTIONS, ex:
                         msg = '' + ex.message
                         if msg.find('ADMG0014E') != -1:
                             if (
@@ -342,23 +463,35 @@ class ManifestConfigObject:
                     )
                 )
 
-    def _updateKeys(self, configObject, attributeCache):
+    def _updateKeys(self, configObject, attributeCache, plan=None):
         typeName = self.type
         typeInfo = wdr.config.getTypeInfo(typeName)
         for (propName, propValue) in self.keys.items():
             if typeInfo.attributes.has_key(propName):
-                attributeInfo = typeInfo.attributes[propName]
-                attributeTypeInfo = wdr.config.getTypeInfo(attributeInfo.type)
-                if attributeTypeInfo.converter:
+                (converter, isList) = (
+                    typeInfo.attributeDescriptor(propName)[0:2]
+                )
+                if converter:
+                    if plan is not None:
+                        if isList:
+                            propValue = propValue.split(';')
+                        plan.modify(
+                            self, configObject, propName, propValue,
+                            attributeCache
+                        )
+                        continue
                     try:
-                        if attributeInfo.list:
-                            configObject._modify(
-                                [[propName, propValue.split(';')]]
+                        if isList:
+                            _modifyCached(
+                                configObject, propName, propValue.split(';'),
+                                attributeCache
                             )
                         else:
-                            configObject._modify([[propName, propValue]])
-                        attributeCache.invalidate(configObject, propName)
-                    except com.ibm.ws.scripting.ScriptingException, ex:
+                            _modifyCached(
+                                configObject, propName, propValue,
+                                attributeCache
+                            )
+                    except wdr.util.SCRIPTING_EXCEPTIONS, ex:
                         msg = '' + ex.message
                         if msg.find('ADMG0014E') != -1:
                             logger.warning(
@@ -369,18 +502,19 @@ class ManifestConfigObject:
                         else:
                             raise
 
-    def _updateComplexAttributes(self, configObject, anchors, attributeCache):
+    def _updateComplexAttributes(
+        self, configObject, anchors, attributeCache, plan=None
+    ):
         typeName = self.type
         typeInfo = wdr.config.getTypeInfo(typeName)
         for propName in self._orderedAttributeNames:
             propValue = self.attributes[propName]
             if typeInfo.attributes.has_key(propName):
-                attributeInfo = typeInfo.attributes[propName]
-                attributeTypeInfo = wdr.config.getTypeInfo(attributeInfo.type)
-                if not attributeTypeInfo.converter:
+                if not typeInfo.attributeDescriptor(propName)[0]:
                     for mo in propValue:
                         mo.apply(
-                            anchors, configObject, propName, attributeCache
+                            anchors, configObject, propName, attributeCache,
+                            plan
                         )
             else:
                 raise Exception(
@@ -388,12 +522,13 @@ class ManifestConfigObject:
                     % (self.getSourceLocation(), propName, typeName, self.keys)
                 )
 
-    def _updateChildren(self, configObject, anchors, attributeCache):
+    def _updateChildren(self, configObject, anchors, attributeCache, plan=None):
         for mo in self.children:
-            mo.apply(anchors, configObject, None, attributeCache)
+            mo.apply(anchors, configObject, None, attributeCache, plan)
 
     def _updateRefOrRefList(
-        self, anchors, parentObject, parentAttribute, attributeCache
+        self, anchors, parentObject, parentAttribute, attributeCache,
+        plan=None
     ):
         if not self.isEmpty():
             raise Exception(
@@ -417,31 +552,36 @@ class ManifestConfigObject:
         parentTypeName = parentObject._type
         parentTypeInfo = wdr.config.getTypeInfo(parentTypeName)
         parentAttributeInfo = parentTypeInfo.attributes[parentAttribute]
-        if parentAttributeInfo.list:
-            anchor = anchors[self.reference]
-            referenceList = parentObject[parentAttribute]
-            if self.operation in (Operations.assure, Operations.customize):
-                referenceList.append(anchor)
-            elif self.operation == Operations.remove:
-                if anchor in referenceList:
-                    referenceList.remove(anchor)
-            parentObject[parentAttribute] = referenceList
-            attributeCache.invalidate(parentObject, parentAttribute)
+        if plan is not None:
+            plan.assignReference(
+                self, parentObject, parentAttribute,
+                anchors[self.reference], parentAttributeInfo.list,
+                attributeCache
+            )
         else:
-            if self.operation in (Operations.assure, Operations.customize):
-                anchor = anchors[self.reference]
-                parentObject[parentAttribute] = anchor
-            elif self.operation == Operations.remove:
-                parentObject[parentAttribute] = None
-            attributeCache.invalidate(parentObject, parentAttribute)
+            (changed, value) = _referenceValue(
+                self.operation,
+                attributeCache.getAttribute(parentObject, parentAttribute),
+                anchors[self.reference], parentAttributeInfo.list
+            )
+            if changed:
+                parentObject[parentAttribute] = value
+                attributeCache.invalidate(parentObject, parentAttribute)
 
     def _applyToChild(
-        self, anchors, parentObject, parentAttribute, attributeCache
+        self, anchors, parentObject, parentAttribute, attributeCache,
+        plan=None
     ):
         typeName = self.type
         if parentAttribute is None:
+            if plan is not None:
+                candidates = plan.lookup(
+                    parentObject, typeName, attributeCache
+                )
+            else:
+                candidates = attributeCache.children(parentObject, typeName)
             matchingObjects = self._filterMatching(
-                parentObject.lookup(typeName, {}), attributeCache
+                candidates, attributeCache, plan
             )
         else:
             parentTypeName = parentObject._type
@@ -450,7 +590,7 @@ class ManifestConfigObject:
             if parentAttributeInfo.list:
                 matchingObjects = self._filterMatching(
                     attributeCache.getAttribute(parentObject, parentAttribute),
-                    attributeCache
+                    attributeCache, plan
                 )
             else:
                 matchingObjects = self._filterMatching(
@@ -459,7 +599,7 @@ class ManifestConfigObject:
                             parentObject, parentAttribute
                         )
                     ],
-                    attributeCache
+                    attributeCache, plan
                 )
         if (
             len(matchingObjects) == 0
@@ -470,13 +610,15 @@ class ManifestConfigObject:
         ):
             if self.operation == Operations.assure:
                 configObject = self._create(
-                    parentObject, parentAttribute, attributeCache
+                    parentObject, parentAttribute, attributeCache, plan
                 )
                 self._setAnchor(anchors, configObject)
                 self._updateComplexAttributes(
-                    configObject, anchors, attributeCache
+                    configObject, anchors, attributeCache, plan
+                )
+                self._updateChildren(
+                    configObject, anchors, attributeCache, plan
                 )
-                self._updateChildren(configObject, anchors, attributeCache)
             elif self.operation == Operations.remove:
                 pass
             elif self.operation == Operations.customize:
@@ -485,14 +627,18 @@ class ManifestConfigObject:
             configObject = matchingObjects[0]
             if self.operation in (Operations.assure, Operations.customize):
                 self._setAnchor(anchors, configObject)
-                self._updateKeys(configObject, attributeCache)
-                self._updateSimpleAttributes(configObject, attributeCache)
+                self._updateKeys(configObject, attributeCache, plan)
+                self._updateSimpleAttributes(
+                    configObject, attributeCache, plan
+                )
                 self._updateComplexAttributes(
-                    configObject, anchors, attributeCache
+                    configObject, anchors, attributeCache, plan
+                )
+                self._updateChildren(
+                    configObject, anchors, attributeCache, plan
                 )
-                self._updateChildren(configObject, anchors, attributeCache)
             elif self.operation == Operations.remove:
-                self._remove(configObject, anchors, attributeCache)
+                self._remove(configObject, anchors, attributeCache, plan)
         else:
             raise Exception(
                 '[%s] Multiple %s objects matched criteria'
@@ -500,7 +646,8 @@ class ManifestConfigObject:
             )
 
     def _applyWithParentContext(
-        self, anchors, parentObject, parentAttribute, attributeCache
+        self, anchors, parentObject, parentAttribute, attributeCache,
+        plan=None
     ):
         # knowing the parent, we can either create or modify the object
         parentTypeName = parentObject._type
@@ -509,11 +656,13 @@ class ManifestConfigObject:
             parentAttributeInfo = parentTypeInfo.attributes[parentAttribute]
             if parentAttributeInfo.reference:
                 self._updateRefOrRefList(
-                    anchors, parentObject, parentAttribute, attributeCache
+                    anchors, parentObject, parentAttribute, attributeCache,
+                    plan
                 )
             else:
                 self._applyToChild(
-                    anchors, parentObject, parentAttribute, attributeCache
+                    anchors, parentObject, parentAttribute, attributeCache,
+                    plan
                 )
         else:
             # parent attribute name not provided
@@ -524,29 +673,39 @@ class ManifestConfigObject:
                 )
             else:
                 self._applyToChild(
-                    anchors, parentObject, parentAttribute, attributeCache
+                    anchors, parentObject, parentAttribute, attributeCache,
+                    plan
                 )
 
     def _applyWithoutParentContext(
-        self, anchors, parentObject, parentAttribute, attributeCache
+        self, anchors, parentObject, parentAttribute, attributeCache,
+        plan=None
     ):
         # without knowing the parent, object can be only modified,
         # no new object can be created
         typeName = self.type
+        if plan is not None:
+            candidates = plan.listConfigObjects(typeName)
+        else:
+            candidates = wdr.config.listConfigObjects(typeName)
         matchingObjects = self._filterMatching(
-            wdr.config.listConfigObjects(typeName), attributeCache
+            candidates, attributeCache, plan
         )
         if len(matchingObjects) == 1:
             configObject = matchingObjects[0]
             if self.operation in (Operations.assure, Operations.customize):
-                self._updateSimpleAttributes(configObject, attributeCache)
+                self._updateSimpleAttributes(
+                    configObject, attributeCache, plan
+                )
                 self._setAnchor(anchors, configObject)
                 self._updateComplexAttributes(
-                    configObject, anchors, attributeCache
+                    configObject, anchors, attributeCache, plan
+                )
+                self._updateChildren(
+                    configObject, anchors, attributeCache, plan
                 )
-                self._updateChildren(configObject, anchors, attributeCache)
             elif self.operation == Operations.remove:
-                self._remove(configObject, anchors, attributeCache)
+                self._remove(configObject, anchors, attributeCache, plan)
         elif len(matchingObjects) == 0:
             if self.operation == Operations.assure:
                 raise Exception(
@@ -562,6 +721,27 @@ class ManifestConfigObject:
             )
 
 
+def _modifyCached(configObject, name, value, attributeCache):
+    # values found up to date stay cached
+    if configObject._modify([[name, value]], attributeCache):
+        attributeCache.invalidate(configObject, name)
+
+
+def _referenceValue(operation, current, anchor, isList):
+    # (changed, value) of a reference attribute once the anchor gets
+    # assigned to or removed from it, references already present are not
+    # added again
+    if isList:
+        current = list(current or [])
+        present = str(anchor) in map(str, current)
+        if operation == Operations.remove:
+            return (present, [v for v in current if str(v) != str(anchor)])
+        return (not present, current + [anchor])
+    elif operation == Operations.remove:
+        return (current is not None, None)
+    return (current is None or str(current) != str(anchor), anchor)
+
+
 class LoadError:
     def __init__(self, message, filename='', line='', lineno=0):
         self.message = message
@@ -579,39 +759,129 @@ class LoadError:
         return unicode(self.__str__())
 
 
+class _ManifestToken:
+    def __init__(
+        self, kind, indent, line, name=None, value=None, operation=None,
+        linkage=None
+    ):
+        self.kind = kind
+        self.indent = indent
+        self.line = line
+        self.name = name
+        self.value = value
+        self.operation = operation
+        self.linkage = linkage
+
+
+def _tokenizeConfigLine(line):
+    # the first character after indentation determines the kind of line,
+    # only the pattern for that kind is matched
+    indent = _tabsPattern.match(line).end()
+    first = line[indent:indent + 1]
+    if first == '*' or first == '-':
+        mat = _nameValueTokenPattern.match(line, indent + 1)
+        if mat:
+            if first == '*':
+                kind = 'key'
+            else:
+                kind = 'attribute'
+            return _ManifestToken(
+                kind, indent, line, mat.group(1), mat.group(2) or None
+            )
+    elif first == '@':
+        mat = _directiveTokenPattern.match(line, indent + 1)
+        if mat:
+            return _ManifestToken(
+                'directive', indent, line, mat.group(1), mat.group(2)
+            )
+    elif first == '#' or first == '':
+        return _ManifestToken('comment', indent, line)
+    elif first in '!?+':
+        mat = _typeTokenPattern.match(line, indent + 1)
+        if mat:
+            return _ManifestToken(
+                'object', indent, line, mat.group(1), None, first,
+                mat.group(2)
+            )
+    else:
+        mat = _typeTokenPattern.match(line, indent)
+        if mat:
+            return _ManifestToken(
+                'object', indent, line, mat.group(1), None, None,
+                mat.group(2)
+            )
+        if _blankPattern.match(line, indent):
+            return _ManifestToken('comment', indent, line)
+    return _ManifestToken('invalid', indent, line)
+
+
+def _tokenizeApplicationLine(line):
+    indent = _tabsPattern.match(line).end()
+    if indent == 0:
+        if line[:1] != '#':
+            mat = _appNameTokenPattern.match(line)
+            if mat:
+                return _ManifestToken(
+                    'application', indent, line,
+                    mat.group('name') or mat.group('qname'),
+                    mat.group('path') or mat.group('qpath')
+                )
+    elif indent == 1:
+        mat = _appOptionTokenPattern.match(line, indent)
+        if mat:
+            return _ManifestToken(
+                'option', indent, line, mat.group(1), mat.group(2) or None
+            )
+    elif line.strip():
+        # option values are taken verbatim, including leading '#'
+        return _ManifestToken(
+            'optionValue', indent, line, None,
+            _appOptionValueTokenPattern.match(line, 2).group(1)
+        )
+    if _blankPattern.match(line, indent):
+        return _ManifestToken('comment', indent, line)
+    return _ManifestToken('invalid', indent, line)
+
+
 class _ConfigEventConsumer:
     def __init__(self):
         pass
 
-    def consumeObject(self, filename, line, lineno, manifestPath):
+    def consumeObject(self, filename, token, lineno, manifestPath):
         logger.error(
             '[%s(%d)] manifest parsing error - unexpected object definition',
             filename, lineno
         )
-        raise LoadError('Unexpected object definition', filename, line, lineno)
+        raise LoadError(
+            'Unexpected object definition', filename, token.line, lineno
+        )
 
-    def consumeKey(self, filename, line, lineno, variables, manifestPath):
+    def consumeKey(self, filename, token, lineno, dependencies, manifestPath):
         logger.error(
             '[%s(%d)] manifest parsing error - unexpected object key', filename,
             lineno
         )
-        raise LoadError('Unexpected key', filename, line, lineno)
+        raise LoadError('Unexpected key', filename, token.line, lineno)
 
-    def consumeAttribute(self, filename, line, lineno, variables, manifestPath):
+    def consumeAttribute(
+        self, filename, token, lineno, dependencies, manifestPath
+    ):
         logger.error(
             '[%s(%d)] manifest parsing error - unexpected object attribute',
             filename, lineno
         )
-        raise LoadError('Unexpected attribute', filename, line, lineno)
+        raise LoadError('Unexpected attribute', filename, token.line, lineno)
 
-    def consumeDirective(self, filename, line, lineno, variables, manifestPath):
+    def consumeDirective(
+        self, filename, token, lineno, dependencies, manifestPath
+    ):
         logger.error(
             '[%s(%d)] manifest parsing error - unexpected directive', filename,
             lineno
         )
-        raise LoadError('Unexpected directive', filename, line, lineno)
+        raise LoadError('Unexpected directive', filename, token.line, lineno)
 
-    def consumeComment(self, filename, line, lineno, manifestPath):
+    def consumeComment(self, filename, token, lineno, manifestPath):
         pass
 
 
@@ -620,13 +890,10 @@ class _ObjectConsumer(_ConfigEventConsumer):
         _ConfigEventConsumer.__init__(self)
         self.parentList = parentList
 
-    def consumeObject(self, filename, line, lineno, manifestPath):
-        mat = _typePattern.match(line)
-        name = mat.group('type')
-        opcode = mat.group('operation')
-        linkage = mat.group('linkage')
-        obj = ManifestConfigObject(name, filename, lineno)
-        obj.operation = obj.mapOperation(opcode)
+    def consumeObject(self, filename, token, lineno, manifestPath):
+        linkage = token.linkage
+        obj = ManifestConfigObject(token.name, filename, lineno)
+        obj.operation = obj.mapOperation(token.operation)
         if linkage:
             if linkage[0] == '#':
                 obj.anchor = linkage[1:]
@@ -635,19 +902,16 @@ class _ObjectConsumer(_ConfigEventConsumer):
         self.parentList.append(obj)
         return [self, _ObjectDataConsumer(obj)]
 
-    def consumeDirective(self, filename, line, lineno, variables, manifestPath):
-        mat = _directivePattern.match(line)
-        name = mat.group('name')
-        values = mat.group('values').split()
+    def consumeDirective(
+        self, filename, token, lineno, dependencies, manifestPath
+    ):
+        name = token.name
+        values = token.value.split()
         if 'include' == name:
             try:
                 self.parentList.extend(
-                    _loadConfigurationManifest(
-                        _locateManifestFile(
-                            values[0],
-                            [os.path.dirname(filename)]
-                        ),
-                        variables,
+                    _parseIncludedManifest(
+                        values[0], [os.path.dirname(filename)], dependencies,
                         manifestPath
                     )
                 )
@@ -661,10 +925,8 @@ class _ObjectConsumer(_ConfigEventConsumer):
         elif 'import' == name:
             try:
                 self.parentList.extend(
-                    _loadConfigurationManifest(
-                        _locateManifestFile(values[0], manifestPath),
-                        variables,
-                        manifestPath
+                    _parseIncludedManifest(
+                        values[0], manifestPath, dependencies, manifestPath
                     )
                 )
             except:
@@ -678,7 +940,7 @@ class _ObjectConsumer(_ConfigEventConsumer):
             '[%s(%d)] manifest parsing error - unexpected directive',
             filename, lineno
         )
-        raise LoadError('Unexpected directive', filename, line, lineno)
+        raise LoadError('Unexpected directive', filename, token.line, lineno)
 
 
 class _ObjectDataConsumer(_ConfigEventConsumer):
@@ -686,49 +948,29 @@ class _ObjectDataConsumer(_ConfigEventConsumer):
         _ConfigEventConsumer.__init__(self)
         self.parentObject = parentObject
 
-    def consumeKey(self, filename, line, lineno, variables, manifestPath):
-        mat = _keyPattern.match(line)
-        name = mat.group('name')
-        try:
-            value = substituteVariables(mat.group('value'), variables)
-        except:
-            logger.error(
-                '[%s(%d)] error while substituting variables', filename, lineno
-            )
-            raise
-        self.parentObject.keys[name] = value
+    def consumeKey(self, filename, token, lineno, dependencies, manifestPath):
+        self.parentObject.keys[token.name] = token.value
         return [self]
 
-    def consumeAttribute(self, filename, line, lineno, variables, manifestPath):
-        mat = _attPattern.match(line)
-        name = mat.group('name')
-        value = mat.group('value')
+    def consumeAttribute(
+        self, filename, token, lineno, dependencies, manifestPath
+    ):
+        name = token.name
+        value = token.value
         if value is None:
             values = []
             self.parentObject.attributes[name] = values
             self.parentObject._orderedAttributeNames.append(name)
             return [self, _ObjectConsumer(values)]
         else:
-            try:
-                self.parentObject.attributes[name] = (
-                    substituteVariables(value, variables)
-                )
-            except:
-                logger.error(
-                    '[%s(%d)] error while substituting variables', filename,
-                    lineno
-                )
-                raise
+            self.parentObject.attributes[name] = value
             self.parentObject._orderedAttributeNames.append(name)
             return [self, _ConfigEventConsumer()]
 
-    def consumeObject(self, filename, line, lineno, manifestPath):
-        mat = _typePattern.match(line)
-        name = mat.group('type')
-        opcode = mat.group('operation')
-        linkage = mat.group('linkage')
-        obj = ManifestConfigObject(name, filename, lineno)
-        obj.operation = obj.mapOperation(opcode)
+    def consumeObject(self, filename, token, lineno, manifestPath):
+        linkage = token.linkage
+        obj = ManifestConfigObject(token.name, filename, lineno)
+        obj.operation = obj.mapOperation(token.operation)
         if linkage:
             if linkage[0] == '#':
                 obj.anchor = linkage[1:]
@@ -737,35 +979,30 @@ class _ObjectDataConsumer(_ConfigEventConsumer):
         self.parentObject.children.append(obj)
         return [self, _ObjectDataConsumer(obj)]
 
-    def consumeDirective(self, filename, line, lineno, variables, manifestPath):
-        mat = _directivePattern.match(line)
-        name = mat.group('name')
-        values = mat.group('values').split()
+    def consumeDirective(
+        self, filename, token, lineno, dependencies, manifestPath
+    ):
+        name = token.name
+        values = token.value.split()
         if 'include' == name:
             self.parentObject.children.extend(
-                _loadConfigurationManifest(
-                    _locateManifestFile(
-                        values[0],
-                        [os.path.dirname(filename)]
-                    ),
-                    variables,
+                _parseIncludedManifest(
+                    values[0], [os.path.dirname(filename)], dependencies,
                     manifestPath
                 )
             )
             return [self]
         elif 'import' == name:
             self.parentObject.children.extend(
-                _loadConfigurationManifest(
-                    _locateManifestFile(values[0], manifestPath),
-                    variables,
-                    manifestPath
+                _parseIncludedManifest(
+                    values[0], manifestPath, dependencies, manifestPath
                 )
             )
             return [self]
         logger.error(
             'manifest parsing error - unexpected directive at line %d', lineno
         )
-        raise LoadError('Unexpected directive', filename, line, lineno)
+        raise LoadError('Unexpected directive', filename, token.line, lineno)
 
 
 class ApplicationDeploymentListener:
@@ -869,30 +1106,30 @@ class _AppEventConsumer:
     def __init__(self):
         pass
 
-    def consumeApp(self, filename, line, lineno, variables):
+    def consumeApp(self, filename, token, lineno, variables, resolved):
         logger.error(
             'manifest parsing error'
             ' - unexpected application definition at line %d',
             lineno
         )
         raise LoadError(
-            'Unexpected application definition', filename, line, lineno
+            'Unexpected application definition', filename, token.line, lineno
         )
 
-    def consumeOption(self, filename, line, lineno, variables):
+    def consumeOption(self, filename, token, lineno, variables, resolved):
         logger.error(
             'manifest parsing error - unexpected option at line %d', lineno
         )
-        raise LoadError('Unexpected option', filename, line, lineno)
+        raise LoadError('Unexpected option', filename, token.line, lineno)
 
-    def consumeOptionValue(self, filename, line, lineno, variables):
+    def consumeOptionValue(self, filename, token, lineno, variables, resolved):
         logger.error(
             'manifest parsing error - unexpected option value at line %d',
             lineno
         )
-        raise LoadError('Unexpected option value', filename, line, lineno)
+        raise LoadError('Unexpected option value', filename, token.line, lineno)
 
-    def consumeComment(self, filename, line, lineno):
+    def consumeComment(self, filename, token, lineno):
         pass
 
 
@@ -901,16 +1138,9 @@ class _AppConsumer(_AppEventConsumer):
         _AppEventConsumer.__init__(self)
         self.parentList = parentList
 
-    def consumeApp(self, filename, line, lineno, variables):
-        mat = _appNamePattern.match(line)
-        name = mat.group('name')
-        if name is None:
-            name = mat.group('qname')
-        name = substituteVariables(name, variables)
-        archive = mat.group('path')
-        if archive is None:
-            archive = mat.group('qpath')
-        archive = substituteVariables(archive, variables)
+    def consumeApp(self, filename, token, lineno, variables, resolved):
+        name = substituteVariables(token.name, variables, resolved)
+        archive = substituteVariables(token.value, variables, resolved)
         dirname = os.path.dirname(os.path.normpath(os.path.abspath(filename)))
         archive = os.path.normpath(os.path.join(dirname, archive))
         obj = ApplicationObject(name, archive)
@@ -923,17 +1153,16 @@ class _AppOptionConsumer(_AppEventConsumer):
         _AppEventConsumer.__init__(self)
         self.parentObject = parentObject
 
-    def consumeOption(self, filename, line, lineno, variables):
-        mat = _appOptionPattern.match(line)
-        name = mat.group('name')
-        value = mat.group('value')
+    def consumeOption(self, filename, token, lineno, variables, resolved):
+        name = token.name
+        value = token.value
         if name == 'appname':
             logger.error(
                 'The \'appname\' option is not allowed in application manifest'
             )
             raise LoadError(
                 'The \'appname\' option is not allowed in application manifest',
-                filename, line, lineno
+                filename, token.line, lineno
             )
         if name.startswith('*'):
             name = name[1:]
@@ -943,7 +1172,7 @@ class _AppOptionConsumer(_AppEventConsumer):
                 return [self, _AppOptionValueConsumer(values)]
             else:
                 self.parentObject.extras[name] = (
-                    substituteVariables(value, variables)
+                    substituteVariables(value, variables, resolved)
                 )
                 return [self, _AppEventConsumer()]
             pass
@@ -954,7 +1183,7 @@ class _AppOptionConsumer(_AppEventConsumer):
                 return [self, _AppOptionValueConsumer(values)]
             else:
                 self.parentObject.options[name] = (
-                    substituteVariables(value, variables)
+                    substituteVariables(value, variables, resolved)
                 )
                 return [self, _AppEventConsumer()]
 
@@ -964,10 +1193,10 @@ class _AppOptionValueConsumer(_AppEventConsumer):
         _AppEventConsumer.__init__(self)
         self.parentList = parentList
 
-    def consumeOptionValue(self, filename, line, lineno, variables):
-        mat = _appOptionValuePattern.match(line)
-        value = mat.group('value')
-        self.parentList.append(substituteVariables(value, variables).split(';'))
+    def consumeOptionValue(self, filename, token, lineno, variables, resolved):
+        self.parentList.append(
+            substituteVariables(token.value, variables, resolved).split(';')
+        )
         return [self, _AppEventConsumer()]
 
 
@@ -1239,7 +1468,11 @@ _extraOptionProcessors = {
 def processExtraAppOption(mo, name, value):
     extraOptionProcessor = _extraOptionProcessors.get(name)
     if extraOptionProcessor:
-        extraOptionProcessor(mo, name, value)
+        try:
+            extraOptionProcessor(mo, name, value)
+        finally:
+            # processors modify configuration via AdminTask
+            wdr.config.invalidateCaches()
     else:
         logger.error(
             'Extra option "%s" specified for %s is not supported', name,
@@ -1255,31 +1488,30 @@ def _importApplicationManifest(filename, variables):
     fi = open(filename, 'r')
     try:
         manifestObjects = []
+        resolved = {}
         stack = [_AppConsumer(manifestObjects)]
         lineno = 0
         for line in fi.readlines():
             lineno += 1
-            imat = _genericPattern.match(line)
-            if not imat:
-                logger.error('wrong indentation in line %d', lineno)
-                raise LoadError('Wrong indentation', filename, line, lineno)
-            indent = len(imat.group('tabs'))
+            token = _tokenizeApplicationLine(line)
+            indent = token.indent
             if len(stack) < indent + 1:
                 return manifestObjects
-            if _appNamePattern.match(line):
+            kind = token.kind
+            if kind == 'application':
                 stack = stack[0:indent] + stack[indent].consumeApp(
-                    filename, line, lineno, variables
+                    filename, token, lineno, variables, resolved
                 )
-            elif _appOptionPattern.match(line):
+            elif kind == 'option':
                 stack = stack[0:indent] + stack[indent].consumeOption(
-                    filename, line, lineno, variables
+                    filename, token, lineno, variables, resolved
                 )
-            elif _appOptionValuePattern.match(line):
+            elif kind == 'optionValue':
                 stack = stack[0:indent] + stack[indent].consumeOptionValue(
-                    filename, line, lineno, variables
+                    filename, token, lineno, variables, resolved
                 )
-            elif _commentPattern.match(line):
-                stack[indent].consumeComment(filename, line, lineno)
+            elif kind == 'comment':
+                stack[indent].consumeComment(filename, token, lineno)
             else:
                 logger.error('invalid manifest statement in line %s', lineno)
                 raise LoadError('Not recognized', filename, line, lineno)
@@ -1407,59 +1639,997 @@ def _locateManifestFile(filename, manifestPath):
 def _loadConfigurationManifest(filename, variables, manifestPath):
     filename = os.path.normpath(os.path.abspath(filename))
     logger.debug('loading file %s with variables %s', filename, variables)
+    resolved = {}
+    return [
+        mo._substitute(variables, resolved)
+        for mo in _parseConfigurationManifest(filename, manifestPath)
+    ]
+
+
+def _parseConfigurationManifest(filename, manifestPath):
+    if _manifestCache is not None:
+        manifestObjects = _manifestCache.get(filename, manifestPath)
+        if manifestObjects is not None:
+            return manifestObjects
+    text = _readManifestFile(filename)
+    dependencies = [(filename, None, filename, _contentDigest(text))]
+    manifestObjects = _parseManifestText(
+        filename, text, dependencies, manifestPath
+    )
+    if _manifestCache is not None:
+        _manifestCache.put(
+            filename, manifestPath, dependencies, manifestObjects
+        )
+    return manifestObjects
+
+
+def _parseIncludedManifest(name, searchPath, dependencies, manifestPath):
+    filename = _locateManifestFile(name, searchPath)
+    text = _readManifestFile(filename)
+    dependencies.append((name, searchPath, filename, _contentDigest(text)))
+    return _parseManifestText(filename, text, dependencies, manifestPath)
+
+
+def _readManifestFile(filename):
     fi = open(filename, 'r')
-    logger.debug('file %s successfully opened', filename)
     try:
-        manifestObjects = []
-        stack = [_ObjectConsumer(manifestObjects)]
-        lineno = 0
-        for line in fi.readlines():
-            lineno += 1
-            imat = _genericPattern.match(line)
-            if not imat:
-                logger.error('[%s(%d)] wrong indentation', filename, lineno)
-                raise LoadError('Wrong indentation', filename, line, lineno)
-            indent = len(imat.group('tabs'))
-            if len(stack) < indent + 1:
-                return manifestObjects
-            if _typePattern.match(line):
-                stack = stack[0:indent] + stack[indent].consumeObject(
-                    filename, line, lineno, manifestPath
-                )
-            elif _keyPattern.match(line):
-                stack = stack[0:indent] + stack[indent].consumeKey(
-                    filename, line, lineno, variables, manifestPath
-                )
-            elif _attPattern.match(line):
-                stack = stack[0:indent] + stack[indent].consumeAttribute(
-                    filename, line, lineno, variables, manifestPath
-                )
-            elif _directivePattern.match(line):
-                stack = stack[0:indent] + stack[indent].consumeDirective(
-                    filename, line, lineno, variables, manifestPath
-                )
-            elif _commentPattern.match(line):
-                stack[indent].consumeComment(
-                    filename, line, lineno, manifestPath
-                )
-            else:
-                logger.error(
-                    '[%s(%d)] invalid manifest statement', filename, lineno
-                )
-                raise LoadError('Not recognized', filename, line, lineno)
-        logger.debug('file %s successfuly parsed', filename)
+        return fi.read()
     finally:
         fi.close()
+
+
+def _contentDigest(text):
+    return _md5(text).hexdigest()
+
+
+def _parseManifestText(filename, text, dependencies, manifestPath):
+    manifestObjects = []
+    stack = [_ObjectConsumer(manifestObjects)]
+    lineno = 0
+    for line in text.splitlines():
+        lineno += 1
+        token = _tokenizeConfigLine(line)
+        indent = token.indent
+        if len(stack) < indent + 1:
+            return manifestObjects
+        kind = token.kind
+        if kind == 'object':
+            stack = stack[0:indent] + stack[indent].consumeObject(
+                filename, token, lineno, manifestPath
+            )
+        elif kind == 'key':
+            stack = stack[0:indent] + stack[indent].consumeKey(
+                filename, token, lineno, dependencies, manifestPath
+            )
+        elif kind == 'attribute':
+            stack = stack[0:indent] + stack[indent].consumeAttribute(
+                filename, token, lineno, dependencies, manifestPath
+            )
+        elif kind == 'directive':
+            stack = stack[0:indent] + stack[indent].consumeDirective(
+                filename, token, lineno, dependencies, manifestPath
+            )
+        elif kind == 'comment':
+            stack[indent].consumeComment(
+                filename, token, lineno, manifestPath
+            )
+        else:
+            logger.error(
+                '[%s(%d)] invalid manifest statement', filename, lineno
+            )
+            raise LoadError('Not recognized', filename, line, lineno)
+    logger.debug('file %s successfuly parsed', filename)
     return manifestObjects
 
 
-def importConfigurationManifest(filename, variables={}, manifestPath=None):
-    manifestPath = manifestPath or _defaultManifestPath()
+def enableManifestCache(cacheDir=None):
+    # parsed manifests are kept in memory and in cacheDir, entries are
+    # validated against contents of the manifest and all of its includes
+    cacheDir = cacheDir or os.path.join(
+        wdr.config._defaultCacheDirectory(), 'manifests'
+    )
+    logger.debug('using manifest cache directory %s', cacheDir)
+    wdr.manifest._manifestCache = ManifestCache(cacheDir)
+
+
+def disableManifestCache():
+    wdr.manifest._manifestCache = None
+
+
+def getManifestCacheStatistics():
+    if _manifestCache is None:
+        return {}
+    return _manifestCache.statistics()
+
+
+class ManifestCache:
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def get(self, filename, manifestPath):
+        key = self._key(filename, manifestPath)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self._read(self._filename(key))
+        if entry is not None and self._isValid(entry[0]):
+            self.entries[key] = entry
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, filename, manifestPath, dependencies, manifestObjects):
+        key = self._key(filename, manifestPath)
+        self.entries[key] = (dependencies, manifestObjects)
+        try:
+            self._write(self._filename(key), dependencies, manifestObjects)
+            self.writes += 1
+        except (IOError, OSError):
+            logger.warning(
+                'unable to write manifest cache for %s', filename, exc_info=1
+            )
+
+    def statistics(self):
+        return {
+            'hits': self.hits, 'misses': self.misses, 'writes': self.writes,
+        }
+
+    def _key(self, filename, manifestPath):
+        return _contentDigest('\n'.join([filename] + list(manifestPath)))
+
+    def _filename(self, key):
+        return os.path.join(self.directory, 'manifest-%s.cache' % key)
+
+    def _isValid(self, dependencies):
+        for (name, searchPath, filename, digest) in dependencies:
+            try:
+                if searchPath is not None and (
+                    _locateManifestFile(name, searchPath) != filename
+                ):
+                    return 0
+                if _contentDigest(_readManifestFile(filename)) != digest:
+                    return 0
+            except Exception:
+                # manifest or included file is no longer found
+                return 0
+        return 1
+
+    def _write(self, filename, dependencies, manifestObjects):
+        dirname = os.path.dirname(filename)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        tmpFilename = filename + '.tmp'
+        fo = open(tmpFilename, 'w')
+        try:
+            fo.write('%s\t%d\n' % (_manifestCacheHeader, _manifestCacheVersion))
+            for (name, searchPath, path, digest) in dependencies:
+                if searchPath is None:
+                    fields = ['D', name, '-', path, digest]
+                else:
+                    fields = ['D', name, '+', path, digest] + searchPath
+                _writeCacheRecord(fo, fields)
+            for mo in manifestObjects:
+                _writeCachedObject(fo, mo, 0, '')
+        finally:
+            fo.close()
+        if os.path.exists(filename):
+            os.remove(filename)
+        os.rename(tmpFilename, filename)
+
+    def _read(self, filename):
+        if not os.path.isfile(filename):
+            return None
+        lines = _readManifestFile(filename).splitlines()
+        if lines[:1] != [
+            '%s\t%d' % (_manifestCacheHeader, _manifestCacheVersion)
+        ]:
+            logger.warning(
+                'manifest cache %s has unsupported format, ignoring it',
+                filename
+            )
+            return None
+        dependencies = []
+        manifestObjects = []
+        stack = []
+        try:
+            for line in lines[1:]:
+                fields = map(wdr.util.unescapeField, line.split('\t'))
+                kind = fields[0]
+                if kind == 'D':
+                    if fields[2] == '-':
+                        searchPath = None
+                    else:
+                        searchPath = fields[5:]
+                    dependencies.append(
+                        (fields[1], searchPath, fields[3], fields[4])
+                    )
+                elif kind == 'O':
+                    depth = int(fields[1])
+                    mo = ManifestConfigObject(
+                        fields[3], fields[7], int(fields[8])
+                    )
+                    mo.operation = fields[4]
+                    mo.anchor = fields[5] or None
+                    mo.reference = fields[6] or None
+                    stack[depth:] = [mo]
+                    if depth == 0:
+                        manifestObjects.append(mo)
+                    elif fields[2]:
+                        stack[depth - 1].attributes[fields[2]].append(mo)
+                    else:
+                        stack[depth - 1].children.append(mo)
+                elif kind == 'K':
+                    mo = stack[int(fields[1])]
+                    mo.keys[fields[2]] = _cachedValue(fields[3:])
+                elif kind in ('A', 'L'):
+                    mo = stack[int(fields[1])]
+                    if kind == 'A':
+                        mo.attributes[fields[2]] = _cachedValue(fields[3:])
+                    else:
+                        mo.attributes[fields[2]] = []
+                    mo._orderedAttributeNames.append(fields[2])
+        except (IndexError, KeyError, ValueError):
+            logger.warning(
+                'manifest cache %s is malformed, ignoring it', filename
+            )
+            return None
+        return (dependencies, manifestObjects)
+
+
+def _writeCacheRecord(fo, fields):
+    fo.write('\t'.join(map(wdr.util.escapeField, fields)) + '\n')
+
+
+def _writeCachedObject(fo, mo, depth, parentAttribute):
+    _writeCacheRecord(
+        fo,
+        [
+            'O', str(depth), parentAttribute, mo.type, mo.operation,
+            mo.anchor or '', mo.reference or '', mo.filename or '',
+            str(mo.linenumber)
+        ]
+    )
+    for (k, v) in mo.keys.items():
+        _writeCacheRecord(fo, ['K', str(depth), k] + _cacheValueFields(v))
+    for k in mo._orderedAttributeNames:
+        v = mo.attributes[k]
+        if isinstance(v, ListType):
+            _writeCacheRecord(fo, ['L', str(depth), k])
+            for c in v:
+                _writeCachedObject(fo, c, depth + 1, k)
+        else:
+            _writeCacheRecord(
+                fo, ['A', str(depth), k] + _cacheValueFields(v)
+            )
+    for c in mo.children:
+        _writeCachedObject(fo, c, depth + 1, '')
+
+
+def _cacheValueFields(value):
+    # keys and attributes without value are parsed as None
+    if value is None:
+        return ['-']
+    return ['=', value]
+
+
+def _cachedValue(fields):
+    if fields[0] == '-':
+        return None
+    return fields[1]
+
+
+def enableManifestPrefetch():
+    wdr.manifest._manifestPrefetch = 1
+
+
+def disableManifestPrefetch():
+    wdr.manifest._manifestPrefetch = 0
+
+
+def _applyManifestObjects(manifestObjects, attributeCache, plan=None):
     anchors = {}
+    queryCache = None
+    if _manifestPrefetch and wdr.config._queryCache is None:
+        # lookups made by the prefetch are repeated when applying
+        wdr.config.enableQueryCache()
+        queryCache = wdr.config._queryCache
+    try:
+        if _manifestPrefetch:
+            _prefetchManifestObjects(manifestObjects, attributeCache)
+        for mo in manifestObjects:
+            mo.apply(anchors, None, None, attributeCache, plan)
+    finally:
+        if queryCache is not None:
+            wdr.config.disableQueryCache()
+
+
+def _prefetchManifestObjects(manifestObjects, attributeCache):
+    # attributes of candidate objects are read with one AdminConfig.show per
+    # object, level by level, following only objects matched by the manifest
+    startTime = time.time()
+    level = []
+    candidates = {}
+    for mo in manifestObjects:
+        if mo.reference is None:
+            if not candidates.has_key(mo.type):
+                candidates[mo.type] = wdr.config.listConfigObjects(mo.type)
+            level.append((mo, candidates[mo.type]))
+    shown = {}
+    count = 0
+    while level:
+        pending = []
+        for (mo, moCandidates) in level:
+            for c in moCandidates:
+                if c is not None and not shown.has_key(c._id):
+                    shown[c._id] = 1
+                    pending.append(c)
+        attributeCache.prefetch(pending)
+        count = count + len(pending)
+        nextLevel = []
+        for (mo, moCandidates) in level:
+            matching = mo._filterMatching(moCandidates, attributeCache)
+            if len(matching) == 1 and mo.operation != Operations.remove:
+                nextLevel.extend(
+                    _childCandidates(mo, matching[0], attributeCache)
+                )
+        level = nextLevel
+    logger.debug(
+        'prefetched %d objects in %.2f seconds',
+        count, time.time() - startTime
+    )
+
+
+def _childCandidates(mo, configObject, attributeCache):
+    # (manifest object, candidates) pairs for objects nested in mo, which
+    # matched configObject
+    result = []
+    typeInfo = wdr.config.getTypeInfo(configObject._type)
+    for name in mo._orderedAttributeNames:
+        value = mo.attributes[name]
+        if not isinstance(value, ListType) or (
+            not typeInfo.attributes.has_key(name)
+        ):
+            continue
+        (converter, isList, isReference) = (
+            typeInfo.attributeDescriptor(name)[0:3]
+        )
+        if converter or isReference:
+            continue
+        candidates = attributeCache.getAttribute(configObject, name)
+        if not isList:
+            candidates = [candidates]
+        for child in value:
+            result.append((child, candidates))
+    for child in mo.children:
+        if child.reference is None:
+            result.append(
+                (child, attributeCache.children(configObject, child.type))
+            )
+    return result
+
+
+def enableIncrementalManifests(stateDir=None):
+    # top-level objects of configuration manifests are skipped when neither
+    # the object nor any configuration object matched by it or by objects
+    # nested in it have changed since the last import, state of an import
+    # is recorded once it gets saved
+    stateDir = stateDir or os.path.join(
+        wdr.config._defaultCacheDirectory(), 'manifests'
+    )
+    logger.debug('using manifest state directory %s', stateDir)
+    disableIncrementalManifests()
+    wdr.manifest._manifestState = ManifestState(stateDir)
+    wdr.config.addWorkspaceListener(_manifestState)
+
+
+def disableIncrementalManifests():
+    if _manifestState is not None:
+        wdr.config.removeWorkspaceListener(_manifestState)
+    wdr.manifest._manifestState = None
+
+
+def getIncrementalManifestStatistics():
+    if _manifestState is None:
+        return {}
+    return _manifestState.statistics()
+
+
+class ManifestState:
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = {}
+        self.pending = {}
+        self.applied = 0
+        self.skipped = 0
+        self.writes = 0
+
+    def key(self, filename):
+        return _contentDigest(
+            '\n'.join(
+                [wdr.config._cellName() or '', os.path.abspath(filename)]
+            )
+        )
+
+    def get(self, key):
+        # maps checksums of top-level manifest objects to fingerprints of
+        # configuration objects they matched
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = self._read(self._filename(key))
+        return entry
+
+    def record(self, key, fingerprints):
+        self.pending[key] = fingerprints
+
+    def workspaceSaved(self):
+        for (key, fingerprints) in self.pending.items():
+            self.entries[key] = fingerprints
+            try:
+                self._write(self._filename(key), fingerprints)
+                self.writes += 1
+            except (IOError, OSError):
+                logger.warning(
+                    'unable to write manifest state %s', key, exc_info=1
+                )
+        self.pending = {}
+
+    def workspaceReset(self):
+        self.pending = {}
+
+    def statistics(self):
+        return {
+            'applied': self.applied, 'skipped': self.skipped,
+            'writes': self.writes,
+        }
+
+    def _filename(self, key):
+        return os.path.join(self.directory, 'manifest-%s.state' % key)
+
+    def _write(self, filename, fingerprints):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        tmpFilename = filename + '.tmp'
+        fo = open(tmpFilename, 'w')
+        try:
+            fo.write('%s\t%d\n' % (_manifestStateHeader, _manifestStateVersion))
+            for (checksum, fingerprint) in fingerprints.items():
+                _writeCacheRecord(fo, ['S', checksum, fingerprint])
+        finally:
+            fo.close()
+        if os.path.exists(filename):
+            os.remove(filename)
+        os.rename(tmpFilename, filename)
+
+    def _read(self, filename):
+        fingerprints = {}
+        if not os.path.isfile(filename):
+            return fingerprints
+        lines = _readManifestFile(filename).splitlines()
+        if lines[:1] != [
+            '%s\t%d' % (_manifestStateHeader, _manifestStateVersion)
+        ]:
+            logger.warning(
+                'manifest state %s has unsupported format, ignoring it',
+                filename
+            )
+            return fingerprints
+        for line in lines[1:]:
+            fields = line.split('\t')
+            if fields[0] == 'S' and len(fields) == 3:
+                fingerprints[fields[1]] = fields[2]
+        return fingerprints
+
+
+def _importIncrementally(filename, manifestObjects, force):
+    state = _manifestState
+    key = state.key(filename)
+    recorded = state.get(key)
+    sharingAnchors = _subtreesSharingAnchors(manifestObjects)
     attributeCache = wdr.config.AttributeValueCache()
-    for mo in _loadConfigurationManifest(
-        _locateManifestFile(filename, manifestPath),
-        variables,
-        manifestPath
+    checksums = []
+    fingerprints = {}
+    applied = []
+    for i in range(len(manifestObjects)):
+        mo = manifestObjects[i]
+        checksum = mo.checksum()
+        checksums.append(checksum)
+        if force or sharingAnchors.has_key(i) or (
+            not recorded.has_key(checksum)
+        ):
+            applied.append(mo)
+            continue
+        fingerprint = _targetFingerprint(mo, attributeCache)
+        if fingerprint == recorded[checksum]:
+            logger.debug(
+                '[%s] %s is up to date, skipping it',
+                mo.getSourceLocation(), mo.type
+            )
+            fingerprints[checksum] = fingerprint
+        else:
+            applied.append(mo)
+    _applyManifestObjects(applied, attributeCache)
+    state.applied += len(applied)
+    state.skipped += len(manifestObjects) - len(applied)
+    # fingerprints are taken after all objects have been applied, as later
+    # objects may modify configuration objects matched by earlier ones
+    attributeCache = wdr.config.AttributeValueCache()
+    for i in range(len(manifestObjects)):
+        if not fingerprints.has_key(checksums[i]):
+            fingerprints[checksums[i]] = _targetFingerprint(
+                manifestObjects[i], attributeCache
+            )
+    state.record(key, fingerprints)
+    if not wdr.config.hasChanges():
+        state.workspaceSaved()
+    return len(manifestObjects) - len(applied)
+
+
+def _targetFingerprint(mo, attributeCache):
+    # every configuration object matched by the manifest object or by the
+    # objects nested in it contributes its attributes
+    lines = []
+    _collectFingerprint(
+        mo, wdr.config.listConfigObjects(mo.type), attributeCache, {}, lines
+    )
+    return _contentDigest('\n'.join(lines))
+
+
+def _collectFingerprint(mo, candidates, attributeCache, shown, lines):
+    # candidates are shown before being matched, keys are then compared
+    # without reading attributes one by one
+    pending = []
+    for c in candidates:
+        if c is not None and not shown.has_key(str(c)):
+            pending.append(c)
+    shown.update(attributeCache.prefetch(pending))
+    matching = mo._filterMatching(candidates, attributeCache)
+    lines.append('%s %d' % (mo.type, len(matching)))
+    for o in matching:
+        attributes = shown.get(str(o), {})
+        names = attributes.keys()
+        names.sort()
+        lines.append(str(o))
+        for name in names:
+            lines.append('%s %s' % (name, _planValueString(attributes[name])))
+    if len(matching) == 1 and mo.operation != Operations.remove:
+        for (child, childCandidates) in _childCandidates(
+            mo, matching[0], attributeCache
+        ):
+            _collectFingerprint(
+                child, childCandidates, attributeCache, shown, lines
+            )
+
+
+def _subtreesSharingAnchors(manifestObjects):
+    # objects referring to anchors of other top-level objects are always
+    # applied, along with the objects defining those anchors
+    anchors = {}
+    references = []
+    for i in range(len(manifestObjects)):
+        _collectAnchors(manifestObjects[i], i, anchors, references)
+    result = {}
+    for (reference, i) in references:
+        j = anchors.get(reference, i)
+        if j != i:
+            result[i] = 1
+            result[j] = 1
+    return result
+
+
+def _collectAnchors(mo, index, anchors, references):
+    if mo.anchor:
+        anchors[mo.anchor] = index
+    if mo.reference:
+        references.append((mo.reference, index))
+    for v in mo.attributes.values():
+        if isinstance(v, ListType):
+            for c in v:
+                _collectAnchors(c, index, anchors, references)
+    for c in mo.children:
+        _collectAnchors(c, index, anchors, references)
+
+
+def importConfigurationManifest(
+    filename, variables={}, manifestPath=None, force=0
+):
+    # with incremental manifests enabled, force applies all objects
+    manifestPath = manifestPath or _defaultManifestPath()
+    initialStatistics = wdr.config.getModifyStatistics()
+    manifestFile = _locateManifestFile(filename, manifestPath)
+    manifestObjects = _loadConfigurationManifest(
+        manifestFile, variables, manifestPath
+    )
+    if _manifestState is None:
+        _applyManifestObjects(
+            manifestObjects, wdr.config.AttributeValueCache()
+        )
+    else:
+        skipped = _importIncrementally(manifestFile, manifestObjects, force)
+        logger.info(
+            'manifest %s: %d of %d top-level objects were unchanged',
+            filename, skipped, len(manifestObjects)
+        )
+    statistics = wdr.config.getModifyStatistics()
+    logger.info(
+        'manifest %s applied, %d attributes changed, %d were up to date',
+        filename,
+        statistics['changed'] - initialStatistics['changed'],
+        statistics['skipped'] - initialStatistics['skipped']
+    )
+
+
+def planConfigurationManifest(filename, variables={}, manifestPath=None):
+    # computes changes the manifest would make, without making them
+    manifestPath = manifestPath or _defaultManifestPath()
+    plan = ConfigurationPlan()
+    prefetch = wdr.config._attributePrefetch
+    wdr.config._attributePrefetch = 1
+    try:
+        _applyManifestObjects(
+            _loadConfigurationManifest(
+                _locateManifestFile(filename, manifestPath),
+                variables,
+                manifestPath
+            ),
+            _PlanningAttributeCache(), plan
+        )
+    finally:
+        wdr.config._attributePrefetch = prefetch
+    logger.info(
+        'manifest %s planned, %d changes, %d attributes were up to date',
+        filename, len(plan.steps), plan.upToDate
+    )
+    return plan
+
+
+def applyConfigurationPlan(plan):
+    createdObjects = {}
+    for step in plan.steps:
+        step.apply(createdObjects)
+    logger.info('plan with %d changes applied', len(plan.steps))
+
+
+def saveConfigurationPlan(plan, filename):
+    tmpFilename = filename + '.tmp'
+    fo = open(tmpFilename, 'w')
+    try:
+        fo.write('%s\t%d\n' % (_planHeader, _planFormatVersion))
+        for step in plan.steps:
+            _writeCacheRecord(fo, step.fields())
+    finally:
+        fo.close()
+    if os.path.exists(filename):
+        os.remove(filename)
+    os.rename(tmpFilename, filename)
+
+
+def loadConfigurationPlan(filename):
+    lines = _readManifestFile(filename).splitlines()
+    if lines[:1] != ['%s\t%d' % (_planHeader, _planFormatVersion)]:
+        raise Exception('%s is not a supported WDR plan file' % filename)
+    plan = ConfigurationPlan()
+    lineNo = 1
+    for line in lines[1:]:
+        lineNo = lineNo + 1
+        try:
+            fields = map(wdr.util.unescapeField, line.split('\t'))
+            plan.steps.append(_loadPlanStep(plan, fields))
+        except (IndexError, KeyError, ValueError):
+            raise Exception(
+                'invalid record in %s at line %d' % (filename, lineNo)
+            )
+    return plan
+
+
+def _loadPlanStep(plan, fields):
+    (kind, location, target) = fields[0:3]
+    target = _decodePlanTarget(plan, target)
+    if kind == 'C':
+        step = PlanStep(
+            'create', location, target, wdr.util.decodeValue(fields[3]),
+            wdr.util.decodeValue(fields[5]), fields[4]
+        )
+        step.result = _PlannedObject(fields[4], len(plan.steps), step.value)
+    elif kind == 'M':
+        step = PlanStep(
+            'modify', location, target, fields[3],
+            wdr.util.decodeValue(fields[4])
+        )
+    elif kind == 'R':
+        step = PlanStep('remove', location, target)
+    elif kind == 'F':
+        value = wdr.util.decodeValue(fields[4])
+        if isinstance(value, ListType):
+            value = [_decodePlanTarget(plan, v) for v in value]
+        elif value is not None:
+            value = _decodePlanTarget(plan, value)
+        step = PlanStep('reference', location, target, fields[3], value)
+    else:
+        raise ValueError(kind)
+    return step
+
+
+def _encodePlanTarget(target):
+    if isinstance(target, _PlannedObject):
+        return 'P%d' % target.step
+    return 'O%s' % target
+
+
+def _decodePlanTarget(plan, text):
+    if text[:1] == 'P':
+        return plan.steps[int(text[1:])].result
+    elif text[:1] == 'O':
+        # names may contain spaces, quoted ids are parsed either way
+        return wdr.config.configObject('"%s"' % text[1:])
+    raise ValueError(text)
+
+
+class ConfigurationPlan:
+    def __init__(self):
+        self.steps = []
+        self.upToDate = 0
+        self.removed = {}
+        self.createdObjects = {}
+        self.createdChildren = {}
+
+    def __str__(self):
+        result = ''
+        number = 0
+        for step in self.steps:
+            number = number + 1
+            result += '%4d. %s\n' % (number, step)
+        return result
+
+    def __unicode__(self):
+        return unicode(self.__str__())
+
+    def create(
+        self, mo, parentObject, parentAttribute, attributes, attributeCache
+    ):
+        step = PlanStep(
+            'create', mo.getSourceLocation(), parentObject, parentAttribute,
+            attributes, mo.type
+        )
+        step.result = _PlannedObject(mo.type, len(self.steps), attributes)
+        self.steps.append(step)
+        self.createdObjects.setdefault(mo.type, []).append(step.result)
+        if parentAttribute is None:
+            self.createdChildren.setdefault(
+                (str(parentObject), mo.type), []
+            ).append(step.result)
+        elif wdr.config.getTypeInfo(parentObject._type).attributes[
+            parentAttribute
+        ].list:
+            attributeCache.setValue(
+                parentObject, parentAttribute,
+                list(
+                    attributeCache.getAttribute(parentObject, parentAttribute)
+                    or []
+                ) + [step.result]
+            )
+        else:
+            attributeCache.setValue(parentObject, parentAttribute, step.result)
+        return step.result
+
+    def modify(self, mo, configObject, name, value, attributeCache):
+        if isinstance(configObject, _PlannedObject):
+            upToDate = attributeCache.getAttribute(configObject, name) == value
+        else:
+            upToDate = _isUpToDate(configObject, name, value, attributeCache)
+        if upToDate:
+            self.upToDate = self.upToDate + 1
+            return
+        self.steps.append(
+            PlanStep(
+                'modify', mo.getSourceLocation(), configObject, name, value
+            )
+        )
+        if isinstance(configObject, _PlannedObject):
+            attributeCache.setValue(configObject, name, value)
+
+    def remove(self, mo, configObject):
+        self.steps.append(
+            PlanStep('remove', mo.getSourceLocation(), configObject)
+        )
+        self.removed[str(configObject)] = 1
+
+    def assignReference(
+        self, mo, configObject, name, anchor, isList, attributeCache
+    ):
+        (changed, value) = _referenceValue(
+            mo.operation, attributeCache.getAttribute(configObject, name),
+            anchor, isList
+        )
+        if not changed:
+            return
+        self.steps.append(
+            PlanStep(
+                'reference', mo.getSourceLocation(), configObject, name, value
+            )
+        )
+        attributeCache.setValue(configObject, name, value)
+
+    def lookup(self, parentObject, typeName, attributeCache):
+        if isinstance(parentObject, _PlannedObject):
+            result = []
+        else:
+            result = attributeCache.children(parentObject, typeName)
+        return result + self.createdChildren.get(
+            (str(parentObject), typeName), []
+        )
+
+    def listConfigObjects(self, typeName):
+        return (
+            wdr.config.listConfigObjects(typeName)
+            + self.createdObjects.get(typeName, [])
+        )
+
+    def isRemoved(self, configObject):
+        return self.removed.has_key(str(configObject))
+
+
+class PlanStep:
+    def __init__(
+        self, kind, location, target, attributeName=None, value=None,
+        type=None
     ):
-        mo.apply(anchors, None, None, attributeCache)
+        self.kind = kind
+        self.location = location
+        self.target = target
+        self.attributeName = attributeName
+        self.value = value
+        self.type = type
+        self.result = None
+
+    def __str__(self):
+        if self.kind == 'create':
+            if self.attributeName:
+                parent = '%s.%s' % (self.target, self.attributeName)
+            else:
+                parent = str(self.target)
+            return '[%s] create %s %s in %s' % (
+                self.location, self.type, self.value, parent
+            )
+        elif self.kind == 'remove':
+            return '[%s] remove %s' % (self.location, self.target)
+        else:
+            return '[%s] %s %s.%s = %s' % (
+                self.location, self.kind, self.target, self.attributeName,
+                _planValueString(self.value)
+            )
+
+    def fields(self):
+        target = _encodePlanTarget(self.target)
+        if self.kind == 'create':
+            return [
+                'C', self.location, target,
+                wdr.util.encodeValue(self.attributeName), self.type,
+                wdr.util.encodeValue(self.value)
+            ]
+        elif self.kind == 'modify':
+            return [
+                'M', self.location, target, self.attributeName,
+                wdr.util.encodeValue(self.value)
+            ]
+        elif self.kind == 'remove':
+            return ['R', self.location, target]
+        elif isinstance(self.value, ListType):
+            value = map(_encodePlanTarget, self.value)
+        elif self.value is not None:
+            value = _encodePlanTarget(self.value)
+        else:
+            value = None
+        return [
+            'F', self.location, target, self.attributeName,
+            wdr.util.encodeValue(value)
+        ]
+
+    def apply(self, createdObjects):
+        target = _resolvePlanTarget(self.target, createdObjects)
+        if self.kind == 'create':
+            createdObjects[self.result.step] = target._create(
+                self.type, self.attributeName, self.value
+            )
+        elif self.kind == 'modify':
+            try:
+                target._modify([[self.attributeName, self.value]])
+            except wdr.util.SCRIPTING_EXCEPTIONS, ex:
+                msg = '' + ex.message
+                if msg.find('ADMG0014E') != -1:
+                    logger.warning(
+                        '[%s] read-only attribute %s.%s could not be modified',
+                        self.location, target._type, self.attributeName
+                    )
+                else:
+                    raise
+        elif self.kind == 'remove':
+            target.remove()
+        elif isinstance(self.value, ListType):
+            target[self.attributeName] = [
+                _resolvePlanTarget(v, createdObjects) for v in self.value
+            ]
+        elif self.value is None:
+            target[self.attributeName] = None
+        else:
+            target[self.attributeName] = _resolvePlanTarget(
+                self.value, createdObjects
+            )
+
+
+def _resolvePlanTarget(target, createdObjects):
+    if isinstance(target, _PlannedObject):
+        return createdObjects[target.step]
+    return target
+
+
+def _planValueString(value):
+    if isinstance(value, ListType):
+        return '[%s]' % ' '.join(map(str, value))
+    return str(value)
+
+
+def _isUpToDate(configObject, name, value, attributeCache):
+    (cnv, isList) = wdr.config.getTypeInfo(
+        configObject._type
+    ).attributeDescriptor(name)[0:2]
+    if value is None:
+        return attributeCache.getAttribute(configObject, name) is None
+    if isList:
+        if cnv:
+            v = ';'.join(map(cnv.toAdminConfig, value))
+        else:
+            v = map(str, value)
+        return configObject._currentListValue(name, attributeCache) == v
+    if cnv:
+        v = cnv.toAdminConfig(value)
+    else:
+        v = str(value)
+    return configObject._currentAtomicValue(name, attributeCache) == v
+
+
+class _PlannedObject:
+    # stands for an object created by a plan until the plan gets applied
+    def __init__(self, type, step, attributes):
+        self._type = type
+        self.step = step
+        self.attributes = {}
+        for (name, value) in attributes:
+            self.attributes[name] = value
+
+    def __str__(self):
+        return '(new %s from step %d)' % (self._type, self.step + 1)
+
+    def __nonzero__(self):
+        return 1
+
+
+class _PlanningAttributeCache(wdr.config.AttributeValueCache):
+    # values the plan is going to assign override values being read
+    def __init__(self):
+        wdr.config.AttributeValueCache.__init__(self)
+        self.overrides = {}
+
+    def getAttribute(self, configObject, attributeName):
+        if isinstance(configObject, _PlannedObject):
+            if configObject.attributes.has_key(attributeName):
+                return configObject.attributes[attributeName]
+            typeInfo = wdr.config.getTypeInfo(configObject._type)
+            if typeInfo.attributes[attributeName].list:
+                return []
+            return None
+        key = (str(configObject), attributeName)
+        if self.overrides.has_key(key):
+            return self.overrides[key]
+        return wdr.config.AttributeValueCache.getAttribute(
+            self, configObject, attributeName
+        )
+
+    def setValue(self, configObject, attributeName, value):
+        if isinstance(configObject, _PlannedObject):
+            configObject.attributes[attributeName] = value
+        else:
+            self.overrides[(str(configObject), attributeName)] = value
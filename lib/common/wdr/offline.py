@@ -0,0 +1,765 @@
+from string import join, split
+import logging
+import os
+import re
+
+import wdr
+import wdr.config
+
+logger = logging.getLogger('wdr.offline')
+
+# XMI documents are generated by WebSphere, a tokenizer based on regular
+# expressions is sufficient to read them and works the same way in every
+# Jython version shipped with wsadmin
+_markupPattern = re.compile(
+    r'<(?:'
+    r'!--.*?--'
+    r'|\?.*?\?'
+    r'|!\[CDATA\[(?P<cdata>.*?)\]\]'
+    r'|![^>]*'
+    r'|(?P<end>/?)(?P<tag>[^\s/>]+)'
+    r'(?P<attributes>(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|\'[^\']*\'))*)'
+    r'\s*(?P<empty>/?)'
+    r')>',
+    re.S
+)
+_xmlAttributePattern = re.compile(
+    r'([^\s=]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')'
+)
+_entityPattern = re.compile(r'&(#[0-9]+|#x[0-9a-fA-F]+|[a-zA-Z]+);')
+_xmlIdTypePattern = re.compile(r'([A-Z][a-zA-Z0-9]*)_[0-9]+\Z')
+_entities = {'lt': '<', 'gt': '>', 'amp': '&', 'quot': '"', 'apos': "'"}
+
+# root objects of these documents contain all objects stored in the same
+# directory and its subdirectories
+_ownerDocuments = {
+    'cell.xml': 1,
+    'node.xml': 1,
+    'server.xml': 1,
+    'cluster.xml': 1,
+    'deployment.xml': 1,
+    'nodegroup.xml': 1,
+    'coregroup.xml': 1,
+}
+
+_ATTRIBUTE = 'attribute'
+_TEXT = 'text'
+_CHILDREN = 'children'
+_HREF = 'href'
+_REFERENCES = 'references'
+
+_liveTypeRegistry = None
+
+
+def openRepository(location, typeRegistryCache=None):
+    if typeRegistryCache:
+        wdr.config._loadTypeRegistryCache(typeRegistryCache)
+    repository = OfflineAdminConfig()
+    if os.path.isdir(location):
+        repository.loadDirectory(location)
+    elif _isSnapshot(location):
+        repository.loadSnapshot(location)
+    else:
+        repository.loadArchive(location)
+    return repository
+
+
+def useRepository(location, typeRegistryCache=None):
+    if wdr.offline._liveTypeRegistry is None:
+        # types read from the repository must not leak into the live session
+        wdr.offline._liveTypeRegistry = (
+            wdr.config._typeRegistry.copy(),
+            wdr.config._typeRegistryInitialized
+        )
+    if isinstance(location, OfflineAdminConfig):
+        repository = location
+    else:
+        repository = openRepository(location, typeRegistryCache)
+    wdr.replaceWsadminObject('AdminConfig', repository)
+    wdr.config.invalidateCaches()
+    wdr.config._clearInternedConfigIds()
+    return repository
+
+
+def closeRepository():
+    wdr.restoreWsadminObject('AdminConfig')
+    if wdr.offline._liveTypeRegistry is not None:
+        (typeRegistry, initialized) = wdr.offline._liveTypeRegistry
+        wdr.config._typeRegistry.clear()
+        wdr.config._typeRegistry.update(typeRegistry)
+        wdr.config._typeRegistryInitialized = initialized
+        wdr.offline._liveTypeRegistry = None
+    wdr.config.invalidateCaches()
+    wdr.config._clearInternedConfigIds()
+
+
+class OfflineAdminConfig:
+    # read-only replacement of AdminConfig backed by XML documents of
+    # a configuration repository
+    def __init__(self):
+        self.objects = {}
+        self.documents = {}
+        self.objectsByType = {}
+        self.attributeTypes = {}
+        self.parentTypes = {}
+
+    def loadDirectory(self, directory):
+        root = _configRoot(directory)
+        for relativePath in _listDocuments(root, ''):
+            fi = open(os.path.join(root, relativePath), 'r')
+            try:
+                text = fi.read()
+            finally:
+                fi.close()
+            self._loadDocument(relativePath, text)
+        self._resolve()
+        logger.info(
+            'loaded %d configuration objects from %d documents in %s',
+            len(self.objects), len(self.documents), root
+        )
+
+    def loadArchive(self, filename):
+        for (name, text) in _readArchive(filename):
+            name = name.replace('\\', '/')
+            pos = ('/' + name).find('/cells/')
+            if pos < 0 or name[-4:] != '.xml':
+                continue
+            self._loadDocument(name[pos:], text)
+        self._resolve()
+        logger.info(
+            'loaded %d configuration objects from %d documents in %s',
+            len(self.objects), len(self.documents), filename
+        )
+
+    def loadSnapshot(self, filename):
+        fi = open(filename, 'r')
+        try:
+            reader = wdr.config._SnapshotReader(fi)
+            scope = reader.readHeader()
+            parents = []
+            record = reader.readRecord()
+            while record is not None:
+                if record[0] == 'T':
+                    typeInfo = reader.readType(record)
+                    # types known to the session take precedence
+                    if not wdr.config._typeRegistry.has_key(typeInfo.name):
+                        wdr.config._typeRegistry[typeInfo.name] = typeInfo
+                elif record[0] == 'O':
+                    self._loadSnapshotObject(reader.readObject(record))
+                elif record[0] == 'P':
+                    parents.append((record[1], record[2]))
+                record = reader.readRecord()
+        finally:
+            fi.close()
+        self._resolveSnapshot(parents)
+        logger.info(
+            'loaded %d configuration objects from snapshot of %s in %s',
+            len(self.objects), scope, filename
+        )
+
+    def list(self, type, scopeOrPattern=None):
+        objects = self.objectsByType.get(type, [])
+        if scopeOrPattern:
+            if scopeOrPattern.find('*') < 0:
+                scope = self._getObject(scopeOrPattern)
+                objects = [o for o in objects if _isContained(o, {scope: 1})]
+            else:
+                pattern = re.compile(
+                    join(map(re.escape, split(scopeOrPattern, '*')), '.*')
+                    + r'\Z'
+                )
+                objects = [o for o in objects if pattern.match(o.configId)]
+        return join([o.configId for o in objects], '\n')
+
+    def getid(self, criteria):
+        matches = None
+        for segment in split(criteria, '/'):
+            if not segment:
+                continue
+            pos = segment.find(':')
+            if pos < 0:
+                (type, name) = (segment, '')
+            else:
+                (type, name) = (segment[:pos], segment[pos + 1:])
+            candidates = [
+                o for o in self.objectsByType.get(type, [])
+                if not name or o.name == name
+            ]
+            if matches is not None:
+                scopes = {}
+                for o in matches:
+                    scopes[o] = 1
+                candidates = [o for o in candidates if _isContained(o, scopes)]
+            matches = candidates
+        return join([o.configId for o in matches or []], '\n')
+
+    def getObjectType(self, configId):
+        return self._getObject(configId).type
+
+    def showAttribute(self, configId, name):
+        return self._formatValue(self._getObject(configId), name)
+
+    def show(self, configId, attributeNames=None):
+        obj = self._getObject(configId)
+        if attributeNames:
+            names = split(
+                attributeNames.replace('[', ' ').replace(']', ' ')
+            )
+        else:
+            names = obj.values.keys()
+            names.sort()
+        lines = []
+        for name in names:
+            value = self._formatValue(obj, name)
+            if value is None:
+                continue
+            if obj.values.has_key(name) and (
+                obj.values[name][0] in (_ATTRIBUTE, _TEXT)
+                and not self._attributeFlags(obj.type, name)[0]
+            ):
+                # show() prints empty strings as [] and quotes values
+                # containing spaces
+                if value == '':
+                    value = '[]'
+                elif value.find(' ') >= 0:
+                    value = '"%s"' % value
+            lines.append('[%s %s]' % (name, value))
+        return join(lines, '\n')
+
+    def types(self):
+        names = {}
+        for name in self.objectsByType.keys():
+            names[name] = 1
+        for name in self.attributeTypes.keys():
+            names[name] = 1
+        for name in wdr.config._typeRegistry.keys():
+            names[name] = 1
+        result = names.keys()
+        result.sort()
+        return join(result, '\n')
+
+    def attributes(self, type):
+        lines = []
+        typeInfo = wdr.config._typeRegistry.get(type)
+        if typeInfo is not None:
+            for ai in typeInfo.attributes.values():
+                lines.append(
+                    _formatAttributeType(
+                        ai.name, ai.type, ai.list, ai.reference
+                    )
+                )
+        else:
+            for (name, (typeName, isList, isReference)) in (
+                self.attributeTypes.get(type, {}).items()
+            ):
+                lines.append(
+                    _formatAttributeType(name, typeName, isList, isReference)
+                )
+        lines.sort()
+        return join(lines, '\n')
+
+    def parents(self, type):
+        result = self.parentTypes.get(type, {}).keys()
+        if not result:
+            return 'WASX7351I: The configuration type %s has no parents' % type
+        result.sort()
+        return join(result, '\n')
+
+    def hasChanges(self):
+        return 0
+
+    def reset(self):
+        pass
+
+    def _readOnly(self, *args):
+        raise Exception('offline configuration repository is read-only')
+
+    create = _readOnly
+    modify = _readOnly
+    remove = _readOnly
+    unsetAttributes = _readOnly
+    save = _readOnly
+
+    def _getObject(self, configId):
+        return self._getObjectById(_parseConfigId(configId))
+
+    def _getObjectById(self, cid):
+        obj = self.objects.get((cid.xmlPath, cid.xmlDoc, cid.xmlId))
+        if obj is None:
+            raise Exception(
+                'configuration object %s(%s|%s#%s) does not exist'
+                ' in offline repository'
+                % (cid.name, cid.xmlPath, cid.xmlDoc, cid.xmlId)
+            )
+        return obj
+
+    def _attributeFlags(self, type, name):
+        typeInfo = wdr.config._typeRegistry.get(type)
+        if typeInfo is not None and typeInfo.attributes.has_key(name):
+            ai = typeInfo.attributes[name]
+            return (ai.list, ai.reference)
+        inferred = self.attributeTypes.get(type, {}).get(name)
+        if inferred is not None:
+            return (inferred[1], inferred[2])
+        return (0, 0)
+
+    def _formatValue(self, obj, name):
+        isList = self._attributeFlags(obj.type, name)[0]
+        entry = obj.values.get(name)
+        if entry is None or not entry[1]:
+            if isList:
+                return '[]'
+            return None
+        (kind, items) = entry[:2]
+        if kind in (_ATTRIBUTE, _TEXT):
+            if isList:
+                return join(items, ';')
+            return items[0]
+        ids = [o.configId for o in items]
+        if isList:
+            return '[%s]' % join(ids, ' ')
+        return ids[0]
+
+    def _loadDocument(self, relativePath, text):
+        pos = relativePath.rfind('/')
+        (xmlPath, xmlDoc) = (relativePath[:pos], relativePath[pos + 1:])
+        try:
+            elements = _parseXml(text)
+        except Exception, e:
+            logger.warning('skipping document %s: %s', relativePath, e)
+            return
+        roots = []
+        for element in elements:
+            if element.tag == 'xmi:XMI':
+                candidates = element.children
+            else:
+                candidates = [element]
+            for candidate in candidates:
+                if candidate.attributes.has_key('xmi:id'):
+                    roots.append(
+                        self._loadElement(
+                            xmlPath, xmlDoc, candidate, None,
+                            _localName(
+                                candidate.attributes.get(
+                                    'xmi:type', candidate.tag
+                                )
+                            )
+                        )
+                    )
+        if roots:
+            self.documents[(xmlPath, xmlDoc)] = roots
+
+    def _loadElement(self, xmlPath, xmlDoc, element, parent, type):
+        obj = _OfflineObject(
+            xmlPath, xmlDoc, element.attributes['xmi:id'], type, parent
+        )
+        self.objects[(xmlPath, xmlDoc, obj.xmlId)] = obj
+        self.objectsByType.setdefault(type, []).append(obj)
+        for (name, value) in element.attributes.items():
+            if name.find(':') < 0 and name != 'xmlns':
+                obj.values[name] = [_ATTRIBUTE, [_decode(value)]]
+        for child in element.children:
+            name = child.tag
+            if child.attributes.has_key('xmi:id'):
+                (kind, item) = (
+                    _CHILDREN,
+                    self._loadElement(
+                        xmlPath, xmlDoc, child, obj,
+                        self._childType(type, name, child)
+                    )
+                )
+            elif child.attributes.has_key('href'):
+                (kind, item) = (
+                    _HREF, _resolveHref(xmlPath, child.attributes['href'])
+                )
+            else:
+                (kind, item) = (_TEXT, _decode(join(child.text, '')))
+            obj.values.setdefault(name, [kind, []])[1].append(item)
+        return obj
+
+    def _childType(self, parentType, name, element):
+        if element.attributes.has_key('xmi:type'):
+            return _localName(element.attributes['xmi:type'])
+        registry = wdr.config._typeRegistry
+        declaredType = None
+        typeInfo = registry.get(parentType)
+        if typeInfo is not None and typeInfo.attributes.has_key(name):
+            declaredType = typeInfo.attributes[name].type
+        mat = _xmlIdTypePattern.match(element.attributes['xmi:id'])
+        if mat and (declaredType is None or registry.has_key(mat.group(1))):
+            return mat.group(1)
+        return declaredType or (name[:1].upper() + name[1:])
+
+    def _loadSnapshotObject(self, objectRecord):
+        (configId, type, attributes) = objectRecord
+        cid = _parseConfigId(configId)
+        obj = _OfflineObject(cid.xmlPath, cid.xmlDoc, cid.xmlId, type, None)
+        obj.name = cid.name
+        obj.configId = _formatConfigId(obj)
+        self.objects[(obj.xmlPath, obj.xmlDoc, obj.xmlId)] = obj
+        self.objectsByType.setdefault(type, []).append(obj)
+        for (name, kind, values) in attributes:
+            obj.values[name] = [kind, values]
+
+    def _resolveSnapshot(self, parents):
+        contained = {}
+        for obj in self.objects.values():
+            for (name, entry) in obj.values.items():
+                if entry[0] == 'v':
+                    entry[0] = _TEXT
+                    continue
+                targets = []
+                for configId in entry[1]:
+                    targets.append(self._snapshotTarget(obj, name, configId))
+                if entry[0] == 'c':
+                    entry[0] = _CHILDREN
+                    for target in targets:
+                        target.container = obj
+                        contained[target] = 1
+                else:
+                    entry[0] = _REFERENCES
+                entry[1] = targets
+        objects = []
+        for typeObjects in self.objectsByType.values():
+            objects.extend(typeObjects)
+        for obj in objects:
+            if not contained.has_key(obj):
+                self.documents.setdefault(
+                    (obj.xmlPath, obj.xmlDoc), []
+                ).append(obj)
+        for (configId, parentId) in parents:
+            self._snapshotObject(configId).container = (
+                self._snapshotObject(parentId)
+            )
+        for obj in objects:
+            if obj.container is not None:
+                self.parentTypes.setdefault(obj.type, {})[
+                    obj.container.type
+                ] = 1
+
+    def _snapshotTarget(self, obj, name, configId):
+        cid = _parseConfigId(configId)
+        key = (cid.xmlPath, cid.xmlDoc, cid.xmlId)
+        target = self.objects.get(key)
+        if target is None:
+            # objects outside of the snapshot scope are known only by their
+            # ids and declared types
+            typeInfo = wdr.config._typeRegistry.get(obj.type)
+            target = _OfflineObject(
+                cid.xmlPath, cid.xmlDoc, cid.xmlId,
+                typeInfo.attributes[name].type, None
+            )
+            target.name = cid.name
+            target.configId = _formatConfigId(target)
+            self.objects[key] = target
+        return target
+
+    def _snapshotObject(self, configId):
+        cid = _parseConfigId(configId)
+        return self.objects[(cid.xmlPath, cid.xmlDoc, cid.xmlId)]
+
+    def _assignContainers(self):
+        owners = {}
+        for (xmlPath, xmlDoc) in self.documents.keys():
+            if _ownerDocuments.has_key(xmlDoc):
+                owners[xmlPath] = self.documents[(xmlPath, xmlDoc)][0]
+        for ((xmlPath, xmlDoc), roots) in self.documents.items():
+            for root in roots:
+                path = xmlPath
+                if owners.get(path) is root:
+                    path = _parentPath(path)
+                while path and not owners.has_key(path):
+                    path = _parentPath(path)
+                root.container = owners.get(path)
+
+    def _resolve(self):
+        self._assignContainers()
+        for obj in self.objects.values():
+            obj.name = _objectName(obj)
+            obj.configId = _formatConfigId(obj)
+        for obj in self.objects.values():
+            for (name, entry) in obj.values.items():
+                if entry[0] == _ATTRIBUTE:
+                    self._resolveReferences(obj, name, entry)
+                elif entry[0] == _HREF:
+                    targets = []
+                    for key in entry[1]:
+                        if self.objects.has_key(key):
+                            targets.append(self.objects[key])
+                        else:
+                            logger.debug(
+                                'unresolved reference %s#%s in %s',
+                                join(key[:2], '/'), key[2], obj.configId
+                            )
+                    entry[0] = _REFERENCES
+                    entry[1] = targets
+                self._inferAttributeType(obj, name, entry)
+            if obj.container is not None:
+                self.parentTypes.setdefault(obj.type, {})[
+                    obj.container.type
+                ] = 1
+
+    def _resolveReferences(self, obj, name, entry):
+        value = entry[1][0]
+        tokens = split(value)
+        typeInfo = wdr.config._typeRegistry.get(obj.type)
+        if typeInfo is not None and typeInfo.attributes.has_key(name):
+            if not typeInfo.attributes[name].reference:
+                return
+        elif not tokens:
+            return
+        targets = []
+        for token in tokens:
+            target = self.objects.get((obj.xmlPath, obj.xmlDoc, token))
+            if target is not None:
+                targets.append(target)
+            elif typeInfo is None or not typeInfo.attributes.has_key(name):
+                # without type information only values consisting of xmlIds
+                # are treated as references
+                return
+        entry[0] = _REFERENCES
+        entry[1] = targets
+        entry.append(len(tokens) > 1)
+
+    def _inferAttributeType(self, obj, name, entry):
+        kind = entry[0]
+        if kind == _ATTRIBUTE:
+            inferred = ['String', 0, 0]
+        elif kind == _TEXT:
+            inferred = ['String', len(entry[1]) > 1, 0]
+        elif not entry[1]:
+            return
+        elif kind == _CHILDREN:
+            inferred = [entry[1][0].type, len(entry[1]) > 1, 0]
+        else:
+            inferred = [
+                entry[1][0].type, len(entry[1]) > 1 or entry[2:] == [1], 1
+            ]
+        attributeTypes = self.attributeTypes.setdefault(obj.type, {})
+        current = attributeTypes.get(name)
+        if current is None:
+            attributeTypes[name] = inferred
+        elif inferred[1]:
+            current[1] = 1
+
+
+class _OfflineObject:
+    def __init__(self, xmlPath, xmlDoc, xmlId, type, container):
+        self.xmlPath = xmlPath
+        self.xmlDoc = xmlDoc
+        self.xmlId = xmlId
+        self.type = type
+        self.container = container
+        self.name = ''
+        self.configId = None
+        self.values = {}
+
+
+class _XmlElement:
+    def __init__(self, tag, attributes):
+        self.tag = tag
+        self.attributes = attributes
+        self.children = []
+        self.text = []
+
+
+def _parseXml(text):
+    document = _XmlElement(None, {})
+    stack = [document]
+    pos = 0
+    while 1:
+        mat = _markupPattern.search(text, pos)
+        if mat is None:
+            break
+        if mat.start() > pos:
+            stack[-1].text.append(text[pos:mat.start()])
+        pos = mat.end()
+        if mat.group('cdata') is not None:
+            stack[-1].text.append(mat.group('cdata'))
+        elif mat.group('tag') is None:
+            # comments, processing instructions and declarations
+            continue
+        elif mat.group('end'):
+            if len(stack) < 2 or stack[-1].tag != mat.group('tag'):
+                raise Exception(
+                    'unexpected closing tag %s at position %d'
+                    % (mat.group('tag'), mat.start())
+                )
+            stack.pop()
+        else:
+            attributes = {}
+            for (name, dquoted, squoted) in _xmlAttributePattern.findall(
+                mat.group('attributes')
+            ):
+                attributes[name] = dquoted or squoted
+            element = _XmlElement(mat.group('tag'), attributes)
+            stack[-1].children.append(element)
+            if not mat.group('empty'):
+                stack.append(element)
+    if len(stack) != 1:
+        raise Exception('unclosed element %s' % stack[-1].tag)
+    return document.children
+
+
+def _decodeEntity(mat):
+    entity = mat.group(1)
+    if entity[:2] == '#x':
+        code = int(entity[2:], 16)
+    elif entity[:1] == '#':
+        code = int(entity[1:])
+    else:
+        return _entities.get(entity, mat.group(0))
+    if code < 128:
+        return chr(code)
+    return unichr(code)
+
+
+def _decode(value):
+    if value.find('&') < 0:
+        return value
+    return _entityPattern.sub(_decodeEntity, value)
+
+
+def _isSnapshot(filename):
+    fi = open(filename, 'r')
+    try:
+        header = fi.read(len(wdr.config._snapshotHeader))
+    finally:
+        fi.close()
+    return header == wdr.config._snapshotHeader
+
+
+def _parseConfigId(configId):
+    configId = str(configId)
+    if configId.find(' ') >= 0 and configId[:1] != '"':
+        # str(ConfigObject) does not quote names containing spaces
+        configId = '"%s"' % configId
+    return wdr.config._parseConfigId(configId)
+
+
+def _localName(tag):
+    return tag[tag.find(':') + 1:]
+
+
+def _parentPath(path):
+    return path[:max(path.rfind('/'), 0)]
+
+
+def _resolveHref(xmlPath, href):
+    pos = href.find('#')
+    (document, xmlId) = (href[:pos], href[pos + 1:])
+    if document[:6] == 'cells/':
+        segments = []
+    else:
+        segments = split(xmlPath, '/')
+    for segment in split(document, '/'):
+        if segment == '..':
+            segments = segments[:-1]
+        elif segment and segment != '.':
+            segments.append(segment)
+    return (join(segments[:-1], '/'), segments[-1], xmlId)
+
+
+def _isContained(obj, scopes):
+    container = obj.container
+    while container is not None:
+        if scopes.has_key(container):
+            return 1
+        container = container.container
+    return 0
+
+
+def _objectName(obj):
+    entry = obj.values.get('name')
+    if entry is not None and entry[0] == _ATTRIBUTE:
+        return entry[1][0]
+    if obj.xmlDoc == 'deployment.xml' and obj.container is not None and (
+        obj.container.xmlPath != obj.xmlPath
+    ):
+        return obj.xmlPath[obj.xmlPath.rfind('/') + 1:]
+    return ''
+
+
+def _formatConfigId(obj):
+    configId = '%s(%s|%s#%s)' % (obj.name, obj.xmlPath, obj.xmlDoc, obj.xmlId)
+    if configId.find(' ') >= 0:
+        return '"%s"' % configId
+    return configId
+
+
+def _formatAttributeType(name, typeName, isList, isReference):
+    result = '%s %s' % (name, typeName)
+    if isReference:
+        result += '@'
+    if isList:
+        result += '*'
+    return result
+
+
+def _configRoot(directory):
+    for candidate in (os.path.join(directory, 'config'), directory):
+        if os.path.isdir(os.path.join(candidate, 'cells')):
+            return candidate
+    if os.path.basename(os.path.normpath(directory)) == 'cells':
+        return os.path.dirname(os.path.normpath(directory))
+    raise Exception('no configuration repository found in %s' % directory)
+
+
+def _listDocuments(root, relativePath):
+    result = []
+    names = os.listdir(os.path.join(root, relativePath))
+    names.sort()
+    for name in names:
+        if relativePath:
+            path = relativePath + '/' + name
+        else:
+            path = name
+        if os.path.isdir(os.path.join(root, path)):
+            result.extend(_listDocuments(root, path))
+        elif name[-4:] == '.xml':
+            result.append(path)
+    return result
+
+
+def _readArchive(filename):
+    try:
+        import zipfile
+    except ImportError:
+        zipfile = None
+    result = []
+    if zipfile is not None:
+        archive = zipfile.ZipFile(filename)
+        try:
+            for name in archive.namelist():
+                if name[-4:] == '.xml':
+                    result.append((name, archive.read(name)))
+        finally:
+            archive.close()
+        return result
+    # Jython releases without zipfile module
+    import java.io
+    import java.util.zip
+    archive = java.util.zip.ZipFile(filename)
+    try:
+        entries = archive.entries()
+        while entries.hasMoreElements():
+            entry = entries.nextElement()
+            if entry.isDirectory() or entry.getName()[-4:] != '.xml':
+                continue
+            reader = java.io.BufferedReader(
+                java.io.InputStreamReader(
+                    archive.getInputStream(entry), 'UTF-8'
+                )
+            )
+            try:
+                lines = []
+                line = reader.readLine()
+                while line is not None:
+                    lines.append(line)
+                    line = reader.readLine()
+            finally:
+                reader.close()
+            result.append((entry.getName(), join(lines, '\n')))
+    finally:
+        archive.close()
+    return result
@@ -0,0 +1,305 @@
+import logging
+import sys
+import time
+
+import wdr
+import wdr.config
+import wdr.util
+
+logger = logging.getLogger('wdr.replay')
+
+_traceHeader = 'WDR-TRACE'
+_traceFormatVersion = 1
+_recordedObjectNames = (
+    'AdminApp', 'AdminConfig', 'AdminControl', 'AdminTask'
+)
+_replacedObjects = {}
+_recorder = None
+
+
+class ReplayedException(wdr.util.ScriptingError):
+    pass
+
+
+def startRecording(filename):
+    if _recorder is not None:
+        raise Exception(
+            'recording to %s is already active' % _recorder.name
+        )
+    if _replacedObjects:
+        raise Exception('wsadmin objects are being replayed')
+    recorder = TraceWriter(filename)
+    for name in _recordedObjectNames:
+        target = getattr(wdr, name)
+        if target is None:
+            continue
+        _replaceObject(name, RecordingObject(name, target, recorder))
+    wdr.replay._recorder = recorder
+    wdr.config.invalidateCaches()
+    logger.info('recording wsadmin calls to %s', filename)
+
+
+def stopRecording():
+    if _recorder is None:
+        return
+    _restoreObjects()
+    _recorder.close()
+    logger.info(
+        'recorded %d wsadmin calls to %s', _recorder.count, _recorder.name
+    )
+    wdr.replay._recorder = None
+
+
+def startReplay(filename, latency=0.0, scale=0.0):
+    # responses are delayed by latency + scale * recorded duration seconds
+    if _replacedObjects:
+        raise Exception('wsadmin objects are already replaced')
+    trace = loadTrace(filename)
+    for name in trace.objectNames:
+        _replaceObject(name, ReplayObject(name, trace, latency, scale))
+    wdr.config.invalidateCaches()
+    wdr.config._clearInternedConfigIds()
+    logger.info(
+        'replaying %d wsadmin calls from %s', trace.count, filename
+    )
+    return trace
+
+
+def stopReplay():
+    if _recorder is not None:
+        return
+    _restoreObjects()
+    wdr.config.invalidateCaches()
+    wdr.config._clearInternedConfigIds()
+
+
+def loadTrace(filename):
+    trace = Trace()
+    fi = open(filename, 'r')
+    try:
+        lines = fi.read().splitlines()
+    finally:
+        fi.close()
+    header = (lines[:1] or [''])[0].split('\t')
+    if header[0] != _traceHeader or len(header) != 2:
+        raise Exception('%s is not a WDR trace file' % filename)
+    if int(header[1]) != _traceFormatVersion:
+        raise Exception(
+            'unsupported trace format version %s in %s' % (header[1], filename)
+        )
+    lineNo = 1
+    for line in lines[1:]:
+        lineNo = lineNo + 1
+        fields = line.split('\t')
+        if fields[0] == 'C' and len(fields) == 7:
+            trace.addCall(
+                fields[1], fields[2], wdr.util.unescapeField(fields[3]),
+                fields[4],
+                wdr.util.decodeValue(wdr.util.unescapeField(fields[5])),
+                float(fields[6])
+            )
+        elif fields[0] == 'A' and len(fields) == 4:
+            trace.addAttribute(
+                fields[1], fields[2],
+                wdr.util.decodeValue(wdr.util.unescapeField(fields[3]))
+            )
+        else:
+            raise Exception(
+                'invalid record in %s at line %d' % (filename, lineNo)
+            )
+    return trace
+
+
+def _replaceObject(name, value):
+    _replacedObjects[name] = (
+        getattr(wdr, name), wdr._wsadminObjectOverrides.has_key(name)
+    )
+    wdr.replaceWsadminObject(name, value)
+
+
+def _restoreObjects():
+    for (name, (target, overridden)) in _replacedObjects.items():
+        if overridden:
+            wdr.replaceWsadminObject(name, target)
+        else:
+            wdr.restoreWsadminObject(name)
+        del _replacedObjects[name]
+
+
+def _applyEnvironment():
+    # -Dwdr.record=<trace file> or WDR_RECORD records the whole run,
+    # -Dwdr.replay=<trace file> or WDR_REPLAY replays it
+    replayFile = wdr._environmentValue('wdr.replay', 'WDR_REPLAY')
+    if replayFile:
+        startReplay(replayFile)
+    else:
+        recordFile = wdr._environmentValue('wdr.record', 'WDR_RECORD')
+        if recordFile:
+            startRecording(recordFile)
+            try:
+                import atexit
+                atexit.register(stopRecording)
+            except ImportError:
+                pass
+
+
+class TraceWriter:
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.attributes = {}
+        self.out = open(name, 'w')
+        self.out.write('%s\t%d\n' % (_traceHeader, _traceFormatVersion))
+
+    def writeCall(
+        self, objectName, methodName, args, status, value, duration
+    ):
+        self.out.write(
+            'C\t%s\t%s\t%s\t%s\t%s\t%.6f\n' % (
+                objectName, methodName,
+                wdr.util.escapeField(wdr.util.encodeValue(list(args))), status,
+                wdr.util.escapeField(wdr.util.encodeValue(value)), duration
+            )
+        )
+        self.count = self.count + 1
+
+    def writeAttribute(self, objectName, attributeName, value):
+        key = (objectName, attributeName)
+        if not self.attributes.has_key(key):
+            self.attributes[key] = 1
+            self.out.write(
+                'A\t%s\t%s\t%s\n' % (
+                    objectName, attributeName,
+                    wdr.util.escapeField(wdr.util.encodeValue(value))
+                )
+            )
+
+    def close(self):
+        self.out.close()
+
+
+class Trace:
+    def __init__(self):
+        self.count = 0
+        self.objectNames = []
+        self.calls = {}
+        self.positions = {}
+        self.attributes = {}
+
+    def addCall(
+        self, objectName, methodName, args, status, value, duration
+    ):
+        self._addObjectName(objectName)
+        key = (objectName, methodName, args)
+        responses = self.calls.get(key)
+        if responses is None:
+            responses = self.calls[key] = []
+            self.positions[key] = 0
+        responses.append((status, value, duration))
+        self.count = self.count + 1
+
+    def addAttribute(self, objectName, attributeName, value):
+        self._addObjectName(objectName)
+        self.attributes[(objectName, attributeName)] = value
+
+    def nextResponse(self, objectName, methodName, args):
+        # identical calls get their responses in the recorded order,
+        # the last one is repeated once all have been served
+        key = (objectName, methodName, args)
+        responses = self.calls.get(key)
+        if responses is None:
+            raise Exception(
+                'no recorded response for %s.%s%s'
+                % (objectName, methodName, wdr.util.decodeValue(args))
+            )
+        position = self.positions[key]
+        if position < len(responses) - 1:
+            self.positions[key] = position + 1
+        return responses[position]
+
+    def rewind(self):
+        for key in self.positions.keys():
+            self.positions[key] = 0
+
+    def _addObjectName(self, objectName):
+        if objectName not in self.objectNames:
+            self.objectNames.append(objectName)
+
+
+class RecordingObject:
+    def __init__(self, name, target, recorder):
+        self.__dict__['_name'] = name
+        self.__dict__['_target'] = target
+        self.__dict__['_recorder'] = recorder
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if callable(value):
+            return RecordingMethod(self._name, name, value, self._recorder)
+        self._recorder.writeAttribute(self._name, name, value)
+        return value
+
+    def __repr__(self):
+        return repr(self._target)
+
+
+class RecordingMethod:
+    def __init__(self, objectName, methodName, method, recorder):
+        self.objectName = objectName
+        self.methodName = methodName
+        self.method = method
+        self.recorder = recorder
+
+    def __call__(self, *args):
+        startTime = time.time()
+        try:
+            result = apply(self.method, args)
+        except:
+            ex = sys.exc_info()[1]
+            message = getattr(ex, 'message', None) or str(ex)
+            self.recorder.writeCall(
+                self.objectName, self.methodName, args, 'E', '' + message,
+                time.time() - startTime
+            )
+            raise
+        self.recorder.writeCall(
+            self.objectName, self.methodName, args, 'R', result,
+            time.time() - startTime
+        )
+        return result
+
+
+class ReplayObject:
+    def __init__(self, name, trace, latency, scale):
+        self.__dict__['_name'] = name
+        self.__dict__['_trace'] = trace
+        self.__dict__['_latency'] = latency
+        self.__dict__['_scale'] = scale
+
+    def __getattr__(self, name):
+        key = (self._name, name)
+        if self._trace.attributes.has_key(key):
+            return self._trace.attributes[key]
+        return ReplayMethod(self, name)
+
+    def __repr__(self):
+        return '<replayed %s>' % self._name
+
+
+class ReplayMethod:
+    def __init__(self, replayObject, methodName):
+        self.replayObject = replayObject
+        self.methodName = methodName
+
+    def __call__(self, *args):
+        replayObject = self.replayObject
+        (status, value, duration) = replayObject._trace.nextResponse(
+            replayObject._name, self.methodName,
+            wdr.util.encodeValue(list(args))
+        )
+        delay = replayObject._latency + replayObject._scale * duration
+        if delay > 0:
+            time.sleep(delay)
+        if status == 'E':
+            raise ReplayedException(value)
+        return value
@@ -1,6 +1,7 @@
 import logging
 import re
 import wdr
+import wdr.config
 
 
 (
@@ -59,3 +60,12 @@ def adminTaskAsListOfListsList(adminTaskListOfLists):
         if listMatcher:
             result.append(adminTaskAsListOfLists(listMatcher.group(1)))
     return result
+
+
+def invokeTask(commandName, *args):
+    # AdminTask commands may modify configuration behind WDR's back, caches
+    # are dropped the same way wdr.app does after AdminApp calls
+    logger.debug('invoking task %s with arguments %s', commandName, args)
+    result = apply(getattr(AdminTask, commandName), args)
+    wdr.config.invalidateCaches()
+    return result
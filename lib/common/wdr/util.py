@@ -1,21 +1,50 @@
 from pprint import PrettyPrinter
-import jarray
-import java.io
-import java.lang
-import java.math
-import java.security
-import com.ibm.websphere.crypto
 import logging
+import re
 import string
 import types
 import wdr
 
+# digests, uuids and passwords need java & websphere classes, the rest of
+# the module is usable in replayed sessions outside of wsadmin
+try:
+    import jarray
+    import java.io
+    import java.lang
+    import java.math
+    import java.security
+except ImportError:
+    pass
+try:
+    import com.ibm.websphere.crypto
+except ImportError:
+    pass
+try:
+    import com.ibm.ws.scripting
+    _wsadminExceptions = (com.ibm.ws.scripting.ScriptingException,)
+except ImportError:
+    _wsadminExceptions = ()
+
 (
     AdminApp, AdminConfig, AdminControl, AdminTask, Help
 ) = wdr.WsadminObjects().getObjects()
 
 logger = logging.getLogger('wdr.util')
 
+_fieldEscapePattern = re.compile(r'\\(.)')
+_fieldEscapes = {'\\': '\\', 't': '\t', 'n': '\n', 'r': '\r'}
+
+
+class ScriptingError(Exception):
+    # raised by objects standing in for wsadmin objects, such as replayed
+    # sessions, in place of com.ibm.ws.scripting.ScriptingException
+    def __init__(self, message):
+        Exception.__init__(self, message)
+        self.message = message
+
+
+SCRIPTING_EXCEPTIONS = _wsadminExceptions + (ScriptingError,)
+
 
 def sync(quiet=0):
     # DMgr node can't be synchronized
@@ -277,15 +306,167 @@ def _mergeVariables(d, u):
 
 
 def mergeVariables(*scopes):
+    # copies all scopes, VariableScope gives the same view without copying
     result = {}
     for s in scopes:
         result = _mergeVariables(result, s)
     return result
 
 
+def _isVariableMapping(value):
+    return isinstance(value, types.DictType) or isinstance(value, VariableScope)
+
+
+class VariableScope:
+    # names are looked up in the layers, later layers override earlier ones
+    # as in mergeVariables, nested dictionaries defined by several layers are
+    # combined into nested scopes on lookup
+    def __init__(self, *layers):
+        self.layers = list(layers)
+        self.layers.reverse()
+        self.parent = None
+
+    def child(self, *layers):
+        result = apply(VariableScope, layers)
+        result.parent = self
+        return result
+
+    def __getitem__(self, name):
+        nested = []
+        scope = self
+        while scope is not None:
+            for layer in scope.layers:
+                if layer.has_key(name):
+                    value = layer[name]
+                    if not _isVariableMapping(value):
+                        if nested:
+                            return self._nestedScope(nested)
+                        return value
+                    nested.append(value)
+            scope = scope.parent
+        if nested:
+            return self._nestedScope(nested)
+        raise KeyError(name)
+
+    def _nestedScope(self, nested):
+        if len(nested) == 1:
+            return nested[0]
+        nested.reverse()
+        return apply(VariableScope, nested)
+
+    def has_key(self, name):
+        scope = self
+        while scope is not None:
+            for layer in scope.layers:
+                if layer.has_key(name):
+                    return 1
+            scope = scope.parent
+        return 0
+
+    def get(self, name, default=None):
+        if self.has_key(name):
+            return self[name]
+        return default
+
+    def keys(self):
+        names = {}
+        scope = self
+        while scope is not None:
+            for layer in scope.layers:
+                for name in layer.keys():
+                    names[name] = 1
+            scope = scope.parent
+        return names.keys()
+
+    def items(self):
+        return [(name, self[name]) for name in self.keys()]
+
+    def toDict(self):
+        result = {}
+        for (name, value) in self.items():
+            if isinstance(value, VariableScope):
+                value = value.toDict()
+            result[name] = value
+        return result
+
+    def __repr__(self):
+        return repr(self.toDict())
+
+
 def encodePassword(str):
     return com.ibm.websphere.crypto.PasswordUtil.encode(str)
 
 
 def decodePassword(str):
     return com.ibm.websphere.crypto.PasswordUtil.decode(str)
+
+
+def escapeField(value):
+    # tabs and line breaks are escaped, so that values can be stored as
+    # tab-separated fields of line-oriented files
+    for (c, e) in (('\\', '\\\\'), ('\t', '\\t'), ('\n', '\\n'), ('\r', '\\r')):
+        value = value.replace(c, e)
+    return value
+
+
+def unescapeField(value):
+    if value.find('\\') < 0:
+        return value
+    return _fieldEscapePattern.sub(
+        lambda mat: _fieldEscapes[mat.group(1)], value
+    )
+
+
+def encodeValue(value):
+    # None: N, integers: I<digits>; strings: S<length>:<characters>,
+    # lists: L<length>:<items>, anything else is recorded as a string
+    valueType = type(value)
+    if value is None:
+        return 'N'
+    elif valueType in (type(0), type(0L)):
+        return 'I%d;' % value
+    elif valueType in (type([]), type(())):
+        result = ['L%d:' % len(value)]
+        for v in value:
+            result.append(encodeValue(v))
+        return string.join(result, '')
+    else:
+        value = str(value)
+        return 'S%d:%s' % (len(value), value)
+
+
+def decodeValue(text):
+    try:
+        (value, position) = _decodeValueAt(text, 0)
+    except (IndexError, ValueError):
+        raise Exception('invalid encoded value %s' % text)
+    if position != len(text):
+        raise Exception('invalid encoded value %s' % text)
+    return value
+
+
+def _decodeValueAt(text, position):
+    kind = text[position]
+    if kind == 'N':
+        return (None, position + 1)
+    elif kind == 'I':
+        end = text.index(';', position)
+        try:
+            value = int(text[position + 1:end])
+        except OverflowError:
+            value = long(text[position + 1:end])
+        return (value, end + 1)
+    elif kind == 'S':
+        separator = text.index(':', position)
+        end = separator + 1 + int(text[position + 1:separator])
+        return (text[separator + 1:end], end)
+    elif kind == 'L':
+        separator = text.index(':', position)
+        count = int(text[position + 1:separator])
+        position = separator + 1
+        result = []
+        for i in range(count):
+            (value, position) = _decodeValueAt(text, position)
+            result.append(value)
+        return (result, position)
+    raise Exception('invalid encoded value %s' % text)
@@ -0,0 +1,12 @@
+# Benchmark launcher
+#
+# Benchmarks do not depend on any particular topology and may be executed
+# in wsadmin as well as in a plain Python interpreter.
+
+import wdrbench.config
+import wdrbench.manifest
+import wdrbench.topology
+
+wdrbench.config.run()
+wdrbench.manifest.run()
+wdrbench.topology.run()
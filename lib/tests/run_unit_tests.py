@@ -14,8 +14,12 @@ import unittest
 
 import wdrtest.config
 import wdrtest.control
+import wdrtest.instrumentation
 import wdrtest.manifest
+import wdrtest.offline
+import wdrtest.replay
 import wdrtest.task
+import wdrtest.util
 
 try:
     suite = unittest.TestSuite()
@@ -25,12 +29,26 @@ try:
     suite.addTest(
         unittest.defaultTestLoader.loadTestsFromModule(wdrtest.control)
     )
+    suite.addTest(
+        unittest.defaultTestLoader.loadTestsFromModule(
+            wdrtest.instrumentation
+        )
+    )
     suite.addTest(
         unittest.defaultTestLoader.loadTestsFromModule(wdrtest.manifest)
     )
+    suite.addTest(
+        unittest.defaultTestLoader.loadTestsFromModule(wdrtest.offline)
+    )
+    suite.addTest(
+        unittest.defaultTestLoader.loadTestsFromModule(wdrtest.replay)
+    )
     suite.addTest(
         unittest.defaultTestLoader.loadTestsFromModule(wdrtest.task)
     )
+    suite.addTest(
+        unittest.defaultTestLoader.loadTestsFromModule(wdrtest.util)
+    )
     unittest.TextTestRunner().run(suite)
 finally:
     reset()
@@ -0,0 +1,26 @@
+import time
+
+
+def measure(function, repeat=5):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def compare(title, candidates, repeat=5):
+    print title
+    baseline = None
+    for (name, function) in candidates:
+        elapsed = measure(function, repeat)
+        if baseline is None:
+            baseline = elapsed
+        if elapsed:
+            ratio = '%.2fx' % (baseline / elapsed)
+        else:
+            ratio = '-'
+        print '  %-40s %10.4fs %8s' % (name, elapsed, ratio)
@@ -0,0 +1,126 @@
+from wdr.config import _matchConfigId, _matchConfigIdList
+from wdr.config import _parseConfigId, _parseConfigIdList
+from wdr.config import ConfigObject, ConfigIdLinesIterator
+
+import wdrbench
+
+
+def _sampleId(i):
+    if i % 3 == 0:
+        return (
+            '"Derby JDBC Provider %d'
+            '(cells/wdrCell/nodes/wdrNode/servers/wdrServer'
+            '|resources.xml#JDBCProvider_%d)"'
+        ) % (i, i)
+    elif i % 3 == 1:
+        return (
+            '(cells/wdrCell/nodes/wdrNode/servers/wdrServer'
+            '|server.xml#Property_%d)'
+        ) % i
+    else:
+        return (
+            'server%d(cells/wdrCell/nodes/wdrNode/servers/server%d'
+            '|server.xml#Server_%d)'
+        ) % (i, i, i)
+
+
+def _sampleIds(count):
+    result = []
+    for i in range(count):
+        result.append(_sampleId(i))
+    return result
+
+
+def benchmarkConfigIdParsing(count=10000, repeat=5):
+    ids = _sampleIds(count)
+
+    def parseWithRegularExpression(ids=ids):
+        for i in ids:
+            _matchConfigId(i)
+
+    def parseWithScanner(ids=ids):
+        for i in ids:
+            _parseConfigId(i)
+    wdrbench.compare(
+        'parsing %d configuration ids' % count,
+        [
+            ('regular expression', parseWithRegularExpression),
+            ('scanner', parseWithScanner),
+        ],
+        repeat
+    )
+
+
+def benchmarkConfigIdListParsing(count=10000, repeat=5):
+    idList = '[%s]' % ' '.join(_sampleIds(count))
+
+    def parseWithRegularExpression(idList=idList):
+        _matchConfigIdList(idList)
+
+    def parseWithScanner(idList=idList):
+        _parseConfigIdList(idList)
+    wdrbench.compare(
+        'parsing list of %d configuration ids' % count,
+        [
+            ('regular expression', parseWithRegularExpression),
+            ('scanner', parseWithScanner),
+        ],
+        repeat
+    )
+
+
+def benchmarkConfigObjectLookup(count=10000, repeat=5):
+    objects = []
+    for i in _sampleIds(count):
+        objects.append(ConfigObject(_parseConfigId(i), 'Property'))
+    others = []
+    for i in _sampleIds(count):
+        others.append(ConfigObject(_parseConfigId(i), 'Property'))
+
+    def compareObjects(objects=objects, others=others):
+        for i in range(len(objects)):
+            objects[i] == others[i]
+
+    def indexObjects(objects=objects, others=others):
+        index = {}
+        for o in objects:
+            index[o] = 1
+        for o in others:
+            index.has_key(o)
+    wdrbench.compare(
+        'comparing & indexing %d configuration objects' % count,
+        [
+            ('comparison', compareObjects),
+            ('dictionary', indexObjects),
+        ],
+        repeat
+    )
+
+
+def benchmarkConfigObjectIteration(count=10000, repeat=5):
+    output = '\n'.join(_sampleIds(count))
+
+    def firstFromList(output=output):
+        result = []
+        for l in output.splitlines():
+            result.append(ConfigObject(_parseConfigId(l)))
+        return result[0]
+
+    def firstFromIterator(output=output):
+        for o in ConfigIdLinesIterator(output):
+            return o
+    wdrbench.compare(
+        'first of %d configuration objects' % count,
+        [
+            ('list', firstFromList),
+            ('iterator', firstFromIterator),
+        ],
+        repeat
+    )
+
+
+def run():
+    benchmarkConfigIdParsing()
+    benchmarkConfigIdListParsing()
+    benchmarkConfigObjectLookup()
+    benchmarkConfigObjectIteration()
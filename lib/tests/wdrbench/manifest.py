@@ -0,0 +1,149 @@
+import os
+import tempfile
+
+from wdr.manifest import _importApplicationManifest, _parseManifestText
+from wdr.manifest import substituteVariables
+from wdr.util import VariableScope, mergeVariables
+
+import wdrbench
+
+
+def _generateConfigurationManifest(objectCount):
+    lines = ['# generated configuration manifest', 'Cell', '\t*name cell']
+    for i in range(objectCount):
+        lines.extend([
+            '\tServer #server%d' % i,
+            '\t\t*name server%d' % i,
+            '\t\t-description server $[ serverDescription ] %d' % i,
+            '\t\t-processDefinitions',
+            '\t\t\tJavaProcessDef',
+            '\t\t\t\t-executableName java',
+            '\t\t\t\t-jvmEntries',
+            '\t\t\t\t\tJavaVirtualMachine',
+            '\t\t\t\t\t\t-initialHeapSize 256',
+            '\t\t\t\t\t\t-maximumHeapSize 1024',
+            '',
+            '\t\t# custom properties',
+            '\t\t-properties',
+            '\t\t\tProperty',
+            '\t\t\t\t*name property%d' % i,
+            '\t\t\t\t-value value%d' % i,
+            '\t\t\t!Property',
+            '\t\t\t\t*name obsolete%d' % i,
+        ])
+    return '\n'.join(lines) + '\n'
+
+
+def _generateApplicationManifest(applicationCount):
+    lines = []
+    for i in range(applicationCount):
+        lines.extend([
+            'application%d "archives/application %d.ear"' % (i, i),
+            '\tstartingWeight 10',
+            '\tMapModulesToServers',
+            '\t\tweb%d;web.war,WEB-INF/web.xml;WebSphere:cell=c' % i,
+            '\t\tejb%d;ejb.jar,META-INF/ejb-jar.xml;WebSphere:cell=c' % i,
+            '\t*classLoadingMode PARENT_LAST',
+            '',
+        ])
+    return '\n'.join(lines)
+
+
+def benchmarkConfigurationManifestParsing(
+    sizes=(1000, 5000, 20000), repeat=3
+):
+    print 'parsing configuration manifests'
+    for size in sizes:
+        text = _generateConfigurationManifest(size)
+        lineCount = len(text.splitlines())
+
+        def parse(text=text):
+            _parseManifestText('generated.wdrc', text, [], [])
+        _printThroughput(
+            '%d lines' % lineCount, lineCount, wdrbench.measure(parse, repeat)
+        )
+
+
+def benchmarkApplicationManifestParsing(sizes=(1000, 5000), repeat=3):
+    print 'parsing application manifests'
+    for size in sizes:
+        text = _generateApplicationManifest(size)
+        lineCount = len(text.splitlines())
+        filename = tempfile.mktemp('.wdra')
+        fo = open(filename, 'w')
+        try:
+            fo.write(text)
+        finally:
+            fo.close()
+        try:
+            def parse(filename=filename):
+                _importApplicationManifest(filename, {})
+            elapsed = wdrbench.measure(parse, repeat)
+        finally:
+            os.remove(filename)
+        _printThroughput('%d lines' % lineCount, lineCount, elapsed)
+
+
+def benchmarkVariableSubstitution(sizes=(1000, 5000, 20000), repeat=3):
+    print 'substituting variables in configuration manifests'
+    variables = {'serverDescription': 'generated'}
+    for size in sizes:
+        text = _generateConfigurationManifest(size)
+        lineCount = len(text.splitlines())
+        manifestObjects = _parseManifestText('generated.wdrc', text, [], [])
+
+        def substitute(manifestObjects=manifestObjects, variables=variables):
+            resolved = {}
+            for mo in manifestObjects:
+                mo._substitute(variables, resolved)
+        _printThroughput(
+            '%d lines' % lineCount, lineCount,
+            wdrbench.measure(substitute, repeat)
+        )
+
+
+def benchmarkVariableScopes(targets=(100, 500), globalSize=1000, repeat=3):
+    print 'building per-target variables'
+    globalVariables = {}
+    for i in range(globalSize):
+        globalVariables['group%d' % i] = {
+            'name': 'group %d' % i, 'values': {'a': str(i), 'b': str(i + 1)}
+        }
+    for count in targets:
+        def merge(count=count, globalVariables=globalVariables):
+            for i in range(count):
+                variables = mergeVariables(
+                    globalVariables, {'server': {'name': 'server%d' % i}}
+                )
+                substituteVariables('$[server.name] $[group1.name]', variables)
+
+        def scope(count=count, globalVariables=globalVariables):
+            globalScope = VariableScope(globalVariables)
+            for i in range(count):
+                variables = globalScope.child(
+                    {'server': {'name': 'server%d' % i}}
+                )
+                substituteVariables('$[server.name] $[group1.name]', variables)
+        _printThroughput(
+            '%d targets (mergeVariables)' % count, count,
+            wdrbench.measure(merge, repeat), 'targets'
+        )
+        _printThroughput(
+            '%d targets (VariableScope)' % count, count,
+            wdrbench.measure(scope, repeat), 'targets'
+        )
+
+
+def _printThroughput(title, lineCount, elapsed, unit='lines'):
+    if elapsed:
+        throughput = '%d %s/s' % (lineCount / elapsed, unit)
+    else:
+        throughput = '-'
+    print '  %-40s %10.4fs %16s' % (title, elapsed, throughput)
+
+
+def run():
+    benchmarkConfigurationManifestParsing()
+    benchmarkApplicationManifestParsing()
+    benchmarkVariableSubstitution()
+    benchmarkVariableScopes()
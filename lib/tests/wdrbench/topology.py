@@ -0,0 +1,363 @@
+import os
+import shutil
+import tempfile
+import time
+
+import wdr
+from wdr.config import getid1, listConfigObjects, save
+from wdr.instrumentation import disableInstrumentation, enableInstrumentation
+from wdr.instrumentation import getInstrumentationStatistics
+from wdr.instrumentation import resetInstrumentation
+from wdr.manifest import _loadConfigurationManifest
+from wdr.manifest import disableManifestCache, enableManifestCache
+from wdr.manifest import disableManifestPrefetch, enableManifestPrefetch
+from wdr.manifest import disableIncrementalManifests
+from wdr.manifest import enableIncrementalManifests
+from wdr.manifest import importConfigurationManifest
+from wdr.manifest import planConfigurationManifest
+from wdr.offline import closeRepository, useRepository
+from wdrmemory import InMemoryAdminConfig
+
+_cellName = 'benchCell'
+
+_types = {
+    'Cell': (
+        {'name': 'String', 'cellType': 'String', 'properties': 'Property*'},
+        []
+    ),
+    'Node': (
+        {'name': 'String', 'hostName': 'String', 'properties': 'Property*'},
+        ['Cell']
+    ),
+    'Server': (
+        {
+            'name': 'String', 'serverType': 'String',
+            'processDefinitions': 'JavaProcessDef*',
+            'properties': 'Property*',
+        },
+        ['Node']
+    ),
+    'JavaProcessDef': (
+        {'executableName': 'String', 'jvmEntries': 'JavaVirtualMachine*'},
+        ['Server']
+    ),
+    'JavaVirtualMachine': (
+        {
+            'initialHeapSize': 'int', 'maximumHeapSize': 'int',
+            'genericJvmArguments': 'String', 'classpath': 'String*',
+            'systemProperties': 'Property*',
+        },
+        ['JavaProcessDef']
+    ),
+    'ServerCluster': (
+        {
+            'name': 'String', 'description': 'String',
+            'preferLocal': 'boolean', 'members': 'ClusterMember*',
+        },
+        ['Cell']
+    ),
+    'ClusterMember': (
+        {
+            'memberName': 'String', 'nodeName': 'String', 'weight': 'int',
+            'uniqueId': 'String',
+        },
+        ['ServerCluster']
+    ),
+    'JDBCProvider': (
+        {
+            'name': 'String', 'description': 'String',
+            'classpath': 'String*', 'providerType': 'String',
+            'implementationClassName': 'String', 'xa': 'boolean',
+        },
+        ['Cell', 'Node', 'Server', 'ServerCluster']
+    ),
+    'DataSource': (
+        {
+            'name': 'String', 'jndiName': 'String', 'description': 'String',
+            'statementCacheSize': 'int', 'provider': 'JDBCProvider@',
+            'datasourceHelperClassname': 'String',
+            'connectionPool': 'ConnectionPool',
+            'propertySet': 'J2EEResourcePropertySet',
+        },
+        ['JDBCProvider']
+    ),
+    'ConnectionPool': (
+        {
+            'maxConnections': 'int', 'minConnections': 'int',
+            'connectionTimeout': 'long',
+        },
+        ['DataSource']
+    ),
+    'J2EEResourcePropertySet': (
+        {'resourceProperties': 'J2EEResourceProperty*'},
+        ['DataSource']
+    ),
+    'J2EEResourceProperty': (
+        {
+            'name': 'String', 'type': 'String', 'value': 'String',
+            'description': 'String', 'required': 'boolean',
+        },
+        ['J2EEResourcePropertySet']
+    ),
+    'Property': (
+        {
+            'name': 'String', 'value': 'String', 'description': 'String',
+            'required': 'boolean',
+        },
+        ['Cell', 'Node', 'Server', 'JavaVirtualMachine']
+    ),
+}
+
+
+def generateCell(
+    nodes=2, serversPerNode=2, clusters=1, providers=1, dataSources=2,
+    properties=5
+):
+    # JDBC providers with their data sources are created in cell, node and
+    # server scope, every cluster gets one member on each node
+    repository = InMemoryAdminConfig()
+    for (typeName, (attributes, parents)) in _types.items():
+        repository.defineType(typeName, attributes, parents)
+    cellPath = 'cells/%s' % _cellName
+    cell = repository.addObject(
+        'Cell', None, [['name', _cellName], ['cellType', 'DISTRIBUTED']],
+        xmlPath=cellPath, xmlDoc='cell.xml'
+    )
+    _addProperties(repository, cell, 'properties', properties)
+    _addProviders(repository, cell, cellPath, providers, dataSources)
+    for n in range(nodes):
+        nodePath = '%s/nodes/node%d' % (cellPath, n)
+        node = repository.addObject(
+            'Node', cell,
+            [['name', 'node%d' % n], ['hostName', 'host%d.example.com' % n]],
+            xmlPath=nodePath, xmlDoc='node.xml'
+        )
+        _addProperties(repository, node, 'properties', properties)
+        _addProviders(repository, node, nodePath, providers, dataSources)
+        for s in range(serversPerNode):
+            serverPath = '%s/servers/server%d' % (nodePath, s)
+            server = repository.addObject(
+                'Server', node,
+                [
+                    ['name', 'server%d' % s],
+                    ['serverType', 'APPLICATION_SERVER'],
+                ],
+                xmlPath=serverPath, xmlDoc='server.xml'
+            )
+            _addProperties(repository, server, 'properties', properties)
+            processDef = repository.addObject(
+                'JavaProcessDef', server, [['executableName', 'java']]
+            )
+            jvm = repository.addObject(
+                'JavaVirtualMachine', processDef,
+                [
+                    ['initialHeapSize', '256'], ['maximumHeapSize', '1024'],
+                    ['classpath', '/opt/lib/a.jar;/opt/lib/b.jar'],
+                ]
+            )
+            _addProperties(repository, jvm, 'systemProperties', properties)
+            _addProviders(
+                repository, server, serverPath, providers, dataSources
+            )
+    for c in range(clusters):
+        clusterPath = '%s/clusters/cluster%d' % (cellPath, c)
+        cluster = repository.addObject(
+            'ServerCluster', cell,
+            [['name', 'cluster%d' % c], ['preferLocal', 'true']],
+            xmlPath=clusterPath, xmlDoc='cluster.xml'
+        )
+        for n in range(nodes):
+            repository.addObject(
+                'ClusterMember', cluster,
+                [
+                    ['memberName', 'member%d' % c], ['nodeName', 'node%d' % n],
+                    ['weight', '2'], ['uniqueId', '%d%d' % (c, n)],
+                ]
+            )
+        _addProviders(repository, cluster, clusterPath, providers, dataSources)
+    repository.save()
+    return repository
+
+
+def _addProperties(repository, parent, attributeName, count):
+    for i in range(count):
+        repository.addObject(
+            'Property', parent,
+            [['name', 'property%d' % i], ['value', 'value %d' % i]],
+            attributeName
+        )
+
+
+def _addProviders(repository, parent, xmlPath, count, dataSources):
+    for p in range(count):
+        provider = repository.addObject(
+            'JDBCProvider', parent,
+            [
+                ['name', 'Provider %d' % p],
+                ['classpath', '/opt/jdbc/driver%d.jar' % p],
+                ['implementationClassName', 'org.example.Driver%d' % p],
+                ['xa', 'false'],
+            ],
+            xmlPath=xmlPath, xmlDoc='resources.xml'
+        )
+        for d in range(dataSources):
+            dataSource = repository.addObject(
+                'DataSource', provider,
+                [
+                    ['name', 'DataSource %d.%d' % (p, d)],
+                    ['jndiName', 'jdbc/ds%d_%d' % (p, d)],
+                    ['statementCacheSize', '10'], ['provider', provider],
+                ]
+            )
+            repository.addObject(
+                'ConnectionPool', dataSource,
+                [['maxConnections', '10'], ['minConnections', '1']]
+            )
+            propertySet = repository.addObject(
+                'J2EEResourcePropertySet', dataSource, []
+            )
+            for i in range(3):
+                repository.addObject(
+                    'J2EEResourceProperty', propertySet,
+                    [['name', 'property%d' % i], ['value', str(i)]]
+                )
+
+
+def generateManifest(nodes=2, serversPerNode=2, providers=1, dataSources=2):
+    # half of the data sources exists in the generated cell, the other half
+    # is going to be created
+    lines = ['Cell', '\t*name %s' % _cellName]
+    for n in range(nodes):
+        lines.extend(['\tNode', '\t\t*name node%d' % n])
+        for s in range(serversPerNode):
+            lines.extend([
+                '\t\tServer', '\t\t\t*name server%d' % s,
+                '\t\t\t-properties',
+                '\t\t\t\tProperty',
+                '\t\t\t\t\t*name manifest.property',
+                '\t\t\t\t\t-value %d' % s,
+            ])
+            for p in range(providers):
+                lines.extend([
+                    '\t\t\tJDBCProvider', '\t\t\t\t*name Provider %d' % p,
+                    '\t\t\t\t-description imported from manifest',
+                ])
+                for d in range(dataSources * 2):
+                    lines.extend([
+                        '\t\t\t\tDataSource',
+                        '\t\t\t\t\t*name DataSource %d.%d' % (p, d),
+                        '\t\t\t\t\t-jndiName jdbc/ds%d_%d' % (p, d),
+                        '\t\t\t\t\t-statementCacheSize 20',
+                    ])
+    return '\n'.join(lines) + '\n'
+
+
+def _measure(title, function):
+    resetInstrumentation()
+    start = time.time()
+    function()
+    elapsed = time.time() - start
+    statistics = getInstrumentationStatistics()
+    calls = 0
+    for s in statistics.values():
+        calls = calls + s['count']
+    print '  %-40s %10.4fs %8d calls' % (title, elapsed, calls)
+
+
+def benchmarkTopology(
+    nodes, serversPerNode, clusters=2, providers=2, dataSources=3,
+    properties=10
+):
+    repository = generateCell(
+        nodes, serversPerNode, clusters, providers, dataSources, properties
+    )
+    print 'synthetic cell: %d nodes, %d servers per node, %d objects' % (
+        nodes, serversPerNode, len(repository.objects)
+    )
+    manifest = generateManifest(nodes, serversPerNode, providers, dataSources)
+    filename = tempfile.mktemp('.wdrc')
+    fo = open(filename, 'w')
+    try:
+        fo.write(manifest)
+    finally:
+        fo.close()
+    useRepository(repository)
+    enableInstrumentation()
+    try:
+        servers = listConfigObjects('Server')
+
+        def listDataSources(servers=servers):
+            listConfigObjects('DataSource')
+            for server in servers:
+                server.listConfigObjects('DataSource')
+
+        def lookupProviders(servers=servers, providers=providers):
+            for server in servers:
+                for p in range(providers):
+                    server.lookup1('JDBCProvider', {'name': 'Provider %d' % p})
+
+        def parseManifest(filename=filename):
+            _loadConfigurationManifest(filename, {}, [])
+
+        def planManifest(filename=filename):
+            planConfigurationManifest(
+                os.path.basename(filename), {}, [os.path.dirname(filename)]
+            )
+
+        def importManifest(filename=filename):
+            importConfigurationManifest(
+                os.path.basename(filename), {}, [os.path.dirname(filename)]
+            )
+        _measure('listConfigObjects', listDataSources)
+        _measure('lookup', lookupProviders)
+        _measure('parse manifest', parseManifest)
+        cacheDir = tempfile.mktemp()
+        enableManifestCache(cacheDir)
+        try:
+            parseManifest()
+            _measure('parse manifest (cached)', parseManifest)
+        finally:
+            disableManifestCache()
+            shutil.rmtree(cacheDir)
+        _measure('plan manifest', planManifest)
+        _measure('import manifest (changes)', importManifest)
+        _measure('import manifest (up to date)', importManifest)
+        enableManifestPrefetch()
+        try:
+            _measure('plan manifest (prefetch)', planManifest)
+            _measure('import manifest (prefetch)', importManifest)
+        finally:
+            disableManifestPrefetch()
+        stateDir = tempfile.mktemp()
+        enableIncrementalManifests(stateDir)
+        try:
+            importManifest()
+            save()
+            _measure('import manifest (incremental)', importManifest)
+        finally:
+            disableIncrementalManifests()
+            shutil.rmtree(stateDir)
+        try:
+            import wdr.tools
+        except ImportError:
+            # wdr.tools needs Java classes, export is measured in wsadmin only
+            print '  %-40s %s' % ('export manifest', 'needs wsadmin')
+        else:
+            def exportManifest():
+                str(
+                    wdr.tools.exportConfigurationManifest(
+                        getid1('/Cell:%s/' % _cellName),
+                        wdr.tools._defaultExportConfig
+                    )
+                )
+            _measure('export manifest', exportManifest)
+    finally:
+        resetInstrumentation()
+        disableInstrumentation()
+        closeRepository()
+        os.remove(filename)
+
+
+def run(scales=((1, 5), (2, 10), (4, 20))):
+    for (nodes, serversPerNode) in scales:
+        benchmarkTopology(nodes, serversPerNode)
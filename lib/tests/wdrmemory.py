@@ -0,0 +1,203 @@
+from string import split
+import copy
+
+import wdr.config
+from wdr.offline import OfflineAdminConfig
+from wdr.offline import _ATTRIBUTE, _CHILDREN, _REFERENCES, _TEXT
+from wdr.offline import _OfflineObject, _formatConfigId, _isContained
+from wdr.offline import _parseConfigId
+
+
+class InMemoryAdminConfig(OfflineAdminConfig):
+    # writable repository kept entirely in memory, types have to be defined
+    # upfront, reset rolls objects back to the last save
+    def __init__(self):
+        OfflineAdminConfig.__init__(self)
+        self.sequence = 0
+        self.changes = 0
+        self.saved = self._copyObjects()
+
+    def defineType(self, type, attributes, parents=[]):
+        # attributes map names to wsadmin notation, e.g. 'String*' for lists
+        # or 'JDBCProvider@' for references
+        attributeTypes = self.attributeTypes.setdefault(type, {})
+        for (name, attributeType) in attributes.items():
+            ai = wdr.config.parseAttributeType(name, attributeType)
+            attributeTypes[name] = [ai.type, ai.list, ai.reference]
+        parentTypes = self.parentTypes.setdefault(type, {})
+        for parent in parents:
+            parentTypes[parent] = 1
+
+    def addObject(
+        self, type, parentId, attributes, propertyName=None,
+        xmlPath=None, xmlDoc=None
+    ):
+        # objects are stored in the document of their parent unless a new
+        # document is specified
+        parent = None
+        if parentId:
+            parent = self._getObject(parentId)
+            if xmlDoc is None:
+                (xmlPath, xmlDoc) = (parent.xmlPath, parent.xmlDoc)
+        if xmlDoc is None:
+            raise Exception('document of root object %s not specified' % type)
+        self.sequence = self.sequence + 1
+        obj = _OfflineObject(
+            xmlPath, xmlDoc, '%s_%d' % (type, self.sequence), type, parent
+        )
+        self.objects[(xmlPath, xmlDoc, obj.xmlId)] = obj
+        self.objectsByType.setdefault(type, []).append(obj)
+        if parent is None or (xmlPath, xmlDoc) != (
+            parent.xmlPath, parent.xmlDoc
+        ):
+            self.documents.setdefault((xmlPath, xmlDoc), []).append(obj)
+        if parent is not None:
+            propertyName = propertyName or self._containingAttribute(
+                parent.type, type
+            )
+            if propertyName:
+                parent.values.setdefault(
+                    propertyName, [_CHILDREN, []]
+                )[1].append(obj)
+        obj.configId = _formatConfigId(obj)
+        for (name, value) in attributes:
+            self._setValue(obj, name, value)
+        self.changes = self.changes + 1
+        return obj.configId
+
+    def create(self, type, parentId, attributes, propertyName=None):
+        return self.addObject(type, parentId, attributes, propertyName)
+
+    def modify(self, configId, attributes):
+        obj = self._getObject(configId)
+        for (name, value) in attributes:
+            self._setValue(obj, name, value)
+        self.changes = self.changes + 1
+
+    def unsetAttributes(self, configId, attributeNames):
+        obj = self._getObject(configId)
+        for name in attributeNames:
+            if obj.values.has_key(name):
+                del obj.values[name]
+        self.changes = self.changes + 1
+
+    def remove(self, configId):
+        removed = {self._getObject(configId): 1}
+        for obj in self.objects.values():
+            if _isContained(obj, removed):
+                removed[obj] = 1
+        for (key, obj) in self.objects.items():
+            if removed.has_key(obj):
+                del self.objects[key]
+                self.objectsByType[obj.type].remove(obj)
+                roots = self.documents.get((obj.xmlPath, obj.xmlDoc), [])
+                if obj in roots:
+                    roots.remove(obj)
+            else:
+                for entry in obj.values.values():
+                    if entry[0] in (_CHILDREN, _REFERENCES):
+                        entry[1] = [
+                            o for o in entry[1] if not removed.has_key(o)
+                        ]
+        self.changes = self.changes + 1
+
+    def hasChanges(self):
+        return self.changes > 0
+
+    def save(self):
+        self.saved = self._copyObjects()
+        self.changes = 0
+
+    def reset(self):
+        (
+            self.objects, self.documents, self.objectsByType, self.sequence
+        ) = copy.deepcopy(self.saved)
+        self.changes = 0
+
+    def _copyObjects(self):
+        # objects refer to each other, they are copied all at once
+        return copy.deepcopy(
+            (self.objects, self.documents, self.objectsByType, self.sequence)
+        )
+
+    def _containingAttribute(self, parentType, type):
+        for (name, (typeName, isList, isReference)) in (
+            self.attributeTypes.get(parentType, {}).items()
+        ):
+            if typeName == type and not isReference:
+                return name
+        return None
+
+    def _setValue(self, obj, name, value):
+        attributeType = self.attributeTypes.get(obj.type, {}).get(name)
+        if attributeType is None:
+            raise Exception(
+                'attribute %s is not defined for type %s' % (name, obj.type)
+            )
+        (typeName, isList, isReference) = attributeType
+        typeInfo = wdr.config._typeRegistry.get(typeName)
+        if typeInfo is not None and typeInfo.converter is not None:
+            if not isList:
+                obj.values[name] = [_ATTRIBUTE, [str(value)]]
+                if name == 'name':
+                    obj.name = str(value)
+                    obj.configId = _formatConfigId(obj)
+                return
+            if type(value) == type(''):
+                values = filter(None, split(value, ';'))
+            else:
+                values = map(str, value)
+            kind = _TEXT
+        elif isReference:
+            if type(value) in (type([]), type(())):
+                configIds = map(_parseConfigId, value)
+            else:
+                value = str(value)
+                if value[:1] == '[':
+                    configIds = wdr.config._parseConfigIdList(value)
+                elif value:
+                    configIds = [_parseConfigId(value)]
+                else:
+                    configIds = []
+            values = map(self._getObjectById, configIds)
+            kind = _REFERENCES
+        elif value:
+            raise Exception(
+                'nested objects of %s.%s have to be created'
+                % (obj.type, name)
+            )
+        else:
+            return
+        if isList and value:
+            obj.values.setdefault(name, [kind, []])[1].extend(values)
+        else:
+            # assigning empty list clears list attributes
+            obj.values[name] = [kind, values]
+
+
+def memoryRepository():
+    # cell with JDBC providers, data sources and their properties
+    repository = InMemoryAdminConfig()
+    repository.defineType('Cell', {'name': 'String'})
+    repository.defineType(
+        'JDBCProvider',
+        {'name': 'String', 'classpath': 'String*'},
+        ['Cell']
+    )
+    repository.defineType(
+        'DataSource',
+        {
+            'name': 'String', 'provider': 'JDBCProvider@',
+            'properties': 'Property*',
+        },
+        ['JDBCProvider']
+    )
+    repository.defineType(
+        'Property', {'name': 'String', 'value': 'String'}, ['DataSource']
+    )
+    repository.addObject(
+        'Cell', None, [['name', 'memoryCell']],
+        xmlPath='cells/memoryCell', xmlDoc='cell.xml'
+    )
+    repository.save()
+    return repository
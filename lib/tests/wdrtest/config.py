@@ -1,3 +1,5 @@
+import os
+import tempfile
 import types
 import unittest
 
@@ -9,6 +11,12 @@ from wdr.manifest import * #noqa
 from wdr.util import * #noqa
 from wdr.config import _parseConfigId, _parseConfigIdList
 from wdr.config import _isConfigId, _isConfigIdList
+from wdr.config import _scanConfigId, _scanConfigIdList
+from wdr.config import _matchConfigId, _matchConfigIdList
+from wdr.config import _loadTypeRegistryCache, _saveTypeRegistryCache
+from wdr.config import _contextObjectType, _xmlIdObjectType
+from wdr.offline import closeRepository, useRepository
+from wdrmemory import memoryRepository
 from wdrtest.topology import topology
 
 (
@@ -546,6 +554,221 @@ class ConfigIdParsingTest(unittest.TestCase):
         self.assertEquals(cfgIds[1].xmlId, 'SomeObject_2')
 
 
+class ConfigIdScannerTest(unittest.TestCase):
+    ids = [
+        'DefaultDatasource(cells/c/nodes/n|resources.xml#DataSource_1)',
+        '"Default Datasource(cells/c/nodes/n|resources.xml#DataSource_1)"',
+        '" Datasource(cells/c/nodes/n|resources.xml#DataSource_1)"',
+        '"Datasource (cells/c/nodes/n|resources.xml#DataSource_1)"',
+        '(cells/c/nodes/n/servers/s|server.xml#Property_1)',
+        '"(cells/c/nodes/n/servers/s|server.xml#Property_1)"',
+        '" (cells/c/nodes/n/servers/s|server.xml#Property_1)"',
+        '"Derby (XA)(cells/c/nodes/n|resources.xml#builtin_jdbcprovider)"',
+        '"p(cells/c/nodes/n a|server.xml#Property_1)"',
+    ]
+    irregularIds = [
+        '***',
+        'p(cells/c|server.xml#Property_1)trailing',
+        'p(cells/c|ser(ver.xml#Property_1)',
+        'a(b[c(cells/c|server.xml#Property_1)',
+    ]
+    lists = [
+        '[]',
+        '[p(cells/c|server.xml#Property_1)]',
+        '["p 1(cells/c|server.xml#Property_1)"]',
+        '[p(cells/c|server.xml#Property_1) (cells/c|server.xml#Property_2)]',
+        '["p 1(cells/c|server.xml#Property_1)"'
+        + ' p2(cells/c|server.xml#Property_2)'
+        + ' "p 3(cells/c|server.xml#Property_3)"]',
+        '"[(cells/c|server.xml#Property_1) (cells/c|server.xml#Property_2)]"',
+    ]
+
+    def assertSameIds(self, expected, actual):
+        self.assertEquals(len(expected), len(actual))
+        for i in range(len(expected)):
+            self.assertSameId(expected[i], actual[i])
+
+    def assertSameId(self, expected, actual):
+        self.assertEquals(expected.name, actual.name)
+        self.assertEquals(expected.xmlPath, actual.xmlPath)
+        self.assertEquals(expected.xmlDoc, actual.xmlDoc)
+        self.assertEquals(expected.xmlId, actual.xmlId)
+
+    def testIdsMatchRegularExpression(self):
+        for strId in self.ids:
+            cfgId = _scanConfigId(strId, 0, len(strId))
+            self.assertNotEqual(None, cfgId, strId)
+            self.assertSameId(_matchConfigId(strId), cfgId)
+
+    def testIrregularIdsLeftToRegularExpression(self):
+        for strId in self.irregularIds:
+            self.assertEquals(None, _scanConfigId(strId, 0, len(strId)))
+            self.assert_(_isConfigId(strId))
+        self.assertSameId(
+            _matchConfigId(self.irregularIds[2]),
+            _parseConfigId(self.irregularIds[2])
+        )
+
+    def testListsMatchRegularExpression(self):
+        for strIds in self.lists:
+            cfgIds = _scanConfigIdList(strIds)
+            self.assertNotEqual(None, cfgIds, strIds)
+            self.assertSameIds(_matchConfigIdList(strIds), cfgIds)
+
+    def testIrregularListsLeftToRegularExpression(self):
+        for strIds in [
+            '""', '[ ]', '***',
+            '[(cells/c|ser(ver.xml#P_1) (cells/c|server.xml#P_2)]',
+        ]:
+            self.assertEquals(None, _scanConfigIdList(strIds))
+        strIds = '[(cells/c|ser(ver.xml#P_1) (cells/c|server.xml#P_2)]'
+        self.assertSameIds(
+            _matchConfigIdList(strIds), _parseConfigIdList(strIds)
+        )
+
+
+class ConfigIdTest(unittest.TestCase):
+    def testEqualIdsAreShared(self):
+        strId = 'p(cells/c|server.xml#Property_1)'
+        self.assert_(_parseConfigId(strId) is _parseConfigId('"%s"' % strId))
+        cfgIds = _parseConfigIdList('[%s]' % strId)
+        self.assert_(cfgIds[0] is _parseConfigId(strId))
+
+    def testEqualityAndHash(self):
+        strId = 'p(cells/c|server.xml#Property_1)'
+        cfgId = ConfigId('p', 'cells/c', 'server.xml', 'Property_1')
+        self.assertEquals(strId, str(cfgId))
+        self.assertEquals(cfgId, _parseConfigId(strId))
+        self.assertEquals(hash(cfgId), hash(_parseConfigId(strId)))
+        self.assertEquals(ConfigObject(cfgId), ConfigObject(cfgId))
+        self.assertNotEqual(
+            cfgId, _parseConfigId('p(cells/c|server.xml#Property_2)')
+        )
+
+    def testValidationDoesNotIntern(self):
+        strId = 'p(cells/c|server.xml#Property_3)'
+        self.assert_(_isConfigId(strId))
+        self.assert_(_isConfigIdList('[%s]' % strId))
+        self.failIf(wdr.config._configIds.has_key(strId))
+
+    def testInternedIdsAreBounded(self):
+        limit = wdr.config._configIdLimit
+        wdr.config._configIdLimit = 10
+        try:
+            for i in range(25):
+                _parseConfigId('p(cells/c|server.xml#Property_%d)' % i)
+            self.assert_(len(wdr.config._configIds) <= 10)
+        finally:
+            wdr.config._configIdLimit = limit
+
+    def testImmutable(self):
+        cfgId = _parseConfigId('p(cells/c|server.xml#Property_1)')
+        self.assertRaises(Exception, setattr, cfgId, 'name', 'q')
+        self.assertRaises(Exception, delattr, cfgId, 'name')
+        self.assertEquals('p', cfgId.name)
+        self.assertEquals('p(cells/c|server.xml#Property_1)', str(cfgId))
+
+
+class ConfigObjectIterationTest(unittest.TestCase):
+    def testLines(self):
+        output = (
+            'a(cells/c|resources.xml#DataSource_1)\r\n\n'
+            '"b c(cells/c|resources.xml#DataSource_2)"\n'
+        )
+        objects = []
+        for o in ConfigIdLinesIterator(output, 'DataSource'):
+            objects.append(o)
+        self.assertEquals(
+            [
+                'a(cells/c|resources.xml#DataSource_1)',
+                'b c(cells/c|resources.xml#DataSource_2)',
+            ],
+            map(str, objects)
+        )
+        self.assertEquals(
+            ['DataSource', 'DataSource'], [o._type for o in objects]
+        )
+        self.assertEquals([], [o for o in ConfigIdLinesIterator('')])
+
+    def testIdList(self):
+        strIds = (
+            '"[a(cells/c|server.xml#Property_1)'
+            ' "b c(cells/c|server.xml#Property_2)"'
+            '  (cells/c|server.xml#Property_3)]"'
+        )
+        self.assertEquals(
+            _parseConfigIdList(strIds[1:-1]),
+            [o._id for o in iterConfigObjectList(strIds)]
+        )
+        self.assertEquals([], [o for o in iterConfigObjectList('[]')])
+        self.assertRaises(Exception, iterConfigObjectList, 'a(c|d.xml#P_1)')
+
+    def testEarlyExit(self):
+        output = ''
+        for i in range(100):
+            output += 'p%d(cells/c|server.xml#Property_%d)\n' % (i, i)
+        iterator = ConfigIdLinesIterator(output)
+        for o in iterator:
+            if o._id.name == 'p2':
+                break
+        self.assertEquals(3, iterator.index)
+
+    def testChunks(self):
+        self.assertEquals(
+            [[0, 1], [2, 3], [4]], [c for c in chunks(range(5), 2)]
+        )
+        self.assertEquals([], [c for c in chunks([], 2)])
+        self.assertEquals(
+            [['a'], ['b']],
+            [
+                map(lambda o: o._id.name, c) for c in chunks(
+                    ConfigIdLinesIterator(
+                        'a(cells/c|s.xml#P_1)\nb(cells/c|s.xml#P_2)'
+                    ),
+                    1
+                )
+            ]
+        )
+
+
+class ObjectTypeFromContextTest(unittest.TestCase):
+    def testXmlIdObjectType(self):
+        self.assertEquals(
+            _xmlIdObjectType(
+                _parseConfigId('server1(cells/c|server.xml#Server_1234)')
+            ),
+            'Server'
+        )
+        self.assertEquals(
+            _xmlIdObjectType(
+                _parseConfigId('(cells/c|server.xml#builtin)')
+            ),
+            None
+        )
+
+    def testConfirmedByXmlId(self):
+        cfgId = _parseConfigId('p(cells/c|server.xml#Property_1)')
+        self.assertEquals(_contextObjectType(cfgId, 'Property'), 'Property')
+
+    def testSubTypeConfirmedByXmlId(self):
+        cfgId = _parseConfigId('p(cells/c|server.xml#TypedProperty_1)')
+        self.assertEquals(
+            _contextObjectType(
+                cfgId, 'Property', ['TypedProperty', 'DescriptiveProperty']
+            ),
+            'TypedProperty'
+        )
+
+    def testUnconfirmedSubType(self):
+        cfgId = _parseConfigId('p(cells/c|server.xml#builtin_property)')
+        self.assertEquals(
+            _contextObjectType(
+                cfgId, 'Property', ['TypedProperty', 'DescriptiveProperty']
+            ),
+            None
+        )
+
+
 class AttributeInfoParsingTest(unittest.TestCase):
     def testAttributeWithEnum(self):
         ai = parseAttributeType(
@@ -614,6 +837,96 @@ class AttributeInfoParsingTest(unittest.TestCase):
         self.assertEquals(ai.subTypes, None)
 
 
+class TypeInfoTest(AbstractConfigTest):
+    def testAttributeDescriptor(self):
+        ti = TypeInfo(
+            'Sample',
+            {
+                'name': parseAttributeType('name', 'String'),
+                'ports': parseAttributeType('ports', 'int*'),
+                'provider': parseAttributeType(
+                    'provider', 'J2EEResourceProvider@'
+                ),
+            },
+            [], []
+        )
+        (cnv, isList, isReference, ai) = ti.attributeDescriptor('name')
+        self.assert_(cnv is getTypeInfo('String').converter)
+        self.assertEquals((isList, isReference), (0, 0))
+        self.assert_(ai is ti.attributes['name'])
+        self.assert_(
+            ti.attributeDescriptor('name') is ti.attributeDescriptor('name')
+        )
+        self.assertEquals(ti.attributeDescriptor('ports')[1:3], (1, 0))
+        table = ti.attributeTable()
+        self.assertEquals(len(table), 3)
+        self.assertEquals(table['provider'][2], 1)
+
+    def testParentsFromRegistry(self):
+        self.assertEquals(parents('Server'), getTypeInfo('Server').parents)
+        serverParents = parents('Server')
+        serverParents.append('Foo')
+        self.assertNotEqual(parents('Server'), serverParents)
+
+
+class TypeRegistryCacheTest(AbstractConfigTest):
+    def setUp(self):
+        self.filename = tempfile.mktemp('.cache')
+
+    def tearDown(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+        AbstractConfigTest.tearDown(self)
+
+    def testSaveAndLoad(self):
+        typeInfo = getTypeInfo('JavaVirtualMachine')
+        _saveTypeRegistryCache(self.filename)
+        del wdr.config._typeRegistry['JavaVirtualMachine']
+        try:
+            self.assertTrue(_loadTypeRegistryCache(self.filename))
+            loadedTypeInfo = getTypeInfo('JavaVirtualMachine')
+        finally:
+            wdr.config._typeRegistry['JavaVirtualMachine'] = typeInfo
+        self.assertEquals(loadedTypeInfo.parents, typeInfo.parents)
+        self.assertEquals(loadedTypeInfo.children, typeInfo.children)
+        names = typeInfo.attributes.keys()
+        names.sort()
+        loadedNames = loadedTypeInfo.attributes.keys()
+        loadedNames.sort()
+        self.assertEquals(loadedNames, names)
+        for n in names:
+            ai = typeInfo.attributes[n]
+            loadedAi = loadedTypeInfo.attributes[n]
+            self.assertEquals(loadedAi.type, ai.type)
+            self.assertEquals(loadedAi.list, ai.list)
+            self.assertEquals(loadedAi.reference, ai.reference)
+            self.assertEquals(loadedAi.enumValues, ai.enumValues)
+            self.assertEquals(loadedAi.subTypes, ai.subTypes)
+
+    def testUnsupportedFormatIgnored(self):
+        fo = open(self.filename, 'w')
+        try:
+            fo.write('WDR-TYPE-REGISTRY\t0\t1\n')
+        finally:
+            fo.close()
+        self.assertFalse(_loadTypeRegistryCache(self.filename))
+
+
+class _DisconnectedAdminControl:
+    pass
+
+
+class WebSphereVersionTest(unittest.TestCase):
+    def setUp(self):
+        wdr.replaceWsadminObject('AdminControl', _DisconnectedAdminControl())
+
+    def tearDown(self):
+        wdr.restoreWsadminObject('AdminControl')
+
+    def testUnknownVersion(self):
+        self.assertEquals(None, wdr.config._wasVersion())
+
+
 class EnvironmentTest(AbstractConfigTest):
     def testCellName(self):
         cellName = getid1(
@@ -635,6 +948,21 @@ class EnvironmentTest(AbstractConfigTest):
         )
 
 
+class ObjectTypeTest(AbstractConfigTest):
+    def testListedObjectTypes(self):
+        for obj in listConfigObjects('Server'):
+            self.assertEquals(obj._type, getObjectType(obj._id))
+
+    def testAttributeObjectTypes(self):
+        srv = getid1(
+            '/Cell:%(cellName)s/Node:%(nodeName)s'
+            '/Server:%(serverName)s/'
+            % topology
+        )
+        for obj in srv.components + srv.services:
+            self.assertEquals(obj._type, getObjectType(obj._id))
+
+
 class AttributeReadTest(AbstractConfigTest):
     def testGetString(self):
         srv = getid1(
@@ -738,3 +1066,413 @@ class AttributeWriteTest(AbstractConfigTest):
         )
         self.assertEquals(developmentMode, 'true')
         self.assertEquals(parallelStartEnabled, 'false')
+
+
+class AttributePrefetchTest(AbstractConfigTest):
+    def setUp(self):
+        enableAttributePrefetch()
+
+    def tearDown(self):
+        disableAttributePrefetch()
+        AbstractConfigTest.tearDown(self)
+
+    def testReadMatchesShowAttribute(self):
+        jvm = getid1(
+            '/Cell:%(cellName)s/Node:%(nodeName)s'
+            '/Server:%(serverName)s'
+            '/JavaProcessDef:/JavaVirtualMachine:/'
+            % topology
+        )
+        for name in ['maximumHeapSize', 'classpath', 'debugMode']:
+            self.assertEquals(jvm[name], jvm._showConfigAttribute(name))
+
+    def testWriteInvalidatesSnapshot(self):
+        jvm = getid1(
+            '/Cell:%(cellName)s/Node:%(nodeName)s'
+            '/Server:%(serverName)s'
+            '/JavaProcessDef:/JavaVirtualMachine:/'
+            % topology
+        )
+        self.assertEquals(jvm.maximumHeapSize, 0)
+        jvm.maximumHeapSize = 12345
+        self.assertEquals(jvm.maximumHeapSize, 12345)
+        jvm.classpath = ['a', 'b', 'c']
+        self.assertEquals(jvm.classpath, ['a', 'b', 'c'])
+
+
+class AttributeCacheTest(AbstractConfigTest):
+    def setUp(self):
+        enableAttributeCache(2)
+
+    def tearDown(self):
+        disableAttributeCache()
+        AbstractConfigTest.tearDown(self)
+
+    def getJvm(self):
+        return getid1(
+            '/Cell:%(cellName)s/Node:%(nodeName)s'
+            '/Server:%(serverName)s'
+            '/JavaProcessDef:/JavaVirtualMachine:/'
+            % topology
+        )
+
+    def testRepeatedReadIsCached(self):
+        jvm = self.getJvm()
+        self.assertEquals(jvm.maximumHeapSize, 0)
+        self.assertEquals(self.getJvm().maximumHeapSize, 0)
+        statistics = getAttributeCacheStatistics()
+        self.assertEquals(statistics['misses'], 1)
+        self.assertEquals(statistics['hits'], 1)
+
+    def testWriteInvalidatesCache(self):
+        jvm = self.getJvm()
+        self.assertEquals(jvm.maximumHeapSize, 0)
+        jvm.maximumHeapSize = 12345
+        self.assertEquals(self.getJvm().maximumHeapSize, 12345)
+        jvm.classpath = ['a', 'b', 'c']
+        classpath = jvm.classpath
+        classpath.append('d')
+        self.assertEquals(jvm.classpath, ['a', 'b', 'c'])
+        jvm.unset(['classpath'])
+        self.assertEquals(jvm.classpath, [])
+
+    def testResetInvalidatesCache(self):
+        jvm = self.getJvm()
+        jvm.maximumHeapSize = 12345
+        self.assertEquals(jvm.maximumHeapSize, 12345)
+        reset()
+        self.assertEquals(jvm.maximumHeapSize, 0)
+
+    def testSizeIsBounded(self):
+        cell = getid1('/Cell:%(cellName)s/' % topology)
+        node = getid1('/Cell:%(cellName)s/Node:%(nodeName)s/' % topology)
+        server = getid1(
+            '/Cell:%(cellName)s/Node:%(nodeName)s/Server:%(serverName)s/'
+            % topology
+        )
+        self.assertEquals(cell.name, topology['cellName'])
+        self.assertEquals(node.name, topology['nodeName'])
+        self.assertEquals(server.name, topology['serverName'])
+        statistics = getAttributeCacheStatistics()
+        self.assertEquals(statistics['size'], 2)
+        self.assertEquals(statistics['evictions'], 1)
+        self.assertEquals(cell.name, topology['cellName'])
+        self.assertEquals(getAttributeCacheStatistics()['misses'], 4)
+
+    def testDisabledCache(self):
+        disableAttributeCache()
+        self.assertEquals(getAttributeCacheStatistics(), None)
+        self.assertEquals(self.getJvm().maximumHeapSize, 0)
+
+
+class ContainmentIndexTest(AbstractConfigTest):
+    def tearDown(self):
+        disableContainmentIndex()
+        AbstractConfigTest.tearDown(self)
+
+    def exhaustiveChildren(self, scope, _type):
+        candidates = scope.listConfigObjects(_type)
+        for parentType in parents(_type):
+            if parentType != scope._type:
+                for child in scope.listConfigObjects(parentType):
+                    for grandchild in child.listConfigObjects(_type):
+                        if grandchild in candidates:
+                            candidates.remove(grandchild)
+        return candidates
+
+    def sortedIds(self, objects):
+        result = map(str, objects)
+        result.sort()
+        return result
+
+    def testMatchesExhaustiveLookup(self):
+        node = getid1('/Cell:%(cellName)s/Node:%(nodeName)s/' % topology)
+        index = ContainmentIndex()
+        for _type in ['JavaVirtualMachine', 'Property', 'ThreadPool']:
+            self.assertEquals(
+                self.sortedIds(index.children(node, _type)),
+                self.sortedIds(self.exhaustiveChildren(node, _type))
+            )
+
+    def testRemovedObjectsAreDropped(self):
+        enableContainmentIndex()
+        node = getid1('/Cell:%(cellName)s/Node:%(nodeName)s/' % topology)
+        children = node._lookupNonIndexedChildren(
+            'JavaVirtualMachine', {}, None, None
+        )
+        for c in children:
+            c.remove()
+            self.assertEquals(
+                self.sortedIds(
+                    node._lookupNonIndexedChildren(
+                        'JavaVirtualMachine', {}, None, None
+                    )
+                ),
+                self.sortedIds(
+                    self.exhaustiveChildren(node, 'JavaVirtualMachine')
+                )
+            )
+
+
+class DocumentOwnershipTest(unittest.TestCase):
+    def setUp(self):
+        repository = memoryRepository()
+        repository.defineType('Node', {'name': 'String'}, ['Cell'])
+        repository.defineType('Server', {'name': 'String'}, ['Node'])
+        repository.defineType('ThreadPool', {'name': 'String'}, ['Server'])
+        cell = repository.getid('/Cell:memoryCell/').strip()
+        node = repository.addObject(
+            'Node', cell, [['name', 'n']],
+            xmlPath='cells/memoryCell/nodes/n', xmlDoc='node.xml'
+        )
+        repository.addObject('ThreadPool', node, [['name', 'direct']])
+        for name in ['a1', 'xa1']:
+            server = repository.addObject(
+                'Server', node, [['name', name]],
+                xmlPath='cells/memoryCell/nodes/n/servers/%s' % name,
+                xmlDoc='server.xml'
+            )
+            repository.addObject('ThreadPool', server, [['name', name]])
+        repository.save()
+        useRepository(repository)
+
+    def tearDown(self):
+        disableContainmentIndex()
+        closeRepository()
+
+    def testGrandchildrenExcluded(self):
+        node = getid1('/Node:n/')
+        self.assertEquals(
+            ['direct'],
+            [
+                c.name for c in
+                node._lookupNonIndexedChildren('ThreadPool', {}, None, None)
+            ]
+        )
+        enableContainmentIndex()
+        self.assertEquals(
+            ['direct'],
+            [
+                c.name for c in
+                node._lookupNonIndexedChildren('ThreadPool', {}, None, None)
+            ]
+        )
+
+
+class QueryCacheTest(AbstractConfigTest):
+    def setUp(self):
+        enableQueryCache()
+
+    def tearDown(self):
+        disableQueryCache()
+        AbstractConfigTest.tearDown(self)
+
+    def getJvm(self):
+        return getid1(
+            '/Cell:%(cellName)s/Node:%(nodeName)s'
+            '/Server:%(serverName)s'
+            '/JavaProcessDef:/JavaVirtualMachine:/'
+            % topology
+        )
+
+    def testRepeatedQueries(self):
+        server = getid1(
+            '/Cell:%(cellName)s/Node:%(nodeName)s/Server:%(serverName)s/'
+            % topology
+        )
+        self.assertEquals(
+            [server],
+            getid(
+                '/Cell:%(cellName)s/Node:%(nodeName)s/Server:%(serverName)s'
+                % topology
+            )
+        )
+        statistics = getQueryCacheStatistics()
+        self.assertEquals(1, statistics['misses'])
+        self.assertEquals(1, statistics['hits'])
+
+    def testInvalidation(self):
+        jvm = self.getJvm()
+        query = (
+            '/Cell:%(cellName)s/Node:%(nodeName)s/Server:%(serverName)s'
+            '/JavaProcessDef:/JavaVirtualMachine:/Property:wdr.query/'
+            % topology
+        )
+        self.assertEquals([], getid(query))
+        prop = jvm.create('Property', 'systemProperties', name='wdr.query')
+        self.assertEquals([prop], getid(query))
+        prop.value = 'unrelated to containment'
+        self.assertEquals([prop], getid(query))
+        prop.name = 'wdr.query.renamed'
+        self.assertEquals([], getid(query))
+        prop.name = 'wdr.query'
+        self.assertEquals([prop], getid(query))
+        prop.remove()
+        self.assertEquals([], getid(query))
+        self.assertEquals(4, getQueryCacheStatistics()['invalidations'])
+
+
+class AttributeIndexTest(AbstractConfigTest):
+    def tearDown(self):
+        dropAttributeIndex('Property')
+        AbstractConfigTest.tearDown(self)
+
+    def getJvm(self):
+        return getid1(
+            '/Cell:%(cellName)s/Node:%(nodeName)s'
+            '/Server:%(serverName)s'
+            '/JavaProcessDef:/JavaVirtualMachine:/'
+            % topology
+        )
+
+    def testInvalidIndexes(self):
+        self.assertRaises(
+            Exception, defineAttributeIndex, 'Property', 'noSuchAttribute'
+        )
+        self.assertRaises(
+            Exception, defineAttributeIndex, 'JavaVirtualMachine', 'classpath'
+        )
+
+    def testLookup(self):
+        jvm = self.getJvm()
+        jvm.assure('Property', {'name': 'wdr.index.a'}, 'systemProperties')
+        jvm.assure('Property', {'name': 'wdr.index.b'}, 'systemProperties')
+        expected = jvm.lookup('Property', {'name': 'wdr.index.a'})
+        defineAttributeIndex('Property', 'name')
+        self.assertEquals(
+            expected, jvm.lookup('Property', {'name': 'wdr.index.a'})
+        )
+        statistics = getAttributeIndexStatistics()[('Property', 'name')]
+        self.assertEquals(1, statistics['builds'])
+        self.assertTrue(statistics['hits'] > 0)
+
+    def testModificationsAreTracked(self):
+        jvm = self.getJvm()
+        defineAttributeIndex('Property', 'name')
+        prop = jvm.assure(
+            'Property', {'name': 'wdr.index.a'}, 'systemProperties'
+        )
+        self.assertEquals(
+            [prop], jvm.lookup('Property', {'name': 'wdr.index.a'})
+        )
+        prop.name = 'wdr.index.c'
+        self.assertEquals(
+            [], jvm.lookup('Property', {'name': 'wdr.index.a'})
+        )
+        self.assertEquals(
+            [prop], jvm.lookup('Property', {'name': 'wdr.index.c'})
+        )
+        prop.remove()
+        self.assertEquals(
+            [], jvm.lookup('Property', {'name': 'wdr.index.c'})
+        )
+
+
+class ConfigBatchTest(AbstractConfigTest):
+    def tearDown(self):
+        if wdr.config._activeBatch is not None:
+            wdr.config._activeBatch.discard()
+        AbstractConfigTest.tearDown(self)
+
+    def getJvm(self):
+        return getid1(
+            '/Cell:%(cellName)s/Node:%(nodeName)s'
+            '/Server:%(serverName)s'
+            '/JavaProcessDef:/JavaVirtualMachine:/'
+            % topology
+        )
+
+    def testCommit(self):
+        jvm = self.getJvm()
+        b = batch()
+        jvm.initialHeapSize = 64
+        jvm.maximumHeapSize = 512
+        jvm.classpath = ['a', 'b']
+        jvm.genericJvmArguments = '-Dx=y'
+        del jvm.genericJvmArguments
+        b.commit()
+        jvm = self.getJvm()
+        self.assertEquals(jvm.initialHeapSize, 64)
+        self.assertEquals(jvm.maximumHeapSize, 512)
+        self.assertEquals(jvm.classpath, ['a', 'b'])
+        self.assertNotEqual(jvm.genericJvmArguments, '-Dx=y')
+
+    def testReadFlushesPendingChanges(self):
+        jvm = self.getJvm()
+        b = batch()
+        jvm.initialHeapSize = 64
+        self.assertEquals(self.getJvm().initialHeapSize, 64)
+        b.commit()
+
+    def testDiscard(self):
+        jvm = self.getJvm()
+        b = batch()
+        jvm.maximumHeapSize = 512
+        b.discard()
+        self.assertEquals(self.getJvm().maximumHeapSize, 0)
+
+    def testSingleActiveBatch(self):
+        b = batch()
+        self.assertRaises(Exception, batch)
+        b.commit()
+        self.assertRaises(Exception, b.commit)
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.filename = tempfile.mktemp('.snapshot')
+        useRepository('wdrtest/repositories/basic')
+        try:
+            self.objectCount = snapshot(
+                getid1('/Cell:wdrCell/'), self.filename
+            )
+        finally:
+            closeRepository()
+        useRepository(self.filename)
+
+    def tearDown(self):
+        closeRepository()
+        os.remove(self.filename)
+
+    def testObjects(self):
+        self.assertEquals(18, self.objectCount)
+        self.assertEquals(
+            1, len(getid('/Cell:wdrCell/Node:wdrNode/Server:wdrServer/'))
+        )
+        self.assertEquals(
+            ['ServerDataSource'],
+            [
+                ds.name for ds in
+                getid1('/Server:wdrServer/').listConfigObjects('DataSource')
+            ]
+        )
+
+    def testParentLinks(self):
+        records = [
+            l for l in open(self.filename).readlines() if l[:2] == 'P\t'
+        ]
+        self.failUnless(records)
+        self.assertEquals(
+            ['wdrServer'],
+            [
+                s.name for s in
+                getid1('/Node:wdrNode/').listConfigObjects('Server')
+            ]
+        )
+
+    def testAttributes(self):
+        cell = getid1('/Cell:wdrCell/')
+        self.assertEquals(
+            [('cell.description', 'offline "fixture" cell'), ('empty', '')],
+            [(p.name, p.value) for p in cell.properties]
+        )
+        names = cell.getAllAttributes().keys()
+        names.sort()
+        self.assertEquals(
+            ['cellDiscoveryProtocol', 'cellType', 'name', 'properties'], names
+        )
+
+    def testReferences(self):
+        provider = getid1('/DataSource:ServerDataSource/').provider
+        self.assertEquals('Derby JDBC Provider', provider.name)
+        self.assertEquals(2, len(provider.classpath))
@@ -0,0 +1,103 @@
+import logging
+import os
+import tempfile
+import unittest
+
+import wdr
+from wdr.config import * #noqa
+from wdr.instrumentation import * #noqa
+from wdr.instrumentation import _percentile
+from wdr.offline import * #noqa
+
+logger = logging.getLogger('wdr.test.instrumentation')
+
+repositoryDirectory = 'wdrtest/repositories/basic'
+
+
+class _Target:
+    host = 'localhost'
+
+    def echo(self, value):
+        return value
+
+    def fail(self):
+        raise Exception('failure')
+
+
+class InstrumentedObjectTest(unittest.TestCase):
+    def setUp(self):
+        self.statistics = CallStatistics()
+        self.instrumented = InstrumentedObject(
+            'Target', _Target(), self.statistics
+        )
+
+    def testCalls(self):
+        self.assertEquals('abc', self.instrumented.echo('abc'))
+        self.assertEquals('de', self.instrumented.echo('de'))
+        self.assertEquals('localhost', self.instrumented.host)
+        summary = self.statistics.summary()
+        self.assertEquals([('Target', 'echo')], summary.keys())
+        statistics = summary[('Target', 'echo')]
+        self.assertEquals(2, statistics['count'])
+        self.assertEquals(0, statistics['errors'])
+        self.assertEquals(5, statistics['requestBytes'])
+        self.assertEquals(5, statistics['responseBytes'])
+
+    def testErrors(self):
+        self.assertRaises(Exception, self.instrumented.fail)
+        statistics = self.statistics.summary()[('Target', 'fail')]
+        self.assertEquals(1, statistics['count'])
+        self.assertEquals(1, statistics['errors'])
+
+    def testPercentiles(self):
+        values = range(1, 101)
+        self.assertEquals(50, _percentile(values, 50))
+        self.assertEquals(90, _percentile(values, 90))
+        self.assertEquals(99, _percentile(values, 99))
+        self.assertEquals(7, _percentile([7], 99))
+
+    def testBoundedSample(self):
+        statistics = CallStatistics(10)
+        for i in range(1, 101):
+            statistics.record(('Target', 'echo'), float(i), 0, 0, 0)
+        self.assertEquals(10, len(statistics.calls[('Target', 'echo')][6]))
+        summary = statistics.summary()[('Target', 'echo')]
+        self.assertEquals(100, summary['count'])
+        self.assertEquals(5050.0, summary['total'])
+        self.assertEquals(100.0, summary['max'])
+        self.failUnless(summary['p50'] <= summary['p90'] <= summary['max'])
+
+
+class InstrumentationTest(unittest.TestCase):
+    def setUp(self):
+        self.repository = useRepository(repositoryDirectory)
+        enableInstrumentation()
+        resetInstrumentation()
+
+    def tearDown(self):
+        disableInstrumentation()
+        closeRepository()
+
+    def testBinding(self):
+        self.failUnless(isinstance(wdr.config.AdminConfig, InstrumentedObject))
+        disableInstrumentation()
+        self.assertEquals(self.repository, wdr.config.AdminConfig)
+
+    def testReport(self):
+        getid1('/Cell:wdrCell/').listConfigObjects('Server')
+        statistics = getInstrumentationStatistics()
+        self.assertEquals(1, statistics[('AdminConfig', 'getid')]['count'])
+        self.assertEquals(1, statistics[('AdminConfig', 'list')]['count'])
+        self.failIf(instrumentationReport().find('AdminConfig.list') == -1)
+        filename = tempfile.mktemp('.tsv')
+        writeInstrumentationReport(filename)
+        try:
+            fi = open(filename, 'r')
+            try:
+                lines = fi.readlines()
+            finally:
+                fi.close()
+        finally:
+            os.remove(filename)
+        self.assertEquals('object\tmethod\tcount', lines[0][:19])
+        self.assertEquals(len(statistics) + 1, len(lines))
@@ -1,11 +1,18 @@
-import unittest
+import os
+import shutil
 import string
+import tempfile
+import unittest
 import wdr
 from wdr.app import * #noqa
 from wdr.config import * #noqa
 from wdr.control import * #noqa
 from wdr.manifest import * #noqa
+from wdr.manifest import _loadConfigurationManifest, _prefetchManifestObjects
+from wdr.manifest import _tokenizeApplicationLine, _tokenizeConfigLine
+from wdr.offline import closeRepository, useRepository
 from wdr.util import * #noqa
+from wdrmemory import memoryRepository
 from wdrtest.topology import topology
 
 (
@@ -265,6 +272,200 @@ class VariableSubstitutionWithFilteringTest(unittest.TestCase):
         )
 
 
+class MemoizedSubstitutionTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+    def _name(self, expression, variables):
+        self.calls.append(expression)
+        return 'world'
+
+    def testCallableCalledForEachOccurrence(self):
+        resolved = {}
+        for i in range(3):
+            self.assertEquals(
+                'Hello world!',
+                substituteVariables(
+                    'Hello $[name]!', {'name': self._name}, resolved
+                )
+            )
+        self.assertEquals(['name', 'name', 'name'], self.calls)
+
+    def testMemoizedCallable(self):
+        resolved = {}
+        variables = {
+            'name': MemoizedVariable(self._name), 'upper': string.upper
+        }
+        self.assertEquals(
+            'world WORLD world',
+            substituteVariables(
+                '$[name] $[name|upper] $[ name ]', variables, resolved
+            )
+        )
+        self.assertEquals(['name', 'name'], self.calls)
+        self.assertEquals('WORLD', resolved[('name', 'upper')])
+
+    def testLiteral(self):
+        self.assertEquals(
+            'no variables $ [here]',
+            substituteVariables('no variables $ [here]', {}, {})
+        )
+
+
+class ManifestTokenizerTest(unittest.TestCase):
+    def assertToken(self, expected, token):
+        self.assertEquals(
+            expected,
+            (
+                token.kind, token.indent, token.name, token.value,
+                token.operation, token.linkage
+            )
+        )
+
+    def testConfigLines(self):
+        self.assertToken(
+            ('object', 1, 'Server', None, None, '#server'),
+            _tokenizeConfigLine('\tServer #server')
+        )
+        self.assertToken(
+            ('object', 0, 'Server', None, '!', '&server'),
+            _tokenizeConfigLine('! Server&server ')
+        )
+        self.assertToken(
+            ('key', 2, 'name', 'a b', None, None),
+            _tokenizeConfigLine('\t\t*name  a b ')
+        )
+        self.assertToken(
+            ('attribute', 1, 'entries', None, None, None),
+            _tokenizeConfigLine('\t-entries')
+        )
+        self.assertToken(
+            ('directive', 1, 'include', ' a.wdrc', None, None),
+            _tokenizeConfigLine('\t@include a.wdrc')
+        )
+        for line in ('', '\t\t', '# comment', '\t  # comment', '  '):
+            self.assertEquals('comment', _tokenizeConfigLine(line).kind)
+        for line in ('*', '- name', '@', 'Server x', '!', ' !Server', '$x'):
+            self.assertEquals('invalid', _tokenizeConfigLine(line).kind)
+
+    def testApplicationLines(self):
+        self.assertToken(
+            ('application', 0, 'my app', 'a b.ear', None, None),
+            _tokenizeApplicationLine('"my app" "a b.ear"\n')
+        )
+        self.assertToken(
+            ('option', 1, '*startingWeight', '10', None, None),
+            _tokenizeApplicationLine('\t*startingWeight 10\n')
+        )
+        self.assertToken(
+            ('optionValue', 2, None, '#a;b', None, None),
+            _tokenizeApplicationLine('\t\t#a;b \n')
+        )
+        for line in ('\n', '# a comment\n', '\t# comment\n', '\t\t\n'):
+            self.assertEquals('comment', _tokenizeApplicationLine(line).kind)
+        for line in ('app\n', ' app a.ear\n', '\t option\n'):
+            self.assertEquals('invalid', _tokenizeApplicationLine(line).kind)
+
+
+class ManifestCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cacheDir = tempfile.mktemp()
+        self.manifestDir = tempfile.mktemp()
+        os.makedirs(self.manifestDir)
+        self.manifest = os.path.join(self.manifestDir, 'cell.wdrc')
+        self._writeManifest(
+            'cell.wdrc',
+            'Cell\n'
+            '\t*name $[cellName]\n'
+            '\tVariableMap\n'
+            '\t\t-entries\n'
+            '\t\t\t@include variables.wdrc\n'
+            '\t\t-description\n'
+            '\t-shortName\n'
+        )
+        self._writeManifest(
+            'variables.wdrc',
+            'VariableSubstitutionEntry\n'
+            '\t*symbolicName var1\n'
+            '\t-value $[value]\n'
+        )
+        enableManifestCache(self.cacheDir)
+
+    def tearDown(self):
+        disableManifestCache()
+        shutil.rmtree(self.manifestDir)
+        if os.path.isdir(self.cacheDir):
+            shutil.rmtree(self.cacheDir)
+
+    def _writeManifest(self, name, text):
+        fo = open(os.path.join(self.manifestDir, name), 'w')
+        try:
+            fo.write(text)
+        finally:
+            fo.close()
+
+    def _load(self, value='val1'):
+        return string.join(
+            map(
+                str,
+                _loadConfigurationManifest(
+                    self.manifest, {'cellName': 'cell', 'value': value}, []
+                )
+            ),
+            ''
+        )
+
+    def testCachedParsing(self):
+        loaded = self._load()
+        self.assertEquals(
+            {'hits': 0, 'misses': 1, 'writes': 1},
+            getManifestCacheStatistics()
+        )
+        self.assertEquals(loaded, self._load())
+        self.assertEquals(1, getManifestCacheStatistics()['hits'])
+        self.assertEquals(
+            loaded.replace('val1', 'val2'), self._load('val2')
+        )
+        # a new cache reads parsed manifest from disk
+        enableManifestCache(self.cacheDir)
+        self.assertEquals(loaded, self._load())
+        self.assertEquals(
+            {'hits': 1, 'misses': 0, 'writes': 0},
+            getManifestCacheStatistics()
+        )
+
+    def testInvalidation(self):
+        self._load()
+        self._writeManifest(
+            'variables.wdrc',
+            'VariableSubstitutionEntry\n'
+            '\t*symbolicName var2\n'
+            '\t-value $[value]\n'
+        )
+        enableManifestCache(self.cacheDir)
+        self.failIf(self._load().find('var2') < 0)
+        self.assertEquals(
+            {'hits': 0, 'misses': 1, 'writes': 1},
+            getManifestCacheStatistics()
+        )
+
+    def testMalformedCacheIgnored(self):
+        loaded = self._load()
+        for cacheFile in os.listdir(self.cacheDir):
+            filename = os.path.join(self.cacheDir, cacheFile)
+            fo = open(filename, 'a')
+            try:
+                fo.write('O\t5\t\tCell\n')
+            finally:
+                fo.close()
+        enableManifestCache(self.cacheDir)
+        self.assertEquals(loaded, self._load())
+        self.assertEquals(
+            {'hits': 0, 'misses': 1, 'writes': 1},
+            getManifestCacheStatistics()
+        )
+
+
 class BasicManifestImportTest(AbstractConfigTest):
     def testUpdateStrings(self):
         """Modifying single string attribute"""
@@ -292,6 +493,19 @@ class BasicManifestImportTest(AbstractConfigTest):
         self.assertTrue(srv.developmentMode)
         self.assertFalse(srv.parallelStartEnabled)
 
+    def testConvergedManifestSkipsWrites(self):
+        """Re-applying manifest does not modify anything"""
+        importConfigurationManifest(
+            'wdrtest/manifests/basic/boolean_attribute_change.wdrc', topology
+        )
+        resetModifyStatistics()
+        importConfigurationManifest(
+            'wdrtest/manifests/basic/boolean_attribute_change.wdrc', topology
+        )
+        statistics = getModifyStatistics()
+        self.assertEquals(statistics['changed'], 0)
+        self.assertTrue(statistics['skipped'] > 0)
+
     def testUpdateBooleanWithInvalidValue(self):
         """Attempting to assign invalid value to a boolean attribute"""
         srv = getid1(
@@ -844,3 +1058,296 @@ class CustomizeTest(AbstractConfigTest):
             % topology
         )
         self.assertEquals(dataSources, [])
+
+
+class ConfigurationPlanTest(unittest.TestCase):
+    def setUp(self):
+        repository = memoryRepository()
+        cell = repository.getid('/Cell:memoryCell/').strip()
+        provider = repository.addObject(
+            'JDBCProvider', cell, [['name', 'existing']]
+        )
+        repository.addObject('DataSource', provider, [['name', 'ds1']])
+        repository.addObject('DataSource', provider, [['name', 'obsolete']])
+        repository.save()
+        useRepository(repository)
+        self.manifestDir = tempfile.mktemp()
+        os.makedirs(self.manifestDir)
+        fo = open(os.path.join(self.manifestDir, 'plan.wdrc'), 'w')
+        try:
+            fo.write(
+                'Cell\n'
+                '\t*name memoryCell\n'
+                '\tJDBCProvider\n'
+                '\t\t*name existing\n'
+                '\t\t-classpath a.jar;b.jar\n'
+                '\t\tDataSource\n'
+                '\t\t\t*name ds1\n'
+                '\t\t!DataSource\n'
+                '\t\t\t*name obsolete\n'
+                '\tJDBCProvider #newProvider\n'
+                '\t\t*name created\n'
+                '\t\tDataSource\n'
+                '\t\t\t*name ds2\n'
+                '\t\t\t-provider\n'
+                '\t\t\t\tJDBCProvider &newProvider\n'
+                '\t\t\t-properties\n'
+                '\t\t\t\tProperty\n'
+                '\t\t\t\t\t*name p1\n'
+                '\t\t\t\t\t-value v1\n'
+            )
+        finally:
+            fo.close()
+
+    def tearDown(self):
+        closeRepository()
+        for name in os.listdir(self.manifestDir):
+            os.remove(os.path.join(self.manifestDir, name))
+        os.rmdir(self.manifestDir)
+
+    def _plan(self):
+        return planConfigurationManifest('plan.wdrc', {}, [self.manifestDir])
+
+    def testPlan(self):
+        plan = self._plan()
+        self.failIf(hasChanges())
+        self.assertEquals(
+            ['modify', 'remove', 'create', 'create', 'reference', 'create'],
+            [step.kind for step in plan.steps]
+        )
+        self.assertEquals(
+            os.path.join(self.manifestDir, 'plan.wdrc') + '(3)',
+            plan.steps[0].location
+        )
+        self.assertEquals(['a.jar', 'b.jar'], plan.steps[0].value)
+        self.assertEquals(plan.steps[2].result, plan.steps[4].value)
+
+    def testApply(self):
+        filename = os.path.join(self.manifestDir, 'plan.txt')
+        saveConfigurationPlan(self._plan(), filename)
+        applyConfigurationPlan(loadConfigurationPlan(filename))
+        self.failUnless(hasChanges())
+        provider = getid1('/JDBCProvider:created/')
+        dataSource = getid1('/DataSource:ds2/')
+        self.assertEquals(provider, dataSource.provider)
+        self.assertEquals(['p1'], [p.name for p in dataSource.properties])
+        self.assertEquals([], getid('/DataSource:obsolete/'))
+        self.assertEquals(
+            ['a.jar', 'b.jar'], getid1('/JDBCProvider:existing/').classpath
+        )
+        self.assertEquals([], self._plan().steps)
+
+    def testMalformedEscape(self):
+        filename = os.path.join(self.manifestDir, 'plan.txt')
+        saveConfigurationPlan(self._plan(), filename)
+        lineCount = len(open(filename).read().splitlines())
+        fo = open(filename, 'a')
+        try:
+            fo.write('R\tplan.wdrc(1)\\q\tN\n')
+        finally:
+            fo.close()
+        try:
+            loadConfigurationPlan(filename)
+            self.fail()
+        except Exception, ex:
+            self.assertEquals(
+                'invalid record in %s at line %d'
+                % (filename, lineCount + 1),
+                str(ex)
+            )
+
+    def testReimport(self):
+        importConfigurationManifest('plan.wdrc', {}, [self.manifestDir])
+        save()
+        importConfigurationManifest('plan.wdrc', {}, [self.manifestDir])
+        self.failIf(hasChanges())
+        self.assertEquals([], self._plan().steps)
+
+    def testPrefetch(self):
+        plan = self._plan()
+        enableManifestPrefetch()
+        try:
+            self.assertEquals(
+                map(str, plan.steps), map(str, self._plan().steps)
+            )
+            importConfigurationManifest('plan.wdrc', {}, [self.manifestDir])
+        finally:
+            disableManifestPrefetch()
+        self.assertEquals([], self._plan().steps)
+
+    def testPrefetchFollowsMatchedObjects(self):
+        unrelated = getid1('/Cell:memoryCell/').create(
+            'JDBCProvider', name='unrelated'
+        )
+        elsewhere = unrelated.create('DataSource', name='elsewhere')
+        cache = AttributeValueCache()
+        _prefetchManifestObjects(
+            _loadConfigurationManifest(
+                os.path.join(self.manifestDir, 'plan.wdrc'), {}, []
+            ),
+            cache
+        )
+        prefetched = [
+            getid1('/Cell:memoryCell/'),
+            getid1('/JDBCProvider:existing/'),
+            getid1('/DataSource:ds1/'),
+            getid1('/DataSource:obsolete/'),
+            unrelated,
+        ]
+        expected = map(str, prefetched)
+        expected.sort()
+        shown = cache.types.keys()
+        shown.sort()
+        self.assertEquals(expected, shown)
+        self.failIf(cache.cache.has_key(str(elsewhere)))
+
+    def testPrefetchAttributes(self):
+        cache = AttributeValueCache()
+        providers = getid('/JDBCProvider:/')
+        cache.prefetch(providers)
+        self.assertEquals(
+            {'name': 'existing'}, cache.cache[str(providers[0])]
+        )
+        self.assertEquals(
+            'JDBCProvider', cache.objectType(getid1('/JDBCProvider:/'))
+        )
+
+    def testCreateInvalidatesChildren(self):
+        cache = AttributeValueCache()
+        dataSource = getid1('/DataSource:ds1/')
+        self.assertEquals([], cache.children(dataSource, 'Property'))
+        mo = ManifestConfigObject('Property')
+        mo.keys['name'] = 'created'
+        created = mo._create(dataSource, 'properties', cache)
+        self.assertEquals([created], cache.children(dataSource, 'Property'))
+        mo.operation = Operations.remove
+        mo._remove(created, {}, cache)
+        self.assertEquals([], cache.children(dataSource, 'Property'))
+
+
+class ReferenceRemovalTest(unittest.TestCase):
+    def setUp(self):
+        repository = memoryRepository()
+        repository.defineType(
+            'JDBCProviderGroup',
+            {'name': 'String', 'providers': 'JDBCProvider@*'}, ['Cell']
+        )
+        useRepository(repository)
+        cell = getid1('/Cell:memoryCell/')
+        self.providers = [
+            cell.create('JDBCProvider', name=name)
+            for name in ['p1', 'p2', 'other']
+        ]
+        cell.create(
+            'JDBCProviderGroup', name='group'
+        ).providers = self.providers[:2]
+        save()
+        self.filename = tempfile.mktemp('.wdrc')
+        fo = open(self.filename, 'w')
+        try:
+            fo.write(
+                'JDBCProvider #other\n'
+                '\t*name other\n'
+                'JDBCProviderGroup\n'
+                '\t*name group\n'
+                '\t-providers\n'
+                '\t\t!JDBCProvider &other\n'
+            )
+        finally:
+            fo.close()
+
+    def tearDown(self):
+        closeRepository()
+        os.remove(self.filename)
+
+    def testAbsentReference(self):
+        importConfigurationManifest(
+            os.path.basename(self.filename), {},
+            [os.path.dirname(self.filename)]
+        )
+        self.failIf(hasChanges())
+        self.assertEquals(
+            self.providers[:2],
+            getid1('/JDBCProviderGroup:group/').providers
+        )
+
+
+class IncrementalManifestTest(unittest.TestCase):
+    def setUp(self):
+        repository = memoryRepository()
+        cell = repository.getid('/Cell:memoryCell/').strip()
+        repository.addObject(
+            'JDBCProvider', cell, [['name', 'existing'], ['classpath', 'a.jar']]
+        )
+        repository.save()
+        useRepository(repository)
+        self.manifestDir = tempfile.mktemp()
+        os.makedirs(self.manifestDir)
+        fo = open(os.path.join(self.manifestDir, 'state.wdrc'), 'w')
+        try:
+            fo.write(
+                'JDBCProvider\n'
+                '\t*name existing\n'
+                '\t-classpath a.jar;b.jar\n'
+                'Cell\n'
+                '\t*name memoryCell\n'
+                '\tJDBCProvider\n'
+                '\t\t*name created\n'
+                '\t\t-classpath c.jar\n'
+            )
+        finally:
+            fo.close()
+        self.stateDir = os.path.join(self.manifestDir, 'state')
+        enableIncrementalManifests(self.stateDir)
+
+    def tearDown(self):
+        disableIncrementalManifests()
+        closeRepository()
+        shutil.rmtree(self.manifestDir)
+
+    def _import(self, force=0):
+        importConfigurationManifest(
+            'state.wdrc', {}, [self.manifestDir], force
+        )
+        return getIncrementalManifestStatistics()
+
+    def testSkipUnchanged(self):
+        self._import()
+        save()
+        self.assertEquals(
+            {'applied': 2, 'skipped': 2, 'writes': 2}, self._import()
+        )
+        self.failIf(hasChanges())
+        self.assertEquals(
+            {'applied': 4, 'skipped': 2, 'writes': 3}, self._import(1)
+        )
+
+    def testChangedTarget(self):
+        self._import()
+        save()
+        getid1('/JDBCProvider:existing/').classpath = ['c.jar']
+        save()
+        self.assertEquals(
+            {'applied': 3, 'skipped': 1, 'writes': 1}, self._import()
+        )
+        self.assertEquals(
+            ['a.jar', 'b.jar'], getid1('/JDBCProvider:existing/').classpath
+        )
+
+    def testNestedDrift(self):
+        self._import()
+        save()
+        getid1('/JDBCProvider:created/').classpath = ['drifted.jar']
+        save()
+        self.assertEquals(
+            {'applied': 3, 'skipped': 1, 'writes': 1}, self._import()
+        )
+        self.assertEquals(
+            ['c.jar'], getid1('/JDBCProvider:created/').classpath
+        )
+
+    def testReset(self):
+        self._import()
+        reset()
+        self.failIf(os.path.exists(self.stateDir))
+        self.assertEquals(0, self._import()['skipped'])
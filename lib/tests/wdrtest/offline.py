@@ -0,0 +1,250 @@
+import logging
+import os
+import tempfile
+import unittest
+
+import wdr
+from wdr.config import * #noqa
+from wdr.offline import * #noqa
+from wdr.offline import _parseXml, _resolveHref
+from wdrmemory import memoryRepository
+
+logger = logging.getLogger('wdr.test.offline')
+
+repositoryDirectory = 'wdrtest/repositories/basic'
+
+
+class XmlParsingTest(unittest.TestCase):
+    def testElements(self):
+        elements = _parseXml(
+            '<?xml version="1.0"?>\n'
+            '<!-- comment with <tags> -->\n'
+            '<a:Root xmi:id="Root_1" name="x &amp; y &#65;&#x42;">'
+            '<child xmi:id=\'Child_1\' value="a > b"/>'
+            '<item>first &lt;</item><item><![CDATA[<second>]]></item>'
+            '</a:Root>'
+        )
+        self.assertEquals(1, len(elements))
+        root = elements[0]
+        self.assertEquals('a:Root', root.tag)
+        self.assertEquals('x &amp; y &#65;&#x42;', root.attributes['name'])
+        self.assertEquals(
+            ['child', 'item', 'item'], [e.tag for e in root.children]
+        )
+        self.assertEquals('a > b', root.children[0].attributes['value'])
+        self.assertEquals(['first &lt;'], root.children[1].text)
+        self.assertEquals(['<second>'], root.children[2].text)
+
+    def testMalformed(self):
+        self.assertRaises(Exception, _parseXml, '<a><b></a>')
+        self.assertRaises(Exception, _parseXml, '<a><b/>')
+
+    def testHref(self):
+        self.assertEquals(
+            ('cells/c', 'resources.xml', 'JDBCProvider_1'),
+            _resolveHref(
+                'cells/c/nodes/n/servers/s',
+                '../../../../resources.xml#JDBCProvider_1'
+            )
+        )
+        self.assertEquals(
+            ('cells/c/nodes/n', 'node.xml', 'Node_1'),
+            _resolveHref('cells/c', 'cells/c/nodes/n/node.xml#Node_1')
+        )
+
+
+class OfflineRepositoryTest(unittest.TestCase):
+    def setUp(self):
+        self.repository = useRepository(repositoryDirectory)
+
+    def tearDown(self):
+        closeRepository()
+
+    def testBinding(self):
+        self.assertEquals(self.repository, wdr.config.AdminConfig)
+        self.assertEquals(self.repository, wdr.AdminConfig)
+
+    def testGetid(self):
+        self.assertEquals(
+            [
+                'wdrServer(cells/wdrCell/nodes/wdrNode/servers/wdrServer'
+                '|server.xml#Server_1)'
+            ],
+            map(str, getid('/Cell:wdrCell/Node:wdrNode/Server:wdrServer/'))
+        )
+        self.assertEquals(0, len(getid('/Node:wdrNode/Cell:wdrCell/')))
+        self.assertEquals(2, len(getid('/JDBCProvider:/')))
+        self.assertEquals(1, len(getid('/Server:wdrServer/JDBCProvider:/')))
+        deployment = getid1('/Deployment:DemoApp/')
+        self.assertEquals('Deployment', deployment._type)
+        self.assertEquals('DemoApp', deployment._id.name)
+
+    def testListScopes(self):
+        cell = getid1('/Cell:wdrCell/')
+        server = getid1('/Server:wdrServer/')
+        names = [ds.name for ds in cell.listConfigObjects('DataSource')]
+        names.sort()
+        self.assertEquals(['ServerDataSource', 'WdrDataSource'], names)
+        self.assertEquals(
+            ['ServerDataSource'],
+            [ds.name for ds in server.listConfigObjects('DataSource')]
+        )
+        self.assertEquals(
+            ['ServerDataSource'],
+            [ds.name for ds in listConfigObjects('DataSource', '*Server*')]
+        )
+
+    def testAttributes(self):
+        cell = getid1('/Cell:wdrCell/')
+        self.assertEquals('wdrCell', cell.name)
+        self.assertEquals('STANDALONE', cell.cellType)
+        self.assertEquals(
+            [('cell.description', 'offline "fixture" cell'), ('empty', '')],
+            [(p.name, p.value) for p in cell.properties]
+        )
+        provider = cell.lookup1(
+            'JDBCProvider', {'name': 'Derby JDBC Provider'}
+        )
+        self.assertEquals(
+            [
+                '${DERBY_JDBC_DRIVER_PATH}/derby.jar',
+                '${DERBY_JDBC_DRIVER_PATH}/derbyclient.jar',
+            ],
+            provider.classpath
+        )
+
+    def testReferences(self):
+        dataSource = getid1('/DataSource:ServerDataSource/')
+        self.assertEquals(
+            getid1('/Cell:wdrCell/JDBCProvider:Derby JDBC Provider/'),
+            dataSource.provider
+        )
+        dataSource = getid1('/DataSource:WdrDataSource/')
+        self.assertEquals(
+            'Derby JDBC Provider', dataSource.provider.name
+        )
+
+    def testGetAllAttributes(self):
+        attributes = getid1('/Cell:wdrCell/').getAllAttributes()
+        self.assertEquals('wdrCell', attributes['name'])
+        self.assertEquals(2, len(attributes['properties']))
+
+    def testReadOnly(self):
+        cell = getid1('/Cell:wdrCell/')
+        try:
+            cell.cellType = 'DISTRIBUTED'
+        except Exception:
+            pass
+        else:
+            self.fail('offline repository accepted modification')
+        self.assertEquals('STANDALONE', cell.cellType)
+
+    def testArchive(self):
+        try:
+            import zipfile
+        except ImportError:
+            return
+        filename = tempfile.mktemp('.zip')
+        archive = zipfile.ZipFile(filename, 'w')
+        try:
+            root = os.path.join(repositoryDirectory, 'config')
+            for relativePath in (
+                'cells/wdrCell/cell.xml',
+                'cells/wdrCell/nodes/wdrNode/node.xml',
+                'cells/wdrCell/nodes/wdrNode/servers/wdrServer/server.xml',
+            ):
+                archive.write(
+                    os.path.join(root, relativePath),
+                    'WebSphereConfig/' + relativePath
+                )
+        finally:
+            archive.close()
+        try:
+            repository = openRepository(filename)
+        finally:
+            os.remove(filename)
+        self.assertEquals(
+            'wdrServer(cells/wdrCell/nodes/wdrNode/servers/wdrServer'
+            '|server.xml#Server_1)',
+            repository.getid('/Node:wdrNode/Server:/')
+        )
+
+
+class InMemoryRepositoryTest(unittest.TestCase):
+    def setUp(self):
+        self.repository = useRepository(memoryRepository())
+
+    def tearDown(self):
+        closeRepository()
+
+    def testCreate(self):
+        cell = getid1('/Cell:memoryCell/')
+        provider = cell.create('JDBCProvider', name='provider')
+        self.assertEquals(
+            'cells/memoryCell|cell.xml', '%s|%s' % (
+                provider._id.xmlPath, provider._id.xmlDoc
+            )
+        )
+        dataSource = provider.create(
+            'DataSource', name='dataSource', provider=provider
+        )
+        dataSource.create('Property', name='p1', value='v1')
+        dataSource.create('Property', name='p2', value='v2')
+        self.assertEquals(
+            [dataSource], getid('/JDBCProvider:provider/DataSource:/')
+        )
+        self.assertEquals(provider, dataSource.provider)
+        self.assertEquals(
+            ['p1', 'p2'], [p.name for p in dataSource.properties]
+        )
+        self.failUnless(hasChanges())
+
+    def testModify(self):
+        provider = getid1('/Cell:memoryCell/').create(
+            'JDBCProvider', name='provider', classpath=['a.jar']
+        )
+        provider.classpath = ['b.jar', 'c.jar']
+        provider.name = 'renamed'
+        self.assertEquals(['b.jar', 'c.jar'], provider.classpath)
+        self.assertEquals(1, len(getid('/JDBCProvider:renamed/')))
+        provider.unset(['classpath'])
+        self.assertEquals([], provider.classpath)
+
+    def testChangedAttributeNames(self):
+        provider = getid1('/Cell:memoryCell/').create(
+            'JDBCProvider', name='provider', classpath=['a.jar']
+        )
+        enableAttributeCache()
+        try:
+            self.assertEquals(
+                ['classpath'],
+                provider._modify(
+                    [['name', 'provider'], ['classpath', ['b.jar']]]
+                )
+            )
+            self.assertEquals(
+                [], provider._modify([['classpath', ['b.jar']]])
+            )
+        finally:
+            disableAttributeCache()
+
+    def testRemove(self):
+        provider = getid1('/Cell:memoryCell/').create(
+            'JDBCProvider', name='provider'
+        )
+        provider.create('DataSource', name='dataSource')
+        provider.remove()
+        self.assertEquals([], getid('/JDBCProvider:/'))
+        self.assertEquals([], getid('/DataSource:/'))
+
+    def testReset(self):
+        cell = getid1('/Cell:memoryCell/')
+        cell.create('JDBCProvider', name='saved')
+        save()
+        cell.create('JDBCProvider', name='discarded')
+        getid1('/JDBCProvider:saved/').name = 'renamed'
+        reset()
+        self.failIf(hasChanges())
+        self.assertEquals(
+            ['saved'], [p.name for p in getid('/JDBCProvider:/')]
+        )
@@ -0,0 +1,75 @@
+import logging
+import os
+import tempfile
+import time
+import unittest
+
+import wdr
+import wdr.util
+from wdr.config import * #noqa
+from wdr.offline import * #noqa
+from wdr.replay import * #noqa
+
+logger = logging.getLogger('wdr.test.replay')
+
+repositoryDirectory = 'wdrtest/repositories/basic'
+
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.filename = tempfile.mktemp('.trace')
+        useRepository(repositoryDirectory)
+        try:
+            startRecording(self.filename)
+            try:
+                self.server = getid1('/Server:wdrServer/')
+                self.dataSources = map(
+                    str, self.server.listConfigObjects('DataSource')
+                )
+                self.serverName = self.server.name
+                try:
+                    self.server.name = 'anotherName'
+                except Exception:
+                    pass
+            finally:
+                stopRecording()
+        finally:
+            closeRepository()
+
+    def tearDown(self):
+        stopReplay()
+        os.remove(self.filename)
+
+    def testReplay(self):
+        trace = startReplay(self.filename)
+        self.failUnless(trace.count > 0)
+        self.assertEquals(['AdminConfig'], trace.objectNames)
+        server = getid1('/Server:wdrServer/')
+        self.assertEquals(str(self.server), str(server))
+        self.assertEquals(
+            self.dataSources,
+            map(str, server.listConfigObjects('DataSource'))
+        )
+        self.assertEquals(self.serverName, server.name)
+
+    def testReplayedErrors(self):
+        startReplay(self.filename)
+        server = getid1('/Server:wdrServer/')
+        try:
+            server.name = 'anotherName'
+        except wdr.util.SCRIPTING_EXCEPTIONS, ex:
+            self.failUnless(isinstance(ex, ReplayedException))
+        else:
+            self.fail('recorded failure has not been replayed')
+        self.assertRaises(Exception, getid, '/Server:unknown/')
+
+    def testLatency(self):
+        startReplay(self.filename, 0.05)
+        startTime = time.time()
+        getid('/Server:wdrServer/')
+        self.failUnless(time.time() - startTime >= 0.05)
+
+    def testRestore(self):
+        startReplay(self.filename)
+        stopReplay()
+        self.assertEquals(None, wdr.config.AdminConfig)
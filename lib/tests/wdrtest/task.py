@@ -1,4 +1,6 @@
 import unittest
+import wdr
+import wdr.config
 from wdr.task import * #noqa
 
 
@@ -220,3 +222,29 @@ class AdminTaskListOfListsListTest(unittest.TestCase):
                 [['g', '7'], ['h', '8'], ['i', '9']]
             ]
         )
+
+
+class _RecordingAdminTask:
+    def __init__(self):
+        self.calls = []
+
+    def createCell(self, args):
+        self.calls.append(args)
+        return 'created'
+
+
+class TaskInvocationTest(unittest.TestCase):
+    def setUp(self):
+        self.adminTask = _RecordingAdminTask()
+        wdr.replaceWsadminObject('AdminTask', self.adminTask)
+        wdr.config.enableQueryCache()
+
+    def tearDown(self):
+        wdr.config.disableQueryCache()
+        wdr.restoreWsadminObject('AdminTask')
+
+    def testCachesInvalidated(self):
+        wdr.config._queryCache.entries['/Cell:c/'] = []
+        self.assertEquals('created', invokeTask('createCell', ['-name', 'c']))
+        self.assertEquals([['-name', 'c']], self.adminTask.calls)
+        self.assertEquals({}, wdr.config._queryCache.entries)
@@ -0,0 +1,81 @@
+import string
+import unittest
+
+from wdr.manifest import * #noqa
+from wdr.util import * #noqa
+
+
+class FieldEncodingTest(unittest.TestCase):
+    def testEscaping(self):
+        value = 'tab\there\nnew line \\n\r'
+        self.assertEquals(-1, escapeField(value).find('\t'))
+        self.assertEquals(value, unescapeField(escapeField(value)))
+
+    def testRoundTrip(self):
+        for value in (
+            None, 0, -17, '', 'a:b;c', 'tab\there\nnext line',
+            [], ['S1:', [None, 12, ['x']]],
+        ):
+            self.assertEquals(value, decodeValue(encodeValue(value)))
+        self.assertEquals(['a', 'b'], decodeValue(encodeValue(('a', 'b'))))
+
+    def testInvalid(self):
+        self.assertRaises(Exception, decodeValue, 'S3:ab')
+        self.assertRaises(Exception, decodeValue, 'NN')
+        self.assertRaises(Exception, decodeValue, 'X')
+
+
+class VariableScopeTest(unittest.TestCase):
+    def setUp(self):
+        self.globalVariables = {
+            'cell': {'name': 'wdrCell', 'jvm': {'heap': 256, 'gc': 'gencon'}},
+            'env': 'test',
+            'upper': string.upper,
+        }
+        self.nodeVariables = {
+            'node': {'name': 'node01'},
+            'cell': {'jvm': {'heap': 512}},
+        }
+
+    def testLookup(self):
+        scope = VariableScope(self.globalVariables, self.nodeVariables)
+        self.assertEquals('wdrCell', scope['cell']['name'])
+        self.assertEquals(512, scope['cell']['jvm']['heap'])
+        self.assertEquals('gencon', scope['cell']['jvm']['gc'])
+        self.assertEquals('node01', scope['node']['name'])
+        self.failIf(scope.has_key('server'))
+        self.assertRaises(KeyError, lambda s=scope: s['server'])
+        self.assertEquals(
+            mergeVariables(self.globalVariables, self.nodeVariables),
+            scope.toDict()
+        )
+
+    def testChild(self):
+        scope = VariableScope(self.globalVariables, self.nodeVariables)
+        server1 = scope.child({'server': {'name': 'server1'}, 'env': 'prod'})
+        server2 = scope.child({'server': {'name': 'server2'}})
+        self.assertEquals('server1', server1['server']['name'])
+        self.assertEquals('server2', server2['server']['name'])
+        self.assertEquals('prod', server1['env'])
+        self.assertEquals('test', server2['env'])
+        self.failIf(scope.has_key('server'))
+        self.assertEquals(self.nodeVariables['node'], server1['node'])
+
+    def testShadowing(self):
+        scope = VariableScope({'a': {'b': 1}}, {'a': 2}).child({'c': 3})
+        self.assertEquals(2, scope['a'])
+        scope = VariableScope({'a': 1}, {'a': {'b': 2}})
+        self.assertEquals({'b': 2}, scope['a'])
+
+    def testSubstitution(self):
+        scope = VariableScope(self.globalVariables, self.nodeVariables).child(
+            {'server': {'name': 'server1'}}
+        )
+        self.assertEquals(
+            'WDRCELL/node01/server1 512',
+            substituteVariables(
+                '$[cell.name|upper]/$[node.name]/$[server.name] '
+                '$[cell.jvm.heap]',
+                scope
+            )
+        )